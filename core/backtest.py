@@ -40,7 +40,7 @@ class BacktestEngine(BaseEngine):
         
         self.sim_exchange = SimExchange(self.event_engine, start, end, contract)
         self.strategy = BuyAndHoldStrategy(self.event_engine)
-        self.oms = OmsEngine(self.event_engine, contract)
+        self.oms = OmsEngine(self.event_engine, contract, capital)
 
         # contractdata
         self.contract: ContractData = contract
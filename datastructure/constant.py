@@ -63,6 +63,12 @@ class Interval(Enum):
     时间颗粒度
     '''
     MINUTE = "1m"
+    HOUR = "1h"
     DAILY = 'd'
     TICK = "tick"
+    # 信息驱动bar: 按成交量/成交额/价格区间/tick数切分, 不对应固定时长
+    VOLUME = "volume"
+    TURNOVER = "turnover"
+    RANGE = "range"
+    TICK_COUNT = "tick_count"
 
@@ -22,6 +22,7 @@ from typing import Dict
 INTERVAL_DELTA_MAP: Dict[Interval, timedelta] = {
     Interval.TICK: timedelta(microseconds=1),
     Interval.MINUTE: timedelta(minutes=1),
+    Interval.HOUR: timedelta(hours=1),
     Interval.DAILY: timedelta(days=1),
 }
 
@@ -1,17 +1,60 @@
 '''
 数据结构
 '''
-from dataclasses import dataclass, field
-from datetime import datetime
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timedelta
 from typing import List
 from logging import INFO
 
 from .constant import *
 from .definition import  ACTIVE_STATUSES
 
+# 纳秒时间戳的起点: 时间戳为不带时区的本地时间, 与数据库中一致
+EPOCH: datetime = datetime(1970, 1, 1)
+MICROSECOND: timedelta = timedelta(microseconds=1)
+
+
+def ns_to_datetime(ns: int) -> datetime:
+    '''
+    int64纳秒时间戳 -> python datetime(精确到微秒)
+    '''
+    return EPOCH + timedelta(microseconds=ns // 1000)
+
+
+def datetime_to_ns(dt: datetime) -> int:
+    '''
+    python datetime -> int64纳秒时间戳
+    '''
+    return (dt - EPOCH) // MICROSECOND * 1000
+
+
+def add_slots(cls: type) -> type:
+    '''
+    dataclass -> 带__slots__的同名类, 实例不再有__dict__
+    同python3.10的dataclass(slots=True), 兼容python3.9: 字段默认值已保存在生成的__init__中, 需从类属性中删除后才能声明同名slot
+    用法: @add_slots放在@dataclass之上
+    '''
+    names: tuple = tuple(f.name for f in fields(cls))
+    cls_dict: dict = dict(cls.__dict__)
+    cls_dict["__slots__"] = names
+    for name in names:
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    new_cls: type = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    new_cls.__qualname__ = cls.__qualname__
+    return new_cls
+
+
 class BaseData:
+    '''
+    空__slots__: 使用add_slots的子类实例不再有__dict__
+    gateway_name为类属性(只读), 需要按实例设置的子类声明同名字段
+    '''
+    __slots__ = ()
     gateway_name: str = ""
 
+@add_slots
 @dataclass
 class TickData(BaseData):
     '''
@@ -31,8 +74,17 @@ class TickData(BaseData):
     ask_price_1: float = 0
     bid_volume_1: float = 0
     ask_volume_1: float = 0
+    # 纳秒时间戳(与TickView.datetime_ns一致): 批量构造时(df2data)按列计算后传入, 未传入时由datetime计算; datetime不应再修改
+    # 代价: 每个tick多1个slot和1个int对象(约44字节, slotted TickData约192 -> 236字节, 见tests/bench_objects.py), 换取回放时逐tick不做datetime运算
+    # 大量tick常驻内存时用TickBatch(datetime_ns为int64列, 每行8字节)
+    datetime_ns: int = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.datetime_ns is None:
+            self.datetime_ns = datetime_to_ns(self.datetime)
 
 
+@add_slots
 @dataclass
 class BarData(BaseData):
     """
@@ -65,6 +117,7 @@ class SignalData(BaseData):
     
 
 
+@add_slots
 @dataclass
 class OrderData(BaseData):
     """
@@ -102,6 +155,7 @@ class OrderData(BaseData):
         )
         return req
 
+@add_slots
 @dataclass
 class TradeData(BaseData):
     """
@@ -143,12 +197,12 @@ class PositionData(BaseData):
     exchange: Exchange
     direction: Direction
     all_volume: float = 0       # 总持仓
-    # all_pnl: float = 0          # 持仓盈亏
-    # yd_volume: float = 0        # 昨仓
-    # td_volume: float = 0        # 今仓
+    all_pnl: float = 0          # 持仓盈亏
+    yd_volume: float = 0        # 昨仓
+    td_volume: float = 0        # 今仓
     # available: float = 0        # 可平量
-    # average_price: float = 0    # 持仓均价
-    # occupying_margin: float = 0 # 占用保证金
+    average_price: float = 0    # 持仓均价
+    occupying_margin: float = 0 # 占用保证金
     gateway_name: str = ''
     
     # record_list: List[PositionRecordData] = field(default_factory=list)  # 历史持仓记录
@@ -172,7 +226,7 @@ class AccountData(BaseData):
     ocupying_margin: float = 0     # 占用保证金
     frozen_margin: float = 0       # 冻结保证金
     frozen_commission: float = 0    # 冻结手续费
-    commission: float = 0          # 手续费(用来记录最近一次委托的手续费)
+    commission: float = 0          # 累计手续费
     balance: float = 0             # 可用资金
     
 
@@ -217,6 +271,7 @@ class SubscribeRequest:
 
 
 
+@add_slots
 @dataclass
 class OrderRequest:
     """
@@ -250,6 +305,7 @@ class OrderRequest:
         return order
 
 
+@add_slots
 @dataclass
 class CancelRequest:
     """
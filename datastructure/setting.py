@@ -2,6 +2,7 @@
 全局设置
 '''
 from logging import CRITICAL
+from pathlib import Path
 from typing import Dict, Any
 from tzlocal import get_localzone_name
 
@@ -14,10 +15,23 @@ SETTING: Dict[str, Any] = {
     "log.file": True,
 
     # database
+    "database.name": "dolphindb", # 数据库后端: dolphindb / file(本地文件, 无需数据库服务)
+    "database.path": str(Path.home().joinpath(".my_backtester", "database")), # 本地文件数据库目录
     "database.timezone": get_localzone_name(),
     "database.host": "121.37.81.170", # 数据库地址
     "database.port": 8848, # 数据库端口
     "database.user": "admin", # 用户名
     "database.password": "123456", # 密码
+    "database.pool_size": 4, # 连接池大小(并发读取数)
+    "database.ingest_manifest": str(Path.home().joinpath(".my_backtester", "ingest_manifest.jsonl")), # 历史数据导入记录
+
+    # 历史数据csv文件夹索引
+    "data.archive_catalog": str(Path.home().joinpath(".my_backtester", "archive_catalog.sqlite")),
+
+    # 本地tick缓存
+    "database.cache": False, # 是否启用本地缓存(默认关闭, 开启后占用cache_path下最多cache_size字节)
+    "database.cache_path": str(Path.home().joinpath(".my_backtester", "tick_cache")), # 缓存目录
+    "database.cache_size": 10 * 1024 ** 3, # 缓存上限(字节), 超出按LRU淘汰
+    "database.bar_cache_path": str(Path.home().joinpath(".my_backtester", "bar_cache")), # tick合成bar的缓存目录
 
 }
\ No newline at end of file
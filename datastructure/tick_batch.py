@@ -0,0 +1,209 @@
+'''
+列式tick数据
+TickBatch用一个numpy结构化数组保存一段tick(时间为int64纳秒, 合约/交易所为编码), 切片、按时间截取、合并均不构造python对象
+TickView为单个tick的只读行对象(NamedTuple), 属性名同TickData, 可直接传给原有的tick处理函数
+'''
+from dataclasses import fields
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .constant import Exchange
+from .object import TickData, datetime_to_ns
+from utils.trading_calendar import get_trading_day_index
+
+
+# 数值字段(TickData中datetime与datetime_ns之间的字段)
+FLOAT_FIELDS: List[str] = [f.name for f in fields(TickData)][3:-1]
+TICK_DTYPE: np.dtype = np.dtype(
+    [("datetime_ns", np.int64), ("trading_day", np.int32), ("symbol", np.int32), ("exchange", np.int32)]
+    + [(name, np.float64) for name in FLOAT_FIELDS]
+)
+
+
+class TickBatch:
+    '''
+    一段tick数据(可包含多个合约), 按时间顺序排列
+    data为TICK_DTYPE结构化数组, trading_day列为预先计算的所属交易日(1970-01-01起的天数), symbol/exchange列为symbols/exchanges的下标
+    切片返回共享同一块内存的TickBatch, 迭代返回TickView
+    '''
+    chunk_size: int = 512       # 迭代时每次构造的TickView个数(行对象在gc新生代内回收, 块过大时gc开销明显)
+
+    def __init__(self, data: np.ndarray, symbols: List[str], exchanges: List[Exchange]) -> None:
+        """Constructor"""
+        self.data: np.ndarray = data
+        self.symbols: List[str] = symbols
+        self.exchanges: List[Exchange] = exchanges
+        # 各列为结构化数组的字段视图, 不复制数据
+        self.columns: dict = {name: data[name] for name in TICK_DTYPE.names}
+
+    @classmethod
+    def empty(cls) -> "TickBatch":
+        return cls(np.empty(0, dtype=TICK_DTYPE), [], [])
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "TickBatch":
+        '''
+        DataFrame(字段同TickData, exchange为字符串) -> TickBatch
+        '''
+        data: np.ndarray = np.empty(len(df), dtype=TICK_DTYPE)
+        if df.empty:
+            return cls(data, [], [])
+        symbol_codes, symbols = pd.factorize(df["symbol"])
+        exchange_codes, exchanges = pd.factorize(df["exchange"])
+        datetimes: pd.Series = df["datetime"]
+        if not pd.api.types.is_datetime64_dtype(datetimes):
+            datetimes = pd.to_datetime(datetimes)
+        data["datetime_ns"] = datetimes.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        data["trading_day"] = get_trading_day_index(data["datetime_ns"])
+        data["symbol"] = symbol_codes
+        data["exchange"] = exchange_codes
+        for name in FLOAT_FIELDS:
+            data[name] = df[name].to_numpy(dtype=np.float64)
+        return cls(data, [str(s) for s in symbols], [Exchange(e) for e in exchanges])
+
+    @classmethod
+    def from_ticks(cls, ticks: Sequence[TickData]) -> "TickBatch":
+        '''
+        list of TickData -> TickBatch
+        '''
+        data: np.ndarray = np.empty(len(ticks), dtype=TICK_DTYPE)
+        symbols: dict = {}
+        exchanges: dict = {}
+        data["datetime_ns"] = [tick.datetime_ns for tick in ticks]
+        data["trading_day"] = get_trading_day_index(data["datetime_ns"])
+        data["symbol"] = [symbols.setdefault(tick.symbol, len(symbols)) for tick in ticks]
+        data["exchange"] = [exchanges.setdefault(tick.exchange, len(exchanges)) for tick in ticks]
+        for name in FLOAT_FIELDS:
+            data[name] = [getattr(tick, name) for tick in ticks]
+        return cls(data, list(symbols), list(exchanges))
+
+    @classmethod
+    def concat(cls, batches: Sequence["TickBatch"]) -> "TickBatch":
+        '''
+        按顺序合并多个TickBatch, 合约/交易所编码重新映射
+        '''
+        symbols: dict = {}
+        exchanges: dict = {}
+        arrays: List[np.ndarray] = []
+        for batch in batches:
+            data: np.ndarray = batch.data.copy()
+            symbol_map: np.ndarray = np.array([symbols.setdefault(s, len(symbols)) for s in batch.symbols], dtype=np.int32)
+            exchange_map: np.ndarray = np.array([exchanges.setdefault(e, len(exchanges)) for e in batch.exchanges], dtype=np.int32)
+            if len(data):
+                data["symbol"] = symbol_map[data["symbol"]]
+                data["exchange"] = exchange_map[data["exchange"]]
+            arrays.append(data)
+        if not arrays:
+            return cls.empty()
+        return cls(np.concatenate(arrays), list(symbols), list(exchanges))
+
+    def slice_time(self, start: datetime, end: datetime) -> "TickBatch":
+        '''
+        截取时间在[start, end]内的tick(闭区间, 与数据库读取一致), 返回视图
+        '''
+        datetime_ns: np.ndarray = self.columns["datetime_ns"]
+        i: int = int(np.searchsorted(datetime_ns, datetime_to_ns(start), side="left"))
+        j: int = int(np.searchsorted(datetime_ns, datetime_to_ns(end), side="right"))
+        return self[i: j]
+
+    def slice_trading_day(self, trading_day: int) -> "TickBatch":
+        '''
+        截取某个交易日(序号, 见get_trading_day_index)的tick, 返回视图
+        '''
+        trading_days: np.ndarray = self.columns["trading_day"]
+        i: int = int(np.searchsorted(trading_days, trading_day, side="left"))
+        j: int = int(np.searchsorted(trading_days, trading_day, side="right"))
+        return self[i: j]
+
+    @property
+    def datetime_ns(self) -> np.ndarray:
+        return self.columns["datetime_ns"]
+
+    def to_df(self) -> pd.DataFrame:
+        '''
+        TickBatch -> DataFrame(字段同TickData, exchange为字符串)
+        '''
+        df: pd.DataFrame = pd.DataFrame({
+            "symbol": np.asarray(self.symbols, dtype=object)[self.columns["symbol"]] if self.symbols else [],
+            "exchange": np.asarray([e.value for e in self.exchanges], dtype=object)[self.columns["exchange"]] if self.exchanges else [],
+            "datetime": self.columns["datetime_ns"].astype("datetime64[ns]"),
+        })
+        for name in FLOAT_FIELDS:
+            df[name] = self.columns[name]
+        return df
+
+    def to_ticks(self) -> List[TickData]:
+        '''
+        TickBatch -> list of TickData
+        '''
+        return [row.to_tick() for row in self.get_rows()]
+
+    def get_rows(self, start: int = 0, stop: int = None) -> List["TickView"]:
+        '''
+        [start, stop)范围内的tick构造为TickView, 按列整体转换(tolist), 不逐个字段访问数组
+        '''
+        data: np.ndarray = self.data[start: stop]
+        if not len(data):
+            return []
+        datetime_ns: np.ndarray = data["datetime_ns"]
+        columns: List[list] = [
+            np.asarray(self.symbols, dtype=object)[data["symbol"]].tolist(),
+            np.asarray(self.exchanges, dtype=object)[data["exchange"]].tolist(),
+            datetime_ns.view("datetime64[ns]").astype("datetime64[us]").tolist(),
+        ]
+        columns += [data[name].tolist() for name in FLOAT_FIELDS]
+        columns.append(datetime_ns.tolist())
+        columns.append(data["trading_day"].tolist())
+        return list(map(TickView._make, zip(*columns)))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union["TickView", "TickBatch"]:
+        if isinstance(key, slice):
+            return TickBatch(self.data[key], self.symbols, self.exchanges)
+        if key < 0:
+            key += len(self.data)
+        if not 0 <= key < len(self.data):
+            raise IndexError("TickBatch index out of range")
+        return self.get_rows(key, key + 1)[0]
+
+    def __iter__(self) -> Iterator["TickView"]:
+        '''
+        分块构造TickView, 同一时间只有chunk_size个行对象
+        '''
+        for start in range(0, len(self.data), self.chunk_size):
+            yield from self.get_rows(start, start + self.chunk_size)
+
+
+class TickView(NamedTuple):
+    '''
+    TickBatch中单个tick的只读行对象, 字段名同TickData, 另加datetime_ns(纳秒时间戳)和trading_day(所属交易日序号)
+    不可修改, 需要修改时用to_tick()构造TickData
+    '''
+    symbol: str
+    exchange: Exchange
+    datetime: datetime
+    volume: float
+    turnover: float
+    open_interest: float
+    last_price: float
+    highest_price: float
+    lowest_price: float
+    bid_price_1: float
+    ask_price_1: float
+    bid_volume_1: float
+    ask_volume_1: float
+    datetime_ns: int
+    trading_day: int
+
+    gateway_name = ""
+
+    def to_tick(self) -> TickData:
+        '''
+        构造TickData(带上已计算的datetime_ns)
+        '''
+        return TickData(*self[:-1])
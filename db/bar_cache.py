@@ -0,0 +1,193 @@
+'''
+tick合成bar的本地缓存: 按(合约, 交易所, bar类型, 交易日)分区把由tick合成的bar存为本地列式文件, 重复读取时不再合成
+'''
+from datetime import datetime, date, time, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from datastructure.constant import Exchange, Interval
+from datastructure.object import BarData
+from datastructure.setting import SETTING
+from utils.resample import BAR_COLUMNS, resample_tick_df, resample_threshold_bars, df2bars
+from utils.utils_function import get_trading_day
+from .database import BaseDatabase, TickOverview, find_tick_overview, get_tick_fingerprint
+from .columnar import write_partition, read_partition, read_meta, remove_partition
+
+
+# 交易日的夜盘从上一个交易日18点开始, 与get_trading_day一致
+NIGHT_START: time = time(18)
+
+
+class BarCache:
+    '''
+    tick合成bar的缓存
+    1.分区粒度为交易日(夜盘归属下一个交易日): tqsdk成交量/成交额为交易日累计值, 每个交易日单独合成
+    2.每个分区记录合成时该合约tick数据的指纹(count, end), 指纹变化则分区失效重新合成
+      例外: 合成时已有更晚数据的交易日(complete)在只追加新数据(end变大)时仍然有效; 修改历史数据后需调用invalidate
+    3.interval为MINUTE时合成1分钟bar, 为VOLUME/TURNOVER/RANGE/TICK_COUNT时按threshold合成信息驱动bar(每个交易日重新开始)
+    4.只遍历[start, end]与合约tickoverview起止时间的交集, 无tick数据的合约不读取数据库
+    '''
+    def __init__(self, database: BaseDatabase, cache_path: str = None) -> None:
+        """Constructor"""
+        self.database: BaseDatabase = database
+        self.cache_path: Path = Path(cache_path or SETTING["database.bar_cache_path"])
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        self.hits: int = 0      # 命中的分区数
+        self.misses: int = 0    # 重新合成的分区数
+
+    def load_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        interval: Interval = Interval.MINUTE,
+        threshold: float = None
+    ) -> List[BarData]:
+        '''
+        读取由tick合成的bar(bar的datetime在[start, end]内)
+        '''
+        return df2bars(self.load_bar_df(symbol, exchange, start, end, interval, threshold))
+
+    def load_bar_df(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        interval: Interval = Interval.MINUTE,
+        threshold: float = None
+    ) -> pd.DataFrame:
+        '''
+        逐交易日读取缓存分区, 缺失或失效的交易日读取tick合成后写入缓存, 以DataFrame(字段见BAR_COLUMNS)返回
+        '''
+        spec: str = get_spec_name(interval, threshold)
+        overview: Optional[TickOverview] = find_tick_overview(self.database.get_tick_overview(), symbol, exchange)
+        if overview is None or overview.start is None or overview.end is None:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        fingerprint: List = get_tick_fingerprint(overview)
+
+        frames: List[pd.DataFrame] = []
+        for trading_day in get_trading_days(max(start, overview.start), min(end, overview.end)):
+            key: str = get_partition_key(symbol, exchange, spec, trading_day)
+            df: Optional[pd.DataFrame] = self.get_partition(key, fingerprint, overview.end)
+            if df is None:
+                df = self.resample_day(symbol, exchange, trading_day, interval, threshold)
+                complete: bool = get_day_end(trading_day) < overview.end
+                write_partition(self.cache_path.joinpath(key), df, {"fingerprint": fingerprint, "complete": complete})
+                self.misses += 1
+            else:
+                self.hits += 1
+            if not df.empty:
+                frames.append(df)
+
+        if not frames:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        df: pd.DataFrame = pd.concat(frames, ignore_index=True)
+        # 合成结果为datetime64[us], 分区中为datetime64[ns]: 统一后命中与否结果相同
+        df["datetime"] = df["datetime"].astype("datetime64[ns]")
+        df = df.loc[(df["datetime"] >= start) & (df["datetime"] <= end)]
+        return df.reset_index(drop=True)
+
+    def get_partition(self, key: str, fingerprint: List, end: datetime) -> Optional[pd.DataFrame]:
+        '''
+        读取缓存分区, 不存在或失效返回None
+        指纹不一致时, 合成时已完整的交易日在数据只向后追加(合约tick结束时间end晚于合成时)的情况下仍然有效
+        '''
+        path: Path = self.cache_path.joinpath(key)
+        try:
+            meta: Dict = read_meta(path)
+        except (OSError, ValueError):
+            return None
+        stored: Optional[List] = meta.get("fingerprint", None)
+        if stored != fingerprint and not (meta.get("complete", False) and pd.Timestamp(end) > pd.Timestamp(stored[1])):
+            return None     # 重新合成后write_partition覆盖失效分区
+        return read_partition(path, mmap=False)
+
+    def resample_day(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        trading_day: date,
+        interval: Interval,
+        threshold: float
+    ) -> pd.DataFrame:
+        '''
+        读取一个交易日的tick并合成bar
+        '''
+        start: datetime = datetime.combine(get_previous_weekday(trading_day), NIGHT_START)
+        end: datetime = get_day_end(trading_day)
+        tick_df: pd.DataFrame = self.database.load_tick_df(symbol, exchange, start, end)
+        if tick_df.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        if interval == Interval.MINUTE:
+            return resample_tick_df(tick_df)
+        return resample_threshold_bars(tick_df, interval, threshold)
+
+    def invalidate(self, symbol: str, exchange: Exchange) -> None:
+        '''
+        删除合约的全部缓存分区
+        '''
+        remove_partition(self.cache_path.joinpath("bar", exchange.value, symbol))
+
+    def get_statistics(self) -> Dict[str, float]:
+        '''
+        分区命中次数、重新合成次数和命中率
+        '''
+        total: int = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0
+        }
+
+
+def get_spec_name(interval: Interval, threshold: float = None) -> str:
+    '''
+    bar类型名(缓存目录名), 如1m, volume_500
+    '''
+    if interval == Interval.MINUTE:
+        return interval.value
+    if interval in (Interval.VOLUME, Interval.TURNOVER, Interval.RANGE, Interval.TICK_COUNT) and threshold is not None:
+        return f"{interval.value}_{threshold:g}"
+    raise ValueError(f"不支持的bar类型: {interval}, threshold={threshold}")
+
+
+def get_partition_key(symbol: str, exchange: Exchange, spec: str, trading_day: date) -> str:
+    '''
+    缓存分区相对路径
+    '''
+    return f"bar/{exchange.value}/{symbol}/{spec}/{trading_day.strftime('%Y%m%d')}"
+
+
+def get_previous_weekday(d: date) -> date:
+    '''
+    上一个工作日(周一 -> 上周五)
+    '''
+    d -= timedelta(days=1)
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d
+
+
+def get_day_end(trading_day: date) -> datetime:
+    '''
+    交易日的最后时刻(当日18点前)
+    '''
+    return datetime.combine(trading_day, NIGHT_START) - timedelta(microseconds=1)
+
+
+def get_trading_days(start: datetime, end: datetime) -> List[date]:
+    '''
+    [start, end]覆盖的交易日(工作日)
+    '''
+    days: List[date] = []
+    d: date = get_trading_day(start)
+    last: date = get_trading_day(end)
+    while d <= last:
+        if d.weekday() < 5:
+            days.append(d)
+        d += timedelta(days=1)
+    return days
@@ -0,0 +1,390 @@
+'''
+本地tick缓存: 包装任意BaseDatabase, 按(合约, 交易所, 日期)分区把读取过的tick数据存为本地列式文件
+'''
+import json
+from collections import OrderedDict
+from threading import RLock
+from datetime import datetime, date, time, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from datastructure.constant import Exchange, Interval
+from datastructure.object import BarData, TickData, HistoryRequest
+from utils.data_process import history_tickdata_processor
+from .database import BaseDatabase, BarOverview, TickOverview, TICK_COLUMNS, find_tick_overview, get_tick_fingerprint
+from .columnar import write_partition, read_partition, read_meta, remove_partition
+
+
+class CachedDatabase(BaseDatabase):
+    '''
+    带本地缓存的数据库
+    1.分区粒度与dolphindb的按日VALUE分区一致: 读取某一天时整天缓存
+    2.每个分区记录写入时该合约tickoverview的(count, end)作为指纹, 指纹变化则分区失效重新读取
+    3.分区总大小超过max_size时按LRU淘汰
+    4.只缓存tickoverview起止时间内的日期, 无数据的日期只在索引中记录指纹, 不写分区文件
+    5.索引的读写加锁, 可在多个线程中同时读取
+    7.删除失败(如文件被占用)的分区移出索引但仍计入总大小, 在下次LRU淘汰时重试删除
+    6.未包装的属性(如dolphindb的_save_all_history_tickdata)转发给被包装的数据库; 绕过缓存写入的数据使tickoverview指纹变化, 相关分区在下次读取时失效
+    '''
+    def __init__(self, database: BaseDatabase, cache_path: str, max_size: int) -> None:
+        self.database: BaseDatabase = database
+        self.cache_path: Path = Path(cache_path)
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        self.max_size: int = max_size
+        # LRU索引 {分区key: 字节数}, 越靠后越近访问
+        self.index_path: Path = self.cache_path.joinpath("index.json")
+        self.index: OrderedDict = OrderedDict()
+        self.empty_days: Dict[str, List] = {}      # 无数据的日期 {分区key: 指纹}
+        self.pending_deletes: Dict[str, int] = {}  # 删除失败待重试的分区 {分区key: 字节数}
+        self.total_size: int = 0
+        self.lock: RLock = RLock()
+        self.load_index()
+
+    def __getattr__(self, name: str):
+        '''
+        转发未包装的属性
+        '''
+        if name == "database":     # 构造完成前(如反序列化)避免递归
+            raise AttributeError(name)
+        return getattr(self.database, name)
+
+    def load_index(self) -> None:
+        '''
+        读取LRU索引, 索引文件不存在时扫描缓存目录重建
+        '''
+        empty_days: Dict[str, List] = {}
+        pending_deletes: Dict[str, int] = {}
+        if self.index_path.exists():
+            with open(self.index_path) as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                items: List[Tuple[str, int]] = data["partitions"]
+                empty_days = data["empty_days"]
+                pending_deletes = data.get("pending_deletes", {})
+            else:       # 旧版索引只有分区列表
+                items = data
+        else:
+            items = []
+            for meta_path in self.cache_path.glob("tick/*/*/*/meta.json"):
+                partition_path: Path = meta_path.parent
+                key: str = partition_path.relative_to(self.cache_path).as_posix()
+                size: int = sum(f.stat().st_size for f in partition_path.iterdir())
+                items.append((key, size))
+        self.index = OrderedDict(items)
+        self.empty_days = empty_days
+        self.pending_deletes = pending_deletes
+        self.total_size = sum(self.index.values()) + sum(self.pending_deletes.values())
+
+    def save_index(self) -> None:
+        with self.lock:
+            with open(self.index_path, "w") as f:
+                json.dump({
+                    "partitions": list(self.index.items()),
+                    "empty_days": self.empty_days,
+                    "pending_deletes": self.pending_deletes
+                }, f)
+
+    def save_bar_data(self, bars: List[BarData]) -> bool:
+        return self.database.save_bar_data(bars)
+
+    def save_tick_data(self, ticks: List[TickData]) -> bool:
+        result: bool = self.database.save_tick_data(ticks)
+        if ticks:
+            self.invalidate(ticks[0].symbol, ticks[0].exchange)
+        return result
+
+    def save_tick_df(self, df: pd.DataFrame) -> bool:
+        df = pd.DataFrame(df)
+        result: bool = self.database.save_tick_df(df)
+        for symbol, exchange_str in df[['symbol', 'exchange']].drop_duplicates().itertuples(index=False):
+            self.invalidate(symbol, Exchange(exchange_str))
+        return result
+
+    def load_bar_data(self, symbol: str, exchange: Exchange, interval: Interval, start: datetime, end: datetime) -> List[BarData]:
+        return self.database.load_bar_data(symbol, exchange, interval, start, end)
+
+    def load_tick_data(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> List[TickData]:
+        '''
+        读取tick数据: 优先读取本地缓存
+        '''
+        df: pd.DataFrame = self.load_tick_df(symbol, exchange, start, end)
+        if df.empty:
+            return []
+        return history_tickdata_processor.df2data(df)
+
+    def load_tick_df(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> pd.DataFrame:
+        '''
+        读取tick数据: 优先读取本地缓存, 以DataFrame(字段见TICK_COLUMNS)返回
+        '''
+        overview: Optional[TickOverview] = find_tick_overview(self.database.get_tick_overview(), symbol, exchange)
+        df: pd.DataFrame = self.load_cached_df(symbol, exchange, start, end, overview)
+        self.flush()
+        return df
+
+    def load_cached_df(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        overview: Optional[TickOverview]
+    ) -> pd.DataFrame:
+        '''
+        逐日读取缓存分区, 缺失或失效的连续日期合并为一次查询从数据库读取并写入缓存
+        overview由调用方读取(批量读取时只读一次); 不做LRU淘汰和索引保存, 由调用方读取结束后调用flush
+        '''
+        frames, missing, fingerprint = self.read_partitions(symbol, exchange, start, end, overview)
+        for days in split_continuous_days(missing):
+            frames.update(self.fetch_partitions(symbol, exchange, days, fingerprint))
+        return concat_frames(frames, start, end)
+
+    def stream_tick_data(self, symbol: str, exchange: Exchange, start: datetime, end: datetime, chunk_size: int = 100000) -> Iterator[List[TickData]]:
+        '''
+        分块读取tick数据: 在合约tickoverview起止时间内逐日读取缓存(缺失的日期从数据库读取), 每次返回不超过chunk_size条
+        overview只读取一次, LRU淘汰和索引保存在遍历结束(包括提前结束)时执行一次
+        '''
+        overview: Optional[TickOverview] = find_tick_overview(self.database.get_tick_overview(), symbol, exchange)
+        if overview is None or overview.start is None or overview.end is None:
+            return
+        end = min(end, overview.end)
+        try:
+            day_start: datetime = max(start, overview.start)
+            while day_start <= end:
+                day_end: datetime = min(datetime.combine(day_start.date() + timedelta(days=1), time()) - timedelta(microseconds=1), end)
+                df: pd.DataFrame = self.load_cached_df(symbol, exchange, day_start, day_end, overview)
+                for i in range(0, len(df), chunk_size):
+                    yield history_tickdata_processor.df2data(df.iloc[i: i + chunk_size])
+                day_start = day_end + timedelta(microseconds=1)
+        finally:
+            self.flush()
+
+    def load_tick_data_many(self, reqs: List[HistoryRequest]) -> List[List[TickData]]:
+        '''
+        批量读取tick数据, 结果顺序与reqs一致, 见load_tick_df_many
+        '''
+        return [history_tickdata_processor.df2data(df) for df in self.load_tick_df_many(reqs)]
+
+    def load_tick_df_many(self, reqs: List[HistoryRequest]) -> List[pd.DataFrame]:
+        '''
+        批量读取: 先读取各请求的缓存分区, 所有缺失的日期段合并为一次load_tick_df_many从数据库读取(dolphindb并发查询)后写入缓存
+        '''
+        overviews: List[TickOverview] = self.database.get_tick_overview()
+        results: List[Tuple[Dict[date, pd.DataFrame], List]] = []
+        fetches: List[Tuple[int, List[date]]] = []      # [(请求序号, 连续缺失日期)]
+        for i, req in enumerate(reqs):
+            overview: Optional[TickOverview] = find_tick_overview(overviews, req.symbol, req.exchange)
+            frames, missing, fingerprint = self.read_partitions(req.symbol, req.exchange, req.start, req.end, overview)
+            results.append((frames, fingerprint))
+            fetches.extend((i, days) for days in split_continuous_days(missing))
+
+        fetch_reqs: List[HistoryRequest] = [
+            HistoryRequest(reqs[i].symbol, reqs[i].exchange, *get_days_range(days)) for i, days in fetches
+        ]
+        for (i, days), df in zip(fetches, self.database.load_tick_df_many(fetch_reqs)):
+            frames, fingerprint = results[i]
+            frames.update(self.write_partitions(reqs[i].symbol, reqs[i].exchange, days, fingerprint, df))
+        self.flush()
+
+        return [concat_frames(frames, req.start, req.end) for req, (frames, _) in zip(reqs, results)]
+
+    def read_partitions(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        overview: Optional[TickOverview]
+    ) -> Tuple[Dict[date, pd.DataFrame], List[date], List]:
+        '''
+        逐日读取缓存分区, 只遍历[start, end]与合约tickoverview起止时间的交集
+        返回(已缓存的{日期: DataFrame}, 缺失或失效的日期, 指纹)
+        '''
+        frames: Dict[date, pd.DataFrame] = {}
+        missing: List[date] = []
+        fingerprint: List = get_tick_fingerprint(overview)
+        if overview is None or overview.start is None or overview.end is None:
+            return frames, missing, fingerprint
+
+        d: date = max(start, overview.start).date()
+        last: date = min(end, overview.end).date()
+        while d <= last:
+            df: Optional[pd.DataFrame] = self.get_partition(symbol, exchange, d, fingerprint)
+            if df is None:
+                missing.append(d)
+            else:
+                frames[d] = df
+            d += timedelta(days=1)
+        return frames, missing, fingerprint
+
+    def flush(self) -> None:
+        '''
+        LRU淘汰并保存索引
+        '''
+        with self.lock:
+            self.evict()
+            self.save_index()
+
+    def get_partition(self, symbol: str, exchange: Exchange, d: date, fingerprint: List) -> Optional[pd.DataFrame]:
+        '''
+        读取缓存分区, 不存在或指纹不一致返回None
+        '''
+        key: str = get_partition_key(symbol, exchange, d)
+        with self.lock:
+            if key in self.empty_days:
+                if self.empty_days[key] != fingerprint:
+                    del self.empty_days[key]
+                    return None
+                return pd.DataFrame(columns=TICK_COLUMNS)
+            if key not in self.index:
+                return None
+            path: Path = self.cache_path.joinpath(key)
+            try:
+                meta: Dict = read_meta(path)
+            except (OSError, ValueError):
+                meta = {}
+            if meta.get("fingerprint", None) != fingerprint:
+                self.remove(key)
+                return None
+            self.index.move_to_end(key)
+            return read_partition(path)
+
+    def fetch_partitions(self, symbol: str, exchange: Exchange, days: List[date], fingerprint: List) -> Dict[date, pd.DataFrame]:
+        '''
+        从数据库读取连续多日数据并写入缓存, 数据库查询不加锁, 多个线程可同时查询
+        '''
+        df: pd.DataFrame = self.database.load_tick_df(symbol, exchange, *get_days_range(days))
+        return self.write_partitions(symbol, exchange, days, fingerprint, df)
+
+    def write_partitions(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        days: List[date],
+        fingerprint: List,
+        df: pd.DataFrame
+    ) -> Dict[date, pd.DataFrame]:
+        '''
+        连续多日数据按日拆分写入缓存, 无数据的日期只记录指纹
+        '''
+        if df.empty:
+            groups: Dict[date, pd.DataFrame] = {}
+        else:
+            df = df.loc[:, TICK_COLUMNS]
+            groups = {d: group.reset_index(drop=True) for d, group in df.groupby(df["datetime"].dt.date)}
+
+        frames: Dict[date, pd.DataFrame] = {}
+        with self.lock:
+            for d in days:
+                key: str = get_partition_key(symbol, exchange, d)
+                day_df: Optional[pd.DataFrame] = groups.get(d, None)
+                if day_df is None:
+                    self.remove(key)
+                    self.empty_days[key] = fingerprint
+                    frames[d] = pd.DataFrame(columns=TICK_COLUMNS)
+                    continue
+                self.empty_days.pop(key, None)
+                size: int = write_partition(self.cache_path.joinpath(key), day_df, {"fingerprint": fingerprint})
+                self.total_size += size - self.index.pop(key, 0) - self.pending_deletes.pop(key, 0)
+                self.index[key] = size
+                frames[d] = day_df
+        return frames
+
+    def remove(self, key: str) -> None:
+        '''
+        删除缓存分区, 删除失败时移入pending_deletes(仍计入总大小)等待重试
+        '''
+        with self.lock:
+            if key in self.index:
+                self.pending_deletes[key] = self.index.pop(key)
+                self.retry_delete(key)
+
+    def retry_delete(self, key: str) -> bool:
+        '''
+        删除pending_deletes中的分区, 成功返回True
+        '''
+        with self.lock:
+            try:
+                remove_partition(self.cache_path.joinpath(key))
+            except OSError:
+                return False
+            self.total_size -= self.pending_deletes.pop(key)
+            return True
+
+    def evict(self) -> None:
+        '''
+        LRU淘汰: 先重试删除失败的分区, 再删除最久未访问的分区直到总大小不超过max_size
+        '''
+        with self.lock:
+            for key in list(self.pending_deletes):
+                self.retry_delete(key)
+            while self.total_size > self.max_size and self.index:
+                key, _ = next(iter(self.index.items()))
+                self.remove(key)
+
+    def invalidate(self, symbol: str, exchange: Exchange) -> None:
+        '''
+        删除合约的全部缓存分区
+        '''
+        prefix: str = f"tick/{exchange.value}/{symbol}/"
+        with self.lock:
+            for key in [key for key in self.index if key.startswith(prefix)]:
+                self.remove(key)
+            for key in [key for key in self.empty_days if key.startswith(prefix)]:
+                del self.empty_days[key]
+            self.save_index()
+
+    def delete_bar_data(self, symbol: str, exchange: Exchange, interval: Interval) -> int:
+        return self.database.delete_bar_data(symbol, exchange, interval)
+
+    def delete_tick_data(self, symbol: str, exchange: Exchange) -> int:
+        self.invalidate(symbol, exchange)
+        return self.database.delete_tick_data(symbol, exchange)
+
+    def get_bar_overview(self) -> List[BarOverview]:
+        return self.database.get_bar_overview()
+
+    def get_tick_overview(self) -> List[TickOverview]:
+        return self.database.get_tick_overview()
+
+
+def get_partition_key(symbol: str, exchange: Exchange, d: date) -> str:
+    '''
+    缓存分区相对路径
+    '''
+    return f"tick/{exchange.value}/{symbol}/{d.strftime('%Y%m%d')}"
+
+
+def get_days_range(days: List[date]) -> Tuple[datetime, datetime]:
+    '''
+    连续日期 -> 查询时间区间[首日0点, 末日24点)
+    '''
+    start: datetime = datetime.combine(days[0], time())
+    end: datetime = datetime.combine(days[-1] + timedelta(days=1), time()) - timedelta(microseconds=1)
+    return start, end
+
+
+def concat_frames(frames: Dict[date, pd.DataFrame], start: datetime, end: datetime) -> pd.DataFrame:
+    '''
+    按日期顺序合并分区数据并截取[start, end]
+    '''
+    data: List[pd.DataFrame] = [frames[d] for d in sorted(frames) if not frames[d].empty]
+    if not data:
+        return pd.DataFrame(columns=TICK_COLUMNS)
+    df: pd.DataFrame = pd.concat(data, ignore_index=True)
+    df = df.loc[(df["datetime"] >= start) & (df["datetime"] <= end)]
+    return df.reset_index(drop=True)
+
+
+def split_continuous_days(days: List[date]) -> List[List[date]]:
+    '''
+    把日期列表拆分为若干段连续日期
+    '''
+    groups: List[List[date]] = []
+    for d in days:
+        if groups and d - groups[-1][-1] == timedelta(days=1):
+            groups[-1].append(d)
+        else:
+            groups.append([d])
+    return groups
@@ -0,0 +1,94 @@
+'''
+本地列式分区文件
+每个分区为一个目录: 每列一个.npy文件 + meta.json(列顺序、行数、字符串列的取值表、附加信息)
+读取时可内存映射(mmap), 字符串列按编码存储
+'''
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+META_FILE: str = "meta.json"
+
+
+def write_partition(path: Union[str, Path], df: pd.DataFrame, meta: Dict[str, Any] = None) -> int:
+    '''
+    把DataFrame写入分区目录, 返回分区占用字节数
+    先写入临时目录再重命名, 读取方不会看到写了一半的分区
+    '''
+    path = Path(path)
+    tmp_path: Path = path.with_name(path.name + f".tmp{os.getpid()}")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    categories: Dict[str, List[str]] = {}
+    for column in df.columns:
+        values: np.ndarray = df[column].to_numpy()
+        if values.dtype == object:  # 字符串列: 存编码
+            codes, uniques = pd.factorize(df[column])
+            values = codes.astype(np.int32)
+            categories[column] = [str(v) for v in uniques]
+        elif np.issubdtype(values.dtype, np.datetime64):
+            values = values.astype("datetime64[ns]")
+        np.save(tmp_path.joinpath(f"{column}.npy"), values)
+
+    full_meta: Dict[str, Any] = {
+        "columns": list(df.columns),
+        "length": len(df),
+        "categories": categories,
+    }
+    full_meta.update(meta or {})
+    with open(tmp_path.joinpath(META_FILE), "w") as f:
+        json.dump(full_meta, f)
+
+    if path.exists():
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return partition_size(path)
+
+
+def read_partition(path: Union[str, Path], mmap: bool = True) -> pd.DataFrame:
+    '''
+    读取分区目录为DataFrame
+    '''
+    path = Path(path)
+    meta: Dict[str, Any] = read_meta(path)
+    mmap_mode: str = "r" if mmap else None
+    data: Dict[str, np.ndarray] = {}
+    for column in meta["columns"]:
+        values: np.ndarray = np.load(path.joinpath(f"{column}.npy"), mmap_mode=mmap_mode)
+        if column in meta["categories"]:
+            values = np.asarray(meta["categories"][column], dtype=object)[values]
+        data[column] = values
+    return pd.DataFrame(data, columns=meta["columns"])
+
+
+def read_meta(path: Union[str, Path]) -> Dict[str, Any]:
+    '''
+    读取分区meta信息
+    '''
+    with open(Path(path).joinpath(META_FILE)) as f:
+        return json.load(f)
+
+
+def partition_size(path: Union[str, Path]) -> int:
+    '''
+    分区占用字节数
+    '''
+    return sum(f.stat().st_size for f in Path(path).iterdir())
+
+
+def remove_partition(path: Union[str, Path]) -> None:
+    '''
+    删除分区目录, 目录不存在视为已删除, 其他错误(如文件被占用)抛出OSError
+    '''
+    try:
+        shutil.rmtree(path)
+    except FileNotFoundError:
+        pass
@@ -1,16 +1,39 @@
 '''
 数据库相关数据类型、父类和get_database()函数用于创建实例
 '''
+import os
 from abc import ABC, abstractmethod
-from datetime import datetime
-from typing import List
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional, Union
 from dataclasses import dataclass
+from importlib import import_module
+
+import numpy as np
+import pandas as pd
 
 from datastructure.constant import Interval, Exchange
-from datastructure.object import BarData, TickData, ContractData
+from datastructure.object import BarData, TickData, ContractData, HistoryRequest
+from datastructure.tick_batch import TickBatch
 from datastructure.setting import SETTING
+from utils.data_process import history_tickdata_processor
 
 
+# tick数据表字段(与TickData字段一致)
+TICK_COLUMNS: List[str] = [
+    "symbol", "exchange", "datetime", "volume", "turnover", "open_interest", "last_price",
+    "highest_price", "lowest_price", "bid_price_1", "ask_price_1", "bid_volume_1", "ask_volume_1"
+]
+
+def ticks_to_df(ticks: List[TickData]) -> pd.DataFrame:
+    '''
+    list of TickData -> DataFrame(字段见TICK_COLUMNS, exchange为字符串)
+    '''
+    data: Dict[str, list] = {column: [getattr(tick, column) for tick in ticks] for column in TICK_COLUMNS}
+    data['exchange'] = [tick.exchange.value for tick in ticks]
+    df: pd.DataFrame = pd.DataFrame(data, columns=TICK_COLUMNS)
+    if ticks:
+        df['datetime'] = pd.to_datetime(df['datetime'])
+    return df
 
 @dataclass
 class BarOverview:
@@ -36,19 +59,37 @@ class TickOverview:
     end: datetime = None
 
 
+def find_tick_overview(overviews: List[TickOverview], symbol: str, exchange: Exchange) -> Optional[TickOverview]:
+    '''
+    在tickoverview列表中查找合约, 不存在返回None
+    '''
+    for overview in overviews:
+        if overview.symbol == symbol and overview.exchange == exchange:
+            return overview
+    return None
+
+def get_tick_fingerprint(overview: Optional[TickOverview]) -> List:
+    '''
+    tickoverview -> 指纹(count, end)
+    '''
+    if overview is None:
+        return [0, ""]
+    return [int(overview.count), str(overview.end)]
+
+
 class BaseDatabase(ABC): # 提供2个合约、日bar 分钟bar tick 
     '''
     数据库抽象类
     '''
     @abstractmethod
-    def save_bar_data(self, bars: List[BarData], stream: bool = False) -> bool:
+    def save_bar_data(self, bars: List[BarData]) -> bool:
         '''
         保存bar数据到db
         '''
         pass
 
     @abstractmethod
-    def save_tick_data(self, ticks: List[TickData], strean: bool = False) -> bool:
+    def save_tick_data(self, ticks: List[TickData]) -> bool:
         '''
         保存tick数据到db
         '''
@@ -68,6 +109,65 @@ class BaseDatabase(ABC): # 提供2个合约、日bar 分钟bar tick
         '''
         pass
 
+    def load_tick_data_many(self, reqs: List[HistoryRequest]) -> List[List[TickData]]:
+        '''
+        读取多个合约/时间段的tick数据, 结果顺序与reqs一致
+        支持并发的子类可重写
+        '''
+        return [self.load_tick_data(req.symbol, req.exchange, req.start, req.end) for req in reqs]
+
+    def load_tick_df_many(self, reqs: List[HistoryRequest]) -> List[pd.DataFrame]:
+        '''
+        读取多个合约/时间段的tick数据, 以DataFrame(字段见TICK_COLUMNS)返回, 结果顺序与reqs一致
+        支持并发的子类可重写
+        '''
+        return [self.load_tick_df(req.symbol, req.exchange, req.start, req.end) for req in reqs]
+
+    def stream_tick_data(self, symbol: str, exchange: Exchange, start: datetime, end: datetime, chunk_size: int = 100000) -> Iterator[List[TickData]]:
+        '''
+        分块读取tick数据: 逐日读取, 每次返回不超过chunk_size条, 内存占用与读取区间长度无关
+        支持服务端游标的子类可重写
+        '''
+        day_start: datetime = start
+        while day_start <= end:
+            day_end: datetime = min(datetime.combine(day_start.date() + timedelta(days=1), time()) - timedelta(microseconds=1), end)
+            df: pd.DataFrame = self.load_tick_df(symbol, exchange, day_start, day_end)
+            for i in range(0, len(df), chunk_size):
+                yield history_tickdata_processor.df2data(df.iloc[i: i + chunk_size])
+            day_start = day_end + timedelta(microseconds=1)
+
+    def load_tick_df(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> pd.DataFrame:
+        '''
+        从db读取tick数据, 以DataFrame(字段见TICK_COLUMNS)返回
+        子类可直接返回列式结果, 避免构造TickData
+        '''
+        ticks: List[TickData] = self.load_tick_data(symbol, exchange, start, end)
+        return ticks_to_df(ticks)
+
+    def load_tick_batch(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> TickBatch:
+        '''
+        从db读取tick数据, 以列式TickBatch返回, 不构造TickData
+        '''
+        return TickBatch.from_df(self.load_tick_df(symbol, exchange, start, end))
+
+    def save_tick_df(self, df: Union[pd.DataFrame, Dict[str, np.ndarray]]) -> bool:
+        '''
+        批量保存列式tick数据(DataFrame或{字段: 数组}, 字段见TICK_COLUMNS), 可包含多个合约
+        支持列式写入的子类可重写, 避免构造TickData
+        '''
+        df = pd.DataFrame(df)
+        if df.empty:
+            return False
+        for _, group in df.groupby(['symbol', 'exchange'], sort=False):
+            self.save_tick_data(history_tickdata_processor.df2data(group))
+        return True
+
+    def get_tick_fingerprint(self, symbol: str, exchange: Exchange) -> List:
+        '''
+        合约tick数据的指纹(count, end), 数据更新后随之变化, 用于判断本地缓存是否失效
+        '''
+        return get_tick_fingerprint(find_tick_overview(self.get_tick_overview(), symbol, exchange))
+
     @abstractmethod
     def delete_bar_data(self, symbol: str, exchange: Exchange, interval: Interval) -> int:
         '''
@@ -111,22 +211,31 @@ class BaseDatabase(ABC): # 提供2个合约、日bar 分钟bar tick
     #     pass
 
 database: BaseDatabase = None
+database_pid: int = None
 
 def get_database() -> BaseDatabase:
     '''
-    创建或返回database, 确保只有一个
+    创建或返回database, 确保每个进程只有一个(子进程不复用父进程的连接)
     '''
     
-    global database
-    if database:
+    global database, database_pid
+    if database and database_pid == os.getpid():
         return database
     
+    # 根据设置选择数据库后端: db/to_{database.name}.py
+    database_name: str = SETTING["database.name"]
     try:
-        from .to_dolphindb import Database
+        module = import_module(f"db.to_{database_name}")
     except ModuleNotFoundError:
         print("不支持此数据库")
         return None
     
-    database = Database()
+    database = module.Database()
+    database_pid = os.getpid()
+
+    # 本地缓存(本地文件数据库无需缓存)
+    if SETTING["database.cache"] and database_name != "file":
+        from .cache import CachedDatabase
+        database = CachedDatabase(database, SETTING["database.cache_path"], SETTING["database.cache_size"])
     return database
 
@@ -0,0 +1,168 @@
+'''
+历史数据批量导入
+多进程解析清洗tqsdk csv文件, 主进程作为唯一写入方把解析结果合并为大批次写入数据库
+已写入的文件记录在manifest中(路径、大小、修改时间), 中断后重新运行跳过已完成且未变化的文件
+'''
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from utils.data_process import history_tickdata_processor
+from .database import BaseDatabase, TICK_COLUMNS
+
+
+def get_file_stat(csv_path: str) -> Tuple[int, float]:
+    '''
+    文件(大小, 修改时间), 用于判断文件导入后是否变化
+    '''
+    stat: os.stat_result = os.stat(csv_path)
+    return stat.st_size, stat.st_mtime
+
+
+def parse_csv(csv_path: str) -> Tuple[str, Tuple[int, float], pd.DataFrame]:
+    '''
+    子进程: 解析清洗单个csv文件, 解析前记录文件状态
+    '''
+    stat: Tuple[int, float] = get_file_stat(csv_path)
+    df: pd.DataFrame = history_tickdata_processor.tqsdk_data_process(csv_path)
+    return csv_path, stat, df.loc[:, TICK_COLUMNS]
+
+
+class IngestManifest:
+    '''
+    导入记录: 每行一个已写入数据库的文件{"path", "size", "mtime"}, 只追加写入
+    '''
+    def __init__(self, path: str) -> None:
+        self.path: Path = Path(path)
+        self.completed: Dict[str, Tuple[int, float]] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        d: Dict = json.loads(line)
+                    except ValueError:  # 中断时写了一半的行
+                        continue
+                    self.completed[d["path"]] = (d["size"], d["mtime"])
+
+    def is_completed(self, csv_path: str) -> bool:
+        '''
+        文件已导入且之后未修改
+        '''
+        stat: Optional[Tuple[int, float]] = self.completed.get(csv_path, None)
+        return stat is not None and stat == get_file_stat(csv_path)
+
+    def mark_completed(self, files: List[Tuple[str, Tuple[int, float]]]) -> None:
+        '''
+        记录已写入数据库的文件
+        '''
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            for csv_path, (size, mtime) in files:
+                f.write(json.dumps({"path": csv_path, "size": size, "mtime": mtime}) + "\n")
+                self.completed[csv_path] = (size, mtime)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class CsvIngestor:
+    '''
+    csv批量导入
+    1.进程池并行执行tqsdk_data_process, 同时在途的文件数不超过2倍进程数, 控制内存占用
+    2.主进程是唯一写入方: 累积到batch_rows行后调用一次save_tick_df, 写入成功后才记入manifest
+    3.解析失败的文件打印错误并跳过, 不记入manifest, 下次运行重试
+    '''
+    def __init__(self, database: BaseDatabase, manifest_path: str, workers: int = None, batch_rows: int = 1000000) -> None:
+        self.database: BaseDatabase = database
+        self.manifest: IngestManifest = IngestManifest(manifest_path)
+        self.workers: int = workers or os.cpu_count()
+        self.batch_rows: int = batch_rows
+
+        # 当前批次
+        self.frames: List[pd.DataFrame] = []
+        self.batch_files: List[Tuple[str, Tuple[int, float]]] = []
+        self.batch_count: int = 0
+
+        # 统计
+        self.total_files: int = 0
+        self.done_files: int = 0
+        self.failed_files: List[str] = []
+        self.total_rows: int = 0
+        self.total_bytes: int = 0
+        self.start_time: float = 0
+
+    def run(self, csv_paths: List[str]) -> bool:
+        '''
+        导入文件列表, 全部成功返回True
+        '''
+        todo: List[str] = [csv_path for csv_path in csv_paths if not self.manifest.is_completed(csv_path)]
+        self.total_files = len(todo)
+        self.write_log(f"共{len(csv_paths)}个文件, 已导入{len(csv_paths) - len(todo)}个, 待导入{len(todo)}个, 进程数{self.workers}")
+        self.start_time = time.perf_counter()
+
+        with ProcessPoolExecutor(self.workers) as executor:
+            paths: Iterator[str] = iter(todo)
+            pending: Dict[Future, str] = {}
+            while True:
+                while len(pending) < self.workers * 2:
+                    csv_path: Optional[str] = next(paths, None)
+                    if csv_path is None:
+                        break
+                    pending[executor.submit(parse_csv, csv_path)] = csv_path
+                if not pending:
+                    break
+
+                done: Set[Future] = wait(pending, return_when=FIRST_COMPLETED)[0]
+                for future in done:
+                    csv_path: str = pending.pop(future)
+                    try:
+                        csv_path, stat, df = future.result()
+                    except Exception as e:
+                        self.failed_files.append(csv_path)
+                        self.write_log(f"解析失败 {csv_path}: {e!r}")
+                        continue
+                    self.add(csv_path, stat, df)
+
+        self.flush()
+        self.write_log(f"导入完成, 失败{len(self.failed_files)}个文件")
+        return not self.failed_files
+
+    def add(self, csv_path: str, stat: Tuple[int, float], df: pd.DataFrame) -> None:
+        '''
+        解析结果加入当前批次, 达到batch_rows行时写入
+        '''
+        if not df.empty:
+            self.frames.append(df)
+            self.batch_count += len(df)
+        self.batch_files.append((csv_path, stat))
+        if self.batch_count >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        '''
+        写入当前批次并记入manifest
+        '''
+        if not self.batch_files:
+            return
+        if self.frames:
+            self.database.save_tick_df(pd.concat(self.frames, ignore_index=True))
+        self.manifest.mark_completed(self.batch_files)
+
+        self.done_files += len(self.batch_files)
+        self.total_rows += self.batch_count
+        self.total_bytes += sum(size for _, (size, _) in self.batch_files)
+        self.frames, self.batch_files, self.batch_count = [], [], 0
+
+        elapsed: float = max(time.perf_counter() - self.start_time, 1e-9)
+        self.write_log(
+            f"{self.done_files}/{self.total_files}个文件, {self.total_rows}行, "
+            f"{self.total_rows / elapsed:.0f}行/秒, {self.total_bytes / elapsed / 1024 ** 2:.1f}MB/秒"
+        )
+
+    def write_log(self, msg: str) -> None:
+        print(f"{datetime.now()} ingest: {msg}")
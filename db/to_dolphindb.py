@@ -1,5 +1,10 @@
-from typing import Dict, List
+from typing import Dict, List, Iterator, Union
 from datetime import datetime
+from queue import Queue, Empty
+from threading import Lock
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import time
 
 import numpy as np
 import pandas as pd
@@ -7,9 +12,10 @@ import dolphindb as ddb
 import dolphindb.settings as keys
 
 from datastructure.constant import Exchange, Interval
-from datastructure.object import BarData, TickData
+from datastructure.object import BarData, TickData, HistoryRequest
 from datastructure.setting import SETTING
-from .database import BaseDatabase, BarOverview, TickOverview
+from .database import BaseDatabase, BarOverview, TickOverview, TICK_COLUMNS, ticks_to_df
+from .ingest import CsvIngestor
 
 
 from utils.data_process import history_tickdata_processor
@@ -18,6 +24,144 @@ from utils.data_process import history_tickdata_processor
 from .dolphindb_script import CREATE_TICK_DATABASE_SCRIPT, CREATE_TICK_TABLE_SCRIPT, CREATE_TICKOVERVIEW_TABLE_SCRIPT
 
 
+# tick查询从服务端读取的字段: symbol/exchange由查询条件确定, 不随每行传输, 读取后在本地补上
+TICK_QUERY_COLUMNS: List[str] = [column for column in TICK_COLUMNS if column not in ("symbol", "exchange")]
+
+
+class SessionPool:
+    '''
+    dolphindb连接池
+    1.线程安全地借出/归还session, 最多创建size个连接
+    2.借出前检查连接: 已关闭或空闲超过health_check_interval秒且ping失败的连接会重连
+    '''
+    def __init__(self, host: str, port: int, user: str, password: str, size: int = 4, health_check_interval: float = 60) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.user: str = user
+        self.password: str = password
+        self.size: int = size
+        self.health_check_interval: float = health_check_interval
+
+        self._idle: Queue = Queue()                 # 空闲连接
+        self._last_used: Dict[int, float] = {}      # {id(session): 最近归还时间}
+        self._created: int = 0                      # 已创建连接数
+        self._lock: Lock = Lock()
+
+    def new_session(self) -> ddb.session:
+        '''
+        创建并连接session
+        '''
+        session = ddb.session()
+        session.connect(self.host, self.port, self.user, self.password)
+        return session
+
+    def acquire(self, timeout: float = None) -> ddb.session:
+        '''
+        借出session: 优先使用空闲连接, 未达上限则新建, 否则等待归还
+        '''
+        try:
+            session = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                create: bool = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                return self.open_slot()
+            session = self._idle.get(timeout=timeout)
+
+        if not self.is_healthy(session):
+            self.close_session(session)
+            session = self.open_slot()
+        return session
+
+    def open_slot(self) -> ddb.session:
+        '''
+        为已计入_created的连接名额新建session, 连接失败时释放名额
+        '''
+        try:
+            return self.new_session()
+        except BaseException:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def release(self, session: ddb.session) -> None:
+        '''
+        归还session
+        '''
+        self._last_used[id(session)] = time.monotonic()
+        self._idle.put(session)
+
+    def discard(self, session: ddb.session) -> None:
+        '''
+        丢弃损坏的session, 之后按需新建
+        '''
+        self.close_session(session)
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def session(self) -> Iterator[ddb.session]:
+        '''
+        with pool.session() as session: 借出并自动归还
+        任何退出方式都会归还或丢弃session: 正常结束和生成器关闭(提前结束遍历)时归还,
+        抛出异常时ping失败则丢弃, KeyboardInterrupt等中断时连接状态未知, 直接丢弃
+        '''
+        session = self.acquire()
+        broken: bool = True
+        try:
+            yield session
+            broken = False
+        except GeneratorExit:
+            broken = False
+            raise
+        except Exception:
+            broken = not self.ping(session)
+            raise
+        finally:
+            if broken:
+                self.discard(session)
+            else:
+                self.release(session)
+
+    def is_healthy(self, session: ddb.session) -> bool:
+        '''
+        连接检查: 空闲时间较短时只检查是否关闭, 否则ping服务端
+        '''
+        if session.isClosed():
+            return False
+        idle: float = time.monotonic() - self._last_used.get(id(session), 0)
+        if idle < self.health_check_interval:
+            return True
+        return self.ping(session)
+
+    def ping(self, session: ddb.session) -> bool:
+        try:
+            session.run("1")
+            return True
+        except Exception:
+            return False
+
+    def close_session(self, session: ddb.session) -> None:
+        self._last_used.pop(id(session), None)
+        try:
+            if not session.isClosed():
+                session.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        '''
+        关闭所有空闲连接
+        '''
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except Empty:
+                break
+            self.discard(session)
+
 
 class Database(BaseDatabase):
     '''
@@ -33,9 +177,8 @@ class Database(BaseDatabase):
         self.port: str = SETTING["database.port"]
         self.db_paths: Dict[str, str] = {"tick_db": "dfs://tick_db", "bar_db": "dfs://bar_db"}
         self.tb_names: Dict[str, str] = {"tick_tb": "tick", "bar_tb": "bar", "tickoverview_tb": "tickoverview", "bar_overview_tb": "baroverview"} # 见dolpindb_script
-        # 连接数据库(需提前开启db server)
-        self.session = ddb.session()
-        self.session.connect(self.host, self.port, self.user, self.password)
+        # 连接池(需提前开启db server)
+        self.pool: SessionPool = SessionPool(self.host, self.port, self.user, self.password, SETTING["database.pool_size"])
 
         # 初始化数据库和数据表
         self.init_db()
@@ -44,8 +187,7 @@ class Database(BaseDatabase):
         '''
         析构函数
         '''
-        if not self.session.isClosed():
-            self.session.close()
+        self.pool.close()
 
     def init_db(self):
         self.init_tick_db()
@@ -54,108 +196,104 @@ class Database(BaseDatabase):
     def init_tick_db(self):
         db_path: str = self.db_paths["tick_db"]
         # 创建tick数据库&数据表, 按日分区， 预设数据从20100101到20301230
-        if not self.session.existsDatabase(db_path):
-            self.session.run(CREATE_TICK_DATABASE_SCRIPT)
-            self.session.run(CREATE_TICK_TABLE_SCRIPT)
-            self.session.run(CREATE_TICKOVERVIEW_TABLE_SCRIPT)
-            print('db inited')
+        with self.pool.session() as session:
+            if not session.existsDatabase(db_path):
+                session.run(CREATE_TICK_DATABASE_SCRIPT)
+                session.run(CREATE_TICK_TABLE_SCRIPT)
+                session.run(CREATE_TICKOVERVIEW_TABLE_SCRIPT)
+                print('db inited')
     
     def init_bar_db(self):
         pass
     
     
-    def save_bar_data(self, bars: List[BarData], stream: bool = False) -> bool:
+    def save_bar_data(self, bars: List[BarData]) -> bool:
         '''
         保存bar数据到db
         '''
         pass
 
 
-    def save_tick_data(self, ticks: List[TickData], stream: bool = False) -> bool:
+    def save_tick_data(self, ticks: List[TickData]) -> bool:
         '''
         保存(一个csv文件中的)tick数据到db
-        # TODO: 用TSDB, 重复写入处理(keepDuplicate)
+        '''
+        if not ticks:
+            return False
+        return self.save_tick_df(ticks_to_df(ticks))
+
+    def save_tick_df(self, df: Union[pd.DataFrame, Dict[str, np.ndarray]], batch_size: int = 1000000) -> bool:
+        '''
+        批量写入列式tick数据(可包含多个合约)
+        1.每batch_size行upsert一次
+        2.按本批数据的(min, max, count)增量更新tickoverview: 本批数据全部晚于已有数据时直接累加条数,
+          与已有数据时间重叠时, 写入前读取该合约在本批时间范围内已有的时间戳(只扫描对应分区), 条数加上其中没有的时间戳个数
+        3.tickoverview按(symbol, exchange)精确匹配读取和删除
         '''
         import warnings # 屏蔽userwarning
         warnings.filterwarnings("ignore")
 
-        db_path: str = self.db_paths['tick_db']
-        tb_name: str = self.tb_names['tick_tb']
-        data: List[Dict] = []
-        
-        # 写入tick分布式数据库中
-        for tick in ticks:
-            # dt = np.datetime64(convert_tz(tick.datetime)) # 为什么要convert_tz
-            # dt = convert_tz(tick.datetime)
-            # dt = np.datetime64(tick.datetime)
-            dt = tick.datetime
-            d: dict = {
-            'symbol': tick.symbol,
-            'exchange': tick.exchange.value,
-            'datetime': dt,
-            'volume': tick.volume,
-            'turnover': tick.turnover,
-            'open_interest': tick.open_interest,
-            'last_price': tick.last_price,
-            'highest_price': tick.highest_price,
-            'lowest_price': tick.lowest_price,
-            'bid_price_1': tick.bid_price_1,
-            'ask_price_1': tick.ask_price_1,
-            'bid_volume_1': tick.bid_volume_1,
-            'ask_volume_1': tick.ask_volume_1
-            }
-            data.append(d)
-        df: pd.DataFrame = pd.DataFrame.from_records(data)
-        # 剔除空dataframe
+        df = pd.DataFrame(df)
         if df.empty:
             return False
-        
-        upsert = ddb.tableUpsert(dbPath=db_path, tableName=tb_name, ddbSession=self.session, keyColNames=['symbol', 'exchange', 'datetime'])
-        upsert.upsert(df)
-
-        # 读取主键信息
-        tick: TickData = ticks[0]
-        symbol: str = tick.symbol
-        exchange: Exchange = tick.exchange
-        # 计算已有tick数据的汇总
-        overview_tb_name = self.tb_names['tickoverview_tb']
-        overview_table = self.session.loadTable(tableName=overview_tb_name, dbPath=db_path)
-        overview = pd.DataFrame(
-            overview_table.select('*').where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').toDF()
-        )
-        if overview.empty: # 首次存入数据
-            start: datetime = ticks[0].datetime # np.datetime64(ticks[0].datetime)
-            end: datetime = ticks[-1].datetime # np.datetime64(ticks[-1].datetime)
-            count: int = len(ticks)
-        elif stream: # 记录行情数据---待完善
-            start: datetime = overview['start'][0]
-            end: datetime = ticks[-1].datetime
-            count: int = overview['count'][0] + len(ticks)
-        else: # 补充已有数据
-            start: datetime = min(overview['start'][0], ticks[0].datetime)
-            end: datetime = max(overview['end'][0], ticks[-1].datetime)
-            tick_tb = self.session.loadTable(tableName=tb_name, dbPath=db_path)
-            df_count: pd.DataFrame = tick_tb.select('count(*)').where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').toDF()
-            count: int = df_count['count'][0]
-            # 删除原汇总数据
-            overview_table.delete().where(f"symbol=`{symbol}").where(f"exchange=`{exchange.value}").execute()
-            # print("delete")
-        # 更新tick汇总数据
-        data: List[Dict] = []
-        dt = np.datetime64(datetime.now()) # 数据上传时间 --- 用于分区
-        d: Dict = {
-            "symbol": symbol,
-            "exchange": exchange.value,
-            "count": count,
-            "start": start,
-            "end": end,
-            "datetime": dt
-        }
-        data.append(d)
-        df: pd.DataFrame = pd.DataFrame.from_records(data)
-        upsert = ddb.tableUpsert(dbPath=db_path, tableName=overview_tb_name, ddbSession=self.session, keyColNames=['symbol', 'exchange', 'datetime'])
-        upsert.upsert(df)
-        
+        df = df.loc[:, TICK_COLUMNS]
+        df['datetime'] = pd.to_datetime(df['datetime'])
+
+        db_path: str = self.db_paths['tick_db']
+        tb_name: str = self.tb_names['tick_tb']
+        overview_tb_name: str = self.tb_names['tickoverview_tb']
+        with self.pool.session() as session:
+            # 本批数据汇总
+            groups = df.groupby(['symbol', 'exchange'])
+            summary: pd.DataFrame = groups['datetime'].agg(['min', 'max']).reset_index()
+            pairs: str = get_pairs_condition(summary['symbol'], summary['exchange'])
+            # 已有汇总
+            overview_table = session.loadTable(tableName=overview_tb_name, dbPath=db_path)
+            overview: pd.DataFrame = overview_table.select('*').where(pairs).toDF()
+            old: Dict = {(row.symbol, row.exchange): row for row in overview.itertuples(index=False)}
+
+            data: List[Dict] = []
+            dt = np.datetime64(datetime.now()) # 数据上传时间 --- 用于分区
+            tick_tb = session.loadTable(tableName=tb_name, dbPath=db_path)
+            for row in summary.itertuples(index=False):
+                datetimes: pd.Series = groups.get_group((row.symbol, row.exchange))['datetime'].drop_duplicates()
+                prev = old.get((row.symbol, row.exchange), None)
+                if prev is None: # 首次存入数据
+                    start, end, count = row.min, row.max, len(datetimes)
+                elif row.min > prev.end: # 追加数据
+                    start, end, count = prev.start, row.max, prev.count + len(datetimes)
+                else: # 补充已有数据: 已存在的时间戳会被覆盖, 不计入新增条数
+                    start, end = min(prev.start, row.min), max(prev.end, row.max)
+                    existing: pd.DataFrame = (
+                        tick_tb.select('datetime')
+                        .where(f'datetime>={to_ddb_timestamp(row.min)}')
+                        .where(f'datetime<={to_ddb_timestamp(row.max)}')
+                        .where(f'symbol="{row.symbol}"')
+                        .where(f'exchange="{row.exchange}"')
+                        .toDF()
+                    )
+                    count = prev.count + int((~datetimes.isin(pd.to_datetime(existing['datetime']))).sum())
+                d: Dict = {
+                    "symbol": row.symbol,
+                    "exchange": row.exchange,
+                    "count": int(count),
+                    "start": start,
+                    "end": end,
+                    "datetime": dt
+                }
+                data.append(d)
+
+            # 写入tick分布式数据库中
+            upsert = ddb.tableUpsert(dbPath=db_path, tableName=tb_name, ddbSession=session, keyColNames=['symbol', 'exchange', 'datetime'])
+            for i in range(0, len(df), batch_size):
+                upsert.upsert(df.iloc[i: i + batch_size])
+
+            # 删除原汇总数据, 写入新汇总数据
+            if old:
+                overview_table.delete().where(pairs).execute()
+            upsert = ddb.tableUpsert(dbPath=db_path, tableName=overview_tb_name, ddbSession=session, keyColNames=['symbol', 'exchange', 'datetime'])
+            upsert.upsert(pd.DataFrame.from_records(data))
+
         return True
 
     
@@ -170,23 +308,73 @@ class Database(BaseDatabase):
         '''
         从db读取tick数据, 不输入开始结束日期则读取全部数据
         '''
-        db_path: str = self.db_paths['tick_db']
-        tb_name: str = self.tb_names['tick_tb']
-        # 读取数据df
-        table = self.session.loadTable(tableName=tb_name, dbPath=db_path)
-        whole_df: pd.DataFrame = table.select('*').where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').toDF()
-        df:pd.DataFrame = whole_df.loc[(whole_df['datetime'] >= start) & (whole_df['datetime'] <= end),:]
+        df: pd.DataFrame = self.load_tick_df(symbol, exchange, start, end)
         if df.empty:
             return []
-        df.set_index("datetime", inplace=True)
-        # df = df.tz_localize(DB_TZ.key)
-        df.reset_index(inplace=True)
         # 转换为TickData格式
         # 使用df2data
         TickData_list: list[TickData] = history_tickdata_processor.df2data(df)
         return TickData_list
         
     
+    def load_tick_data_many(self, reqs: List[HistoryRequest]) -> List[List[TickData]]:
+        '''
+        并发读取多个合约/时间段的tick数据, 并发数为连接池大小, 结果顺序与reqs一致
+        '''
+        return [history_tickdata_processor.df2data(df) for df in self.load_tick_df_many(reqs)]
+
+    def load_tick_df_many(self, reqs: List[HistoryRequest]) -> List[pd.DataFrame]:
+        '''
+        并发读取多个合约/时间段的tick数据, 以DataFrame返回, 并发数为连接池大小
+        '''
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            futures = [executor.submit(self.load_tick_df, req.symbol, req.exchange, req.start, req.end) for req in reqs]
+            return [future.result() for future in futures]
+
+    def load_tick_df(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> pd.DataFrame:
+        '''
+        在服务端按合约和时间区间过滤, 只传输所需字段
+        datetime为分区字段(按日VALUE分区), 时间条件下推后只扫描区间内的分区
+        '''
+        db_path: str = self.db_paths['tick_db']
+        tb_name: str = self.tb_names['tick_tb']
+        with self.pool.session() as session:
+            table = session.loadTable(tableName=tb_name, dbPath=db_path)
+            df: pd.DataFrame = self.select_tick(table, symbol, exchange, start, end).toDF()
+        return add_key_columns(df, symbol, exchange)
+
+    def stream_tick_data(self, symbol: str, exchange: Exchange, start: datetime, end: datetime, chunk_size: int = 100000) -> Iterator[List[TickData]]:
+        '''
+        服务端游标分块读取: 每次从服务端取chunk_size条(不少于8192), 转换为TickData后返回
+        遍历期间占用一个连接, 提前结束遍历时丢弃剩余数据后归还连接
+        '''
+        db_path: str = self.db_paths['tick_db']
+        tb_name: str = self.tb_names['tick_tb']
+        with self.pool.session() as session:
+            table = session.loadTable(tableName=tb_name, dbPath=db_path)
+            sql: str = self.select_tick(table, symbol, exchange, start, end).showSQL()
+            block = session.run(sql, fetchSize=max(chunk_size, 8192))
+            try:
+                while block.hasNext():
+                    df: pd.DataFrame = block.read()
+                    if not df.empty:
+                        yield history_tickdata_processor.df2data(add_key_columns(df, symbol, exchange))
+            finally:
+                if block.hasNext():
+                    block.skipAll()
+
+    def select_tick(self, table, symbol: str, exchange: Exchange, start: datetime, end: datetime):
+        '''
+        tick查询: 时间条件下推到分区字段, 只选取TICK_QUERY_COLUMNS(不传输symbol/exchange)
+        '''
+        return (
+            table.select(TICK_QUERY_COLUMNS)
+            .where(f'datetime>={to_ddb_timestamp(start)}')
+            .where(f'datetime<={to_ddb_timestamp(end)}')
+            .where(f'symbol="{symbol}"')
+            .where(f'exchange="{exchange.value}"')
+        )
+
     def delete_bar_data(self, symbol: str, exchange: Exchange, interval: Interval) -> int:
         '''
         删除所有时间段指定数据
@@ -201,15 +389,16 @@ class Database(BaseDatabase):
         db_path: str = self.db_paths['tick_db']
         tb_name: str = self.tb_names['tick_tb']
         # 统计数据量
-        table = self.session.loadTable(tableName=tb_name, dbPath=db_path)
-        df: pd.DataFrame = table.select('count(*)').where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').toDF()
-        count: int = df['count'][0]
-        # 删除tick数据
-        table.delete().where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').execute()
-        # 删除tickoverview数据
-        tb_name: str = self.tb_names['tickoverview_tb']
-        table = self.session.loadTable(tableName=tb_name, dbPath=db_path)
-        table.delete().where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').execute()
+        with self.pool.session() as session:
+            table = session.loadTable(tableName=tb_name, dbPath=db_path)
+            df: pd.DataFrame = table.select('count(*)').where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').toDF()
+            count: int = df['count'][0]
+            # 删除tick数据
+            table.delete().where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').execute()
+            # 删除tickoverview数据
+            tb_name: str = self.tb_names['tickoverview_tb']
+            table = session.loadTable(tableName=tb_name, dbPath=db_path)
+            table.delete().where(f'symbol="{symbol}"').where(f'exchange="{exchange.value}"').execute()
 
         return count
     
@@ -226,8 +415,9 @@ class Database(BaseDatabase):
         '''
         tb_name: str = self.tb_names['tickoverview_tb']
         db_path: str = self.db_paths['tick_db']
-        overview_table = self.session.loadTable(tableName=tb_name, dbPath=db_path)
-        overview_df: pd.DataFrame = overview_table.toDF()
+        with self.pool.session() as session:
+            overview_table = session.loadTable(tableName=tb_name, dbPath=db_path)
+            overview_df: pd.DataFrame = overview_table.toDF()
         list_of_tickoverview: List[TickOverview] = []
         for index, row in overview_df.iterrows():
             overview: TickOverview = TickOverview(
@@ -241,22 +431,34 @@ class Database(BaseDatabase):
         return list_of_tickoverview
         
 
-    def _save_all_history_tickdata(self) -> bool:
+    def _save_all_history_tickdata(self, workers: int = None) -> bool:
         '''
-        写入文件夹中历史数据---只可写入一次!
-        #TODO: 都什么年代, 还在写两层for循环(甚至3层)? userwarning处理
+        写入文件夹中历史数据: 多进程解析, 批量写入, 已导入的文件记录在manifest中, 中断后可继续
         '''
         data_processor = history_tickdata_processor()
-        for key in data_processor.all_csv_paths.keys():
-        # 遍历存放全合约每日数据的日数据文件夹
-            daily_csv_paths = data_processor.all_csv_paths[key]
-            # 遍历该日所有合约的数据
-            for csv_path in daily_csv_paths:
-                daily_df = data_processor.tqsdk_data_process(csv_path)
-                list_of_tickdata = data_processor.df2data(daily_df)
-                self.save_tick_data(list_of_tickdata)
-        
+        csv_paths: List[str] = data_processor.catalog.get_files()
+        ingestor: CsvIngestor = CsvIngestor(self, SETTING["database.ingest_manifest"], workers)
+        return ingestor.run(csv_paths)
 
 
-        
+def to_ddb_timestamp(dt: datetime) -> str:
+    '''
+    datetime -> dolphindb NANOTIMESTAMP常量, 如2023.01.03T09:00:00.500000000
+    '''
+    return dt.strftime("%Y.%m.%dT%H:%M:%S.%f") + "000"
+
+
+def get_pairs_condition(symbols: pd.Series, exchanges: pd.Series) -> str:
+    '''
+    按(symbol, exchange)精确匹配的where条件, 如(symbol="rb2305" and exchange="SHFE") or (...)
+    '''
+    return " or ".join(f'(symbol="{symbol}" and exchange="{exchange}")' for symbol, exchange in zip(symbols, exchanges))
+
 
+def add_key_columns(df: pd.DataFrame, symbol: str, exchange: Exchange) -> pd.DataFrame:
+    '''
+    查询结果补上symbol/exchange列, 字段顺序同TICK_COLUMNS
+    '''
+    df.insert(0, "symbol", symbol)
+    df.insert(1, "exchange", exchange.value)
+    return df
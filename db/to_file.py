@@ -0,0 +1,250 @@
+'''
+本地文件数据库: 不依赖数据库服务, 数据按合约/日期分区存为本地列式文件
+目录结构:
+    {path}/tick/{exchange}/{symbol}/{YYYYMMDD}/
+    {path}/bar/{exchange}/{symbol}/{interval}/{YYYYMMDD}/
+    {path}/tickoverview.json, {path}/baroverview.json
+'''
+import json
+import os
+from datetime import datetime, date
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from datastructure.constant import Exchange, Interval
+from datastructure.object import BarData, TickData
+from datastructure.setting import SETTING
+from utils.data_process import history_tickdata_processor
+from .database import BaseDatabase, BarOverview, TickOverview, TICK_COLUMNS, ticks_to_df
+from .columnar import write_partition, read_partition, read_meta, remove_partition
+
+
+# bar数据字段
+BAR_COLUMNS: List[str] = [
+    "symbol", "exchange", "datetime", "interval", "volume", "turnover", "open_interest",
+    "open_price", "high_price", "low_price", "close_price"
+]
+
+
+class Database(BaseDatabase):
+    '''
+    本地文件数据库
+    按日分区(与dolphindb按日VALUE分区一致), 同一时间戳重复写入时保留最后一条
+    '''
+    def __init__(self) -> None:
+        '''
+        构造函数
+        '''
+        self.path: Path = Path(SETTING["database.path"])
+        self.tick_path: Path = self.path.joinpath("tick")
+        self.bar_path: Path = self.path.joinpath("bar")
+        self.tick_path.mkdir(parents=True, exist_ok=True)
+        self.bar_path.mkdir(parents=True, exist_ok=True)
+        self.tickoverview_path: Path = self.path.joinpath("tickoverview.json")
+        self.baroverview_path: Path = self.path.joinpath("baroverview.json")
+
+    def save_bar_data(self, bars: List[BarData]) -> bool:
+        '''
+        保存bar数据
+        '''
+        if not bars:
+            return False
+        df: pd.DataFrame = pd.DataFrame({
+            column: [getattr(bar, column) for bar in bars] for column in BAR_COLUMNS
+        })
+        df["exchange"] = [bar.exchange.value for bar in bars]
+        df["interval"] = [bar.interval.value for bar in bars]
+        df["datetime"] = pd.to_datetime(df["datetime"])
+
+        bar: BarData = bars[0]
+        folder: Path = self.get_bar_folder(bar.symbol, bar.exchange, bar.interval)
+        self.save_partitions(folder, df)
+        self.update_overview(self.baroverview_path, f"{bar.exchange.value}.{bar.symbol}.{bar.interval.value}", folder)
+        return True
+
+    def save_tick_data(self, ticks: List[TickData]) -> bool:
+        '''
+        保存tick数据
+        '''
+        if not ticks:
+            return False
+        return self.save_tick_df(ticks_to_df(ticks))
+
+    def save_tick_df(self, df: Union[pd.DataFrame, Dict[str, np.ndarray]]) -> bool:
+        '''
+        批量保存列式tick数据(可包含多个合约), 按合约写入分区并更新汇总
+        '''
+        df = pd.DataFrame(df)
+        if df.empty:
+            return False
+        df = df.assign(datetime=pd.to_datetime(df["datetime"]))     # 不修改调用方的DataFrame
+        for (symbol, exchange_str), group in df.groupby(["symbol", "exchange"], sort=False):
+            exchange: Exchange = Exchange(exchange_str)
+            folder: Path = self.get_tick_folder(symbol, exchange)
+            self.save_partitions(folder, group.loc[:, TICK_COLUMNS])
+            self.update_overview(self.tickoverview_path, f"{exchange.value}.{symbol}", folder)
+        return True
+
+    def load_bar_data(self, symbol: str, exchange: Exchange, interval: Interval, start: datetime, end: datetime) -> List[BarData]:
+        '''
+        读取bar数据
+        '''
+        folder: Path = self.get_bar_folder(symbol, exchange, interval)
+        df: pd.DataFrame = self.load_partitions(folder, start, end)
+        bars: List[BarData] = []
+        for row in df.itertuples(index=False):
+            bar: BarData = BarData(
+                symbol=symbol,
+                exchange=exchange,
+                datetime=row.datetime.to_pydatetime(),
+                interval=interval,
+                volume=row.volume,
+                turnover=row.turnover,
+                open_interest=row.open_interest,
+                open_price=row.open_price,
+                high_price=row.high_price,
+                low_price=row.low_price,
+                close_price=row.close_price
+            )
+            bars.append(bar)
+        return bars
+
+    def load_tick_data(self, symbol: str, exchange: Exchange, start: datetime = datetime(2010,1,1), end: datetime = datetime(2030,1,1)) -> List[TickData]:
+        '''
+        读取tick数据, 不输入开始结束日期则读取全部数据
+        '''
+        df: pd.DataFrame = self.load_tick_df(symbol, exchange, start, end)
+        if df.empty:
+            return []
+        return history_tickdata_processor.df2data(df)
+
+    def load_tick_df(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> pd.DataFrame:
+        '''
+        只读取区间内的日期分区
+        '''
+        df: pd.DataFrame = self.load_partitions(self.get_tick_folder(symbol, exchange), start, end)
+        if df.empty:
+            return pd.DataFrame(columns=TICK_COLUMNS)
+        return df
+
+    def delete_bar_data(self, symbol: str, exchange: Exchange, interval: Interval) -> int:
+        '''
+        删除所有时间段指定数据
+        '''
+        key: str = f"{exchange.value}.{symbol}.{interval.value}"
+        return self.delete_folder(self.get_bar_folder(symbol, exchange, interval), self.baroverview_path, key)
+
+    def delete_tick_data(self, symbol: str, exchange: Exchange) -> int:
+        '''
+        删除所有时间指定数据
+        '''
+        key: str = f"{exchange.value}.{symbol}"
+        return self.delete_folder(self.get_tick_folder(symbol, exchange), self.tickoverview_path, key)
+
+    def get_bar_overview(self) -> List[BarOverview]:
+        '''
+        查看数据库中支持的bar数据
+        '''
+        overviews: List[BarOverview] = []
+        for key, d in self.load_overview(self.baroverview_path).items():
+            exchange_str, symbol, interval_str = key.split(".")
+            overview: BarOverview = BarOverview(
+                symbol=symbol,
+                exchange=Exchange(exchange_str),
+                interval=Interval(interval_str),
+                count=d["count"],
+                start=pd.Timestamp(d["start"]),
+                end=pd.Timestamp(d["end"])
+            )
+            overviews.append(overview)
+        return overviews
+
+    def get_tick_overview(self) -> List[TickOverview]:
+        '''
+        查看数据库中支持的tick数据
+        '''
+        overviews: List[TickOverview] = []
+        for key, d in self.load_overview(self.tickoverview_path).items():
+            exchange_str, symbol = key.split(".")
+            overview: TickOverview = TickOverview(
+                symbol=symbol,
+                exchange=Exchange(exchange_str),
+                count=d["count"],
+                start=pd.Timestamp(d["start"]),
+                end=pd.Timestamp(d["end"])
+            )
+            overviews.append(overview)
+        return overviews
+
+    def get_tick_folder(self, symbol: str, exchange: Exchange) -> Path:
+        return self.tick_path.joinpath(exchange.value, symbol)
+
+    def get_bar_folder(self, symbol: str, exchange: Exchange, interval: Interval) -> Path:
+        return self.bar_path.joinpath(exchange.value, symbol, interval.value)
+
+    def save_partitions(self, folder: Path, df: pd.DataFrame) -> None:
+        '''
+        按日写入分区, 与已有分区合并(同一时间戳保留最后写入的数据)
+        '''
+        for d, day_df in df.groupby(df["datetime"].dt.date):
+            path: Path = folder.joinpath(d.strftime("%Y%m%d"))
+            if path.exists():
+                day_df = pd.concat([read_partition(path, mmap=False), day_df], ignore_index=True)
+                day_df = day_df.drop_duplicates(subset="datetime", keep="last")
+            day_df = day_df.sort_values("datetime").reset_index(drop=True)
+            meta: Dict = {"start": str(day_df["datetime"].iloc[0]), "end": str(day_df["datetime"].iloc[-1])}
+            write_partition(path, day_df, meta)
+
+    def load_partitions(self, folder: Path, start: datetime, end: datetime) -> pd.DataFrame:
+        '''
+        读取[start, end]内的日期分区并按时间过滤
+        '''
+        if not folder.exists():
+            return pd.DataFrame()
+        first: str = start.strftime("%Y%m%d")
+        last: str = end.strftime("%Y%m%d")
+        names: List[str] = sorted(name for name in os.listdir(folder) if first <= name <= last and name.isdigit())
+        if not names:
+            return pd.DataFrame()
+        df: pd.DataFrame = pd.concat([read_partition(folder.joinpath(name)) for name in names], ignore_index=True)
+        df = df.loc[(df["datetime"] >= start) & (df["datetime"] <= end)]
+        return df.reset_index(drop=True)
+
+    def delete_folder(self, folder: Path, overview_path: Path, key: str) -> int:
+        '''
+        删除合约全部分区和汇总信息, 返回删除的数据条数
+        '''
+        overviews: Dict = self.load_overview(overview_path)
+        count: int = overviews.pop(key, {}).get("count", 0)
+        remove_partition(folder)
+        self.save_overview(overview_path, overviews)
+        return count
+
+    def update_overview(self, overview_path: Path, key: str, folder: Path) -> None:
+        '''
+        根据各分区meta重新汇总合约的条数和起止时间
+        '''
+        metas: List[Dict] = [read_meta(folder.joinpath(name)) for name in sorted(os.listdir(folder)) if name.isdigit()]
+        overviews: Dict = self.load_overview(overview_path)
+        overviews[key] = {
+            "count": sum(meta["length"] for meta in metas),
+            "start": metas[0]["start"],
+            "end": metas[-1]["end"],
+            "datetime": str(datetime.now())
+        }
+        self.save_overview(overview_path, overviews)
+
+    def load_overview(self, overview_path: Path) -> Dict:
+        if not overview_path.exists():
+            return {}
+        with open(overview_path) as f:
+            return json.load(f)
+
+    def save_overview(self, overview_path: Path, overviews: Dict) -> None:
+        tmp_path: Path = overview_path.with_name(overview_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(overviews, f)
+        os.replace(tmp_path, overview_path)
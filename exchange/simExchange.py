@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Union
 from collections import defaultdict
 from copy import copy
 from datetime import datetime, date, timedelta
@@ -11,7 +11,10 @@ from datastructure.object import (TickData, OrderData, TradeData, PositionData,
                     SubscribeRequest, HistoryRequest, Exchange, BarData)
 from datastructure.constant import Interval, Status, OrderType, Direction
 from datastructure.definition import INTERVAL_DELTA_MAP
+from datastructure.tick_batch import TickBatch, TickView
 from db.database import get_database, BaseDatabase
+from utils.utils_function import get_trading_day
+from utils.trading_calendar import get_trading_day_index, get_trading_day_bounds, trading_day_to_date
 
 from pandas import DataFrame
 
@@ -25,8 +28,8 @@ class SimExchange:
         self.start: datetime = start
         self.end: datetime = end
 
-        # 回测时间内所有行情数据
-        self.history_data: List[TickData] = []
+        # 回测时间内所有行情数据, 列式加载时为TickBatch
+        self.history_data: Union[List[TickData], TickBatch] = []
         # 所有订单
         self.limit_order_count: int = 0
         self.limit_orders: Dict[str, OrderData] = {}
@@ -37,9 +40,14 @@ class SimExchange:
         # 最新行情数据
         self.tick: TickData = None
         self.datetime: datetime = None
+        self.datetime_ns: int = 0   # 回放时钟(纳秒时间戳), 逐tick判断只比较整数
 
-        # 记录每日盯市
+        # 记录每日盯市(按交易日, 夜盘归属下一个交易日)
         self.daily_results: Dict[date, DailyResult] = {}
+        self.daily_result: DailyResult = None
+        self.trading_day: int = None        # 当前交易日序号
+        self.trading_day_start: int = 0     # 当前交易日纳秒时间范围[start, end)
+        self.trading_day_end: int = 0
         self.contract: ContractData = contract
         self.slippage: float = 0
         
@@ -51,7 +59,7 @@ class SimExchange:
     def load_history_data(self, symbol, exchange) -> None:
 
         self.output('根据订阅合约, 加载历史行情中')
-        self.history_data.clear()
+        self.history_data = []
         db: BaseDatabase = get_database()
         total_days: int = (self.end - self.start).days
         batch_days: int = max(total_days / 10, 1)
@@ -72,16 +80,40 @@ class SimExchange:
 
     def load_small_data(self, symbol, exchange) -> None:
         self.output('根据订阅合约, 加载小规模历史行情中')
-        self.history_data.clear()
+        self.history_data = []
         db: BaseDatabase = get_database()
         ticks: List[TickData] = db.load_tick_data(symbol, exchange, self.start, self.end)
         self.history_data.extend(ticks)
         self.output('小规模历史行情加载完成')
         
+    def load_stream_data(self, symbol, exchange, chunk_size: int = 100000) -> None:
+        '''
+        流式加载: 分块读取历史行情, 边读取边回放, 不在内存中保存全部行情
+        '''
+        self.output('根据订阅合约, 流式加载历史行情')
+        self.history_data = []
+        db: BaseDatabase = get_database()
+        stream: Iterator[List[TickData]] = db.stream_tick_data(symbol, exchange, self.start, self.end, chunk_size)
+        self._tick_generator = self._generate_stream_tick(stream)
+
+    def load_batch_data(self, symbol, exchange) -> None:
+        '''
+        列式加载: 历史行情保存为TickBatch, 回放时依次推送TickView(属性同TickData), 不构造TickData
+        '''
+        self.output('根据订阅合约, 列式加载历史行情中')
+        db: BaseDatabase = get_database()
+        self.history_data = db.load_tick_batch(symbol, exchange, self.start, self.end)
+        self._tick_generator = self._generate_new_tick()
+        self.output(f'列式历史行情加载完成, 共{len(self.history_data)}条')
+
     def _generate_new_tick(self) -> TickData:
         for tick in self.history_data:
             yield(tick)
 
+    def _generate_stream_tick(self, stream: Iterator[List[TickData]]) -> TickData:
+        for ticks in stream:
+            yield from ticks
+
     def publish_md(self) -> TickData:
         try:
             tick: TickData = next(self._tick_generator)
@@ -92,6 +124,7 @@ class SimExchange:
         else:
             self.tick = tick
             self.datetime = tick.datetime
+            self.datetime_ns = tick.datetime_ns
             self.on_tick(tick)
             return tick
         
@@ -193,20 +226,36 @@ class SimExchange:
         
             
     def update_daily_close(self, event: Event) -> None:
+        '''
+        更新当前交易日收盘价, 只在时钟越过交易日边界时查找/创建DailyResult
+        '''
         tick: TickData = event.data
-        d: date = tick.datetime.date()
-        daily_result: Optional[DailyResult] = self.daily_results.get(d, None)
-        if daily_result:
-            daily_result.close_price = tick.last_price      ####TODO 最新价 != 结算价
+        if not self.trading_day_start <= self.datetime_ns < self.trading_day_end:
+            self.start_trading_day(tick)
+        self.daily_result.close_price = tick.last_price      ####TODO 最新价 != 结算价
+
+    def start_trading_day(self, tick: TickData) -> None:
+        '''
+        时钟进入新的交易日: 列式回放时使用TickView预先计算的交易日
+        '''
+        if isinstance(tick, TickView):
+            self.trading_day = tick.trading_day
         else:
-            self.daily_results[d] = DailyResult(d, tick.last_price)
+            self.trading_day = int(get_trading_day_index(self.datetime_ns))
+        self.trading_day_start, self.trading_day_end = get_trading_day_bounds(self.trading_day)
+        d: date = trading_day_to_date(self.trading_day)
+        daily_result: Optional[DailyResult] = self.daily_results.get(d, None)
+        if not daily_result:
+            daily_result = DailyResult(d, tick.last_price)
+            self.daily_results[d] = daily_result
+        self.daily_result = daily_result
     
     def calculate_results(self) -> None:
         '''计算整个回测的每日盯市结果'''
         if self.trade_count == 0:
             return 
         for trade in self.trades.values():
-            d: date = trade.datetime.date()
+            d: date = get_trading_day(trade.datetime)
             daily_result: DailyResult = self.daily_results[d]
             daily_result.add_trade(trade)
         
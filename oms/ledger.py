@@ -0,0 +1,218 @@
+'''
+持仓&账户账本
+按合约整数编号(instrument id)索引的数组存储持仓, 行情/成交/委托到达时增量更新保证金和盈亏
+'''
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from datastructure.constant import Direction, Offset
+from datastructure.object import TickData, TradeData, PositionData, AccountData, ContractData
+
+
+# 持仓数组第二维: 多仓 & 空仓
+DIRECTION_INDEX: Dict[Direction, int] = {Direction.LONG: 0, Direction.SHORT: 1}
+# 平仓成交对应的持仓方向: 买平 -> 空仓, 卖平 -> 多仓
+CLOSE_INDEX: Dict[Direction, int] = {Direction.LONG: 1, Direction.SHORT: 0}
+# 持仓盈亏符号: 多仓 +1, 空仓 -1
+PNL_SIGN: np.ndarray = np.array([1.0, -1.0])
+
+
+class PositionLedger:
+    '''
+    持仓账本
+    1.合约属性(合约乘数、保证金率、手续费率)和最新价按instrument id存储
+    2.持仓数组shape为(合约数, 2), 记录今仓、昨仓、持仓均价、占用保证金、浮动盈亏、冻结量
+    3.每次行情、成交、冻结/解冻只更新对应合约, 并把差额累加到账户, 无需重新汇总
+    '''
+    def __init__(self, capital: float = 0, capacity: int = 16) -> None:
+        """Constructor"""
+        self.capacity: int = capacity
+        self.instrument_ids: Dict[str, int] = {}        # {symbol: instrument id}
+        self.contracts: List[ContractData] = []
+
+        # 合约属性
+        self.sizes: np.ndarray = np.zeros(capacity)
+        self.margin_rates: np.ndarray = np.zeros(capacity)
+        self.commission_rates: np.ndarray = np.zeros(capacity)
+        self.last_prices: np.ndarray = np.zeros(capacity)
+
+        # 持仓 [:, 0]为多仓, [:, 1]为空仓
+        self.td_volumes: np.ndarray = np.zeros((capacity, 2))       # 今仓
+        self.yd_volumes: np.ndarray = np.zeros((capacity, 2))       # 昨仓
+        self.average_prices: np.ndarray = np.zeros((capacity, 2))   # 持仓均价
+        self.margins: np.ndarray = np.zeros((capacity, 2))          # 占用保证金
+        self.float_pnls: np.ndarray = np.zeros((capacity, 2))       # 浮动盈亏
+        self.frozen_volumes: np.ndarray = np.zeros((capacity, 2))   # 开仓委托冻结量
+        self.frozen_margins: np.ndarray = np.zeros((capacity, 2))   # 开仓委托冻结保证金
+
+        self.account: AccountData = AccountData(
+            stable_equity=capital,
+            dynamic_equity=capital,
+            balance=capital
+        )
+
+    def register(self, contract: ContractData) -> int:
+        '''
+        登记合约, 返回instrument id
+        '''
+        instrument_id: Optional[int] = self.instrument_ids.get(contract.symbol, None)
+        if instrument_id is not None:
+            return instrument_id
+
+        instrument_id = len(self.contracts)
+        if instrument_id >= self.capacity:
+            self._grow()
+        self.instrument_ids[contract.symbol] = instrument_id
+        self.contracts.append(contract)
+        self.sizes[instrument_id] = contract.size
+        self.margin_rates[instrument_id] = contract.margin_rate
+        self.commission_rates[instrument_id] = contract.commission_rate
+        return instrument_id
+
+    def _grow(self) -> None:
+        '''
+        容量翻倍
+        '''
+        self.capacity *= 2
+        for name in ("sizes", "margin_rates", "commission_rates", "last_prices"):
+            old: np.ndarray = getattr(self, name)
+            new: np.ndarray = np.zeros(self.capacity)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        for name in ("td_volumes", "yd_volumes", "average_prices", "margins",
+                     "float_pnls", "frozen_volumes", "frozen_margins"):
+            old: np.ndarray = getattr(self, name)
+            new: np.ndarray = np.zeros((self.capacity, 2))
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def get_volume(self, instrument_id: int, direction: Direction) -> float:
+        '''
+        查询某方向总持仓
+        '''
+        d: int = DIRECTION_INDEX[direction]
+        return float(self.td_volumes[instrument_id, d] + self.yd_volumes[instrument_id, d])
+
+    def get_position(self, symbol: str, direction: Direction) -> Optional[PositionData]:
+        '''
+        生成某合约某方向的持仓快照
+        '''
+        instrument_id: Optional[int] = self.instrument_ids.get(symbol, None)
+        if instrument_id is None:
+            return None
+        i, d = instrument_id, DIRECTION_INDEX[direction]
+        return PositionData(
+            symbol=symbol,
+            exchange=self.contracts[i].exchange,
+            direction=direction,
+            all_volume=float(self.td_volumes[i, d] + self.yd_volumes[i, d]),
+            all_pnl=float(self.float_pnls[i, d]),
+            yd_volume=float(self.yd_volumes[i, d]),
+            td_volume=float(self.td_volumes[i, d]),
+            average_price=float(self.average_prices[i, d]),
+            occupying_margin=float(self.margins[i, d])
+        )
+
+    def update_tick(self, tick: TickData) -> None:
+        '''
+        行情更新: 按最新价重新计算该合约的浮动盈亏和占用保证金
+        '''
+        instrument_id: Optional[int] = self.instrument_ids.get(tick.symbol, None)
+        if instrument_id is None or not tick.last_price:
+            return
+        self.last_prices[instrument_id] = tick.last_price
+        self._mark(instrument_id, tick.last_price)
+
+    def update_trade(self, trade: TradeData) -> None:
+        '''
+        成交更新: 开仓计入今仓并更新均价, 平仓先平昨仓再平今仓并结算平仓盈亏
+        '''
+        i: int = self.instrument_ids[trade.symbol]
+        size: float = float(self.sizes[i])
+        volume: float = trade.fill_volume
+        price: float = trade.fill_price
+
+        # 手续费
+        commission: float = price * volume * size * float(self.commission_rates[i])
+        self.account.commission += commission
+
+        if trade.offset == Offset.OPEN:
+            d: int = DIRECTION_INDEX[trade.direction]
+            old_volume: float = self.td_volumes[i, d] + self.yd_volumes[i, d]
+            self.average_prices[i, d] = (self.average_prices[i, d] * old_volume + price * volume) / (old_volume + volume)
+            self.td_volumes[i, d] += volume
+        else:
+            d: int = CLOSE_INDEX[trade.direction]
+            yd_close: float = min(self.yd_volumes[i, d], volume)
+            self.yd_volumes[i, d] -= yd_close
+            self.td_volumes[i, d] = max(self.td_volumes[i, d] - (volume - yd_close), 0)
+            self.account.trade_pnl += float(PNL_SIGN[d] * (price - self.average_prices[i, d]) * volume * size)
+            if not self.td_volumes[i, d] + self.yd_volumes[i, d]:
+                self.average_prices[i, d] = 0
+
+        mark_price: float = float(self.last_prices[i]) or price
+        self._mark(i, mark_price)
+
+    def freeze(self, instrument_id: int, direction: Direction, volume: float, price: float) -> None:
+        '''
+        开仓委托发出: 冻结保证金
+        '''
+        d: int = DIRECTION_INDEX[direction]
+        margin: float = float(price * volume * self.sizes[instrument_id] * self.margin_rates[instrument_id])
+        self.frozen_volumes[instrument_id, d] += volume
+        self.frozen_margins[instrument_id, d] += margin
+        self.account.frozen_margin += margin
+        self._update_balance()
+
+    def unfreeze(self, instrument_id: int, direction: Direction, volume: float, price: float) -> None:
+        '''
+        开仓委托成交或撤销: 解冻保证金
+        '''
+        d: int = DIRECTION_INDEX[direction]
+        volume = min(volume, float(self.frozen_volumes[instrument_id, d]))
+        margin: float = min(
+            float(price * volume * self.sizes[instrument_id] * self.margin_rates[instrument_id]),
+            float(self.frozen_margins[instrument_id, d])
+        )
+        self.frozen_volumes[instrument_id, d] -= volume
+        self.frozen_margins[instrument_id, d] -= margin
+        self.account.frozen_margin -= margin
+        self._update_balance()
+
+    def roll_day(self) -> None:
+        '''
+        换日: 今仓转为昨仓
+        '''
+        self.yd_volumes += self.td_volumes
+        self.td_volumes[:] = 0
+
+    def _mark(self, i: int, price: float) -> None:
+        '''
+        按价格price盯市合约i, 把浮动盈亏和保证金的差额累加到账户
+        '''
+        size: float = self.sizes[i]
+        volumes: np.ndarray = self.td_volumes[i] + self.yd_volumes[i]
+        float_pnls: np.ndarray = PNL_SIGN * (price - self.average_prices[i]) * volumes * size
+        margins: np.ndarray = price * volumes * size * self.margin_rates[i]
+
+        self.account.float_pnl += float(float_pnls.sum() - self.float_pnls[i].sum())
+        self.account.ocupying_margin += float(margins.sum() - self.margins[i].sum())
+        self.float_pnls[i] = float_pnls
+        self.margins[i] = margins
+        self._update_equity()
+
+    def _update_equity(self) -> None:
+        '''
+        动态权益 = 静态权益 + 平仓盈亏 + 浮动盈亏 - 手续费
+        '''
+        account: AccountData = self.account
+        account.dynamic_equity = account.stable_equity + account.trade_pnl + account.float_pnl - account.commission
+        self._update_balance()
+
+    def _update_balance(self) -> None:
+        '''
+        可用资金 = 动态权益 - 占用保证金 - 冻结保证金
+        '''
+        account: AccountData = self.account
+        account.balance = account.dynamic_equity - account.ocupying_margin - account.frozen_margin
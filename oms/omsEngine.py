@@ -1,8 +1,8 @@
 from abc import ABC
 from pathlib import Path
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import pandas as pd
-from typing import Any, Type, Dict, List, Optional
+from typing import Any, Type, Dict, List, Optional, Tuple
 from collections import defaultdict
 
 from core.event import Event, EventEngine
@@ -12,23 +12,59 @@ from datastructure.constant import Direction, Offset, OrderType, Status, PosDate
 from datastructure.object import (CancelRequest, LogData, OrderRequest, 
                                   HistoryRequest, OrderData, TickData, SignalData, 
                                   TradeData, PositionData, AccountData, ContractData, Exchange)
+from datastructure.tick_batch import TickView
+from utils.utils_class import TickBuffer
+from utils.trading_calendar import get_trading_day_index, get_trading_day_bounds
+from .ledger import PositionLedger
+from .risk import RiskManager, RiskCheck, MaxPositionCheck, OrderRateCheck, MarginCheck
 
 
 class OmsEngine(BaseEngine):
     '''
     '''
-    def __init__(self, event_engine: EventEngine, contract) -> None:
+    def __init__(self, event_engine: EventEngine, contract, capital: float = 1000000) -> None:
         super(OmsEngine, self).__init__(event_engine, "oms")
         # 内部信息
         self.contract: ContractData = contract
-        self.ticks: List[TickData] = []        # 记录最新的tick
+        self.tick_buffer_size: int = 10
+        self.ticks: Dict[str, TickBuffer] = {}  # {symbol: 最近tick_buffer_size个tick}
         self.active_orders: Dict[str, OrderData] = {} # {orderid: order}
         self.orders: Dict[str, OrderData] = {} # {orderid: order} # 记录所有订单
         self.trades: Dict[str, TradeData] = {} # {tradeid: trade} # 记录所有成交
 
-        self.positions: Dict[str, PositionData] = {} # {positionid: position}
-        self.account: AccountData = AccountData()
+        # 持仓&账户账本
+        self.ledger: PositionLedger = PositionLedger(capital)
+        self.instrument_id: int = self.ledger.register(contract)
+        self.account: AccountData = self.ledger.account
+        self.trading_day: int = None        # 当前交易日序号
+        self.trading_day_start: int = 0     # 当前交易日纳秒时间范围[start, end)
+        self.trading_day_end: int = 0
+        # 目标仓位 & 在途委托(已发送请求, 尚未成交或撤销的委托量)
+        self.target_pos: float = 0                  # 目标净仓位
+        self.order_volume: float = 1                # 每个信号对应的目标手数
+        self.order_price: float = 10000             # 委托价格
+        self.pending_volumes: Dict[Tuple[Direction, Offset], float] = defaultdict(float) # {(direction, offset): volume}
+        # 事前风控
+        self.max_position: float = 100              # 单方向最大持仓
+        self.max_order_rate: int = 50               # 每秒最多委托笔数
+        self.risk_manager: RiskManager = RiskManager()
+        self.init_risk_checks()
         self.register_event()
+
+    def init_risk_checks(self) -> None:
+        '''
+        默认风控: 最大持仓、委托频率、可用资金
+        价格笼子需要真实委托价, 通过add_risk_check(PriceBandCheck(...))开启
+        '''
+        self.add_risk_check(MaxPositionCheck(self.ledger, self.max_position))
+        self.add_risk_check(OrderRateCheck(self.max_order_rate, timedelta(seconds=1)))
+        self.add_risk_check(MarginCheck(self.ledger))
+
+    def add_risk_check(self, check: RiskCheck) -> None:
+        '''
+        添加风控检查
+        '''
+        self.risk_manager.add_check(check)
         
     # 注册回调函数
     def register_event(self) -> None:
@@ -43,93 +79,136 @@ class OmsEngine(BaseEngine):
     def process_tick_event(self, event: Event) -> None:
         self.output('处理行情更新')
         tick: TickData = event.data
-        self.ticks.append(tick)
+        buffer: TickBuffer = self.ticks.get(tick.symbol, None)
+        if not buffer:
+            buffer = TickBuffer(self.tick_buffer_size)
+            self.ticks[tick.symbol] = buffer
+        buffer.update_tick(tick)
+
+        # 换日: 只在时钟越过交易日边界时今仓转昨仓
+        if not self.trading_day_start <= tick.datetime_ns < self.trading_day_end:
+            self.start_trading_day(tick)
+        # 盯市
+        self.ledger.update_tick(tick)
+
+    def start_trading_day(self, tick: TickData) -> None:
+        '''
+        时钟进入新的交易日: 列式回放时使用TickView预先计算的交易日
+        '''
+        if self.trading_day is not None:
+            self.ledger.roll_day()
+        if isinstance(tick, TickView):
+            self.trading_day = tick.trading_day
+        else:
+            self.trading_day = int(get_trading_day_index(tick.datetime_ns))
+        self.trading_day_start, self.trading_day_end = get_trading_day_bounds(self.trading_day)
+
+    def get_tick(self, symbol: str) -> Optional[TickData]:
+        '''
+        查询合约最新tick
+        '''
+        buffer: TickBuffer = self.ticks.get(symbol, None)
+        if buffer:
+            return buffer.latest
+        return None
 
     def process_signal_event(self, event: Event) -> None:
+        '''
+        根据信号更新目标仓位, 只对(目标仓位 - 持仓 - 在途委托)的差额下单
+        同方向的重复信号在委托成交前不会再产生新的订单请求
+        '''
         self.output('处理信号更新')
         signal: SignalData = event.data
-        symbol = self.contract.symbol
-        exchange = self.contract.exchange
-        direction = signal.direction
-        datetime = signal.datetime
-        price = 10000
-        
-        long_pos: PositionData = self.positions.get(f"{self.contract.symbol}.{Direction.LONG}", None)
-        short_pos: PositionData = self.positions.get(f"{self.contract.symbol}.{Direction.SHORT}", None)
-
-        if signal.direction == Direction.LONG: # 多仓信号 - 反手开仓
-            if short_pos:   # 平空仓
-                req: OrderRequest = OrderRequest(symbol, 
-                                                 exchange, 
-                                                 direction,
-                                                 datetime,
-                                                 short_pos.all_volume,
-                                                 price,
-                                                 Offset.CLOSE)
-                self.on_order_request(req)
-                self.output('发生平空仓请求')
-            if not long_pos:    # 开多仓
-                req: OrderRequest = OrderRequest(symbol,
-                                                 exchange,
-                                                 direction,
-                                                 datetime,
-                                                 1,
-                                                 price,
-                                                 Offset.OPEN)
-                self.on_order_request(req)
-                self.output('发送开多仓请求')
-        
-        if signal.direction == Direction.SHORT: # 空仓信号 - 反手空仓
-            if long_pos:    # 平多仓
-                req: OrderRequest = OrderRequest(symbol, 
-                                                 exchange, 
-                                                 direction,
-                                                 datetime, 
-                                                 long_pos.all_volume,
-                                                 price,
-                                                 Offset.CLOSE)
-                self.on_order_request(req)
-                self.output('发生平多仓请求')
-            if not short_pos:   # 开空仓
-                req: OrderRequest = OrderRequest(symbol,
-                                                 exchange,
-                                                 direction,
-                                                 datetime,
-                                                 1,
-                                                 price,
-                                                 Offset.OPEN)
-                self.on_order_request(req)
-                self.output('发生开空仓请求')
+        self.target_pos = signal.direction.value * self.order_volume
+
+        # 持仓 + 在途委托 = 预期仓位
+        long_volume: float = self.get_position_volume(Direction.LONG)
+        short_volume: float = self.get_position_volume(Direction.SHORT)
+        expected_long: float = (long_volume 
+                                + self.pending_volumes[(Direction.LONG, Offset.OPEN)] 
+                                - self.pending_volumes[(Direction.SHORT, Offset.CLOSE)])
+        expected_short: float = (short_volume 
+                                 + self.pending_volumes[(Direction.SHORT, Offset.OPEN)] 
+                                 - self.pending_volumes[(Direction.LONG, Offset.CLOSE)])
+        delta: float = self.target_pos - (expected_long - expected_short)
+        if not delta:
+            return
+
+        # 先平反向已有持仓(扣除在途平仓), 剩余部分开仓
+        if delta > 0:
+            direction: Direction = Direction.LONG
+            close_available: float = short_volume - self.pending_volumes[(Direction.LONG, Offset.CLOSE)]
+        else:
+            direction: Direction = Direction.SHORT
+            close_available: float = long_volume - self.pending_volumes[(Direction.SHORT, Offset.CLOSE)]
+        volume: float = abs(delta)
+        close_volume: float = min(volume, max(close_available, 0))
+        open_volume: float = volume - close_volume
+        if close_volume and self.send_order(direction, Offset.CLOSE, close_volume, signal.datetime):
+            self.output(f'发送平仓请求: {direction}, {close_volume}')
+        if open_volume and self.send_order(direction, Offset.OPEN, open_volume, signal.datetime):
+            self.output(f'发送开仓请求: {direction}, {open_volume}')
+
+    def send_order(self, direction: Direction, offset: Offset, volume: float, dt: datetime) -> bool:
+        '''
+        订单请求通过风控后发送, 并记录在途委托量
+        '''
+        req: OrderRequest = OrderRequest(self.contract.symbol,
+                                         self.contract.exchange,
+                                         direction,
+                                         dt,
+                                         volume,
+                                         self.order_price,
+                                         offset)
+        if not self.risk_manager.check_order(req):
+            self.output(f'风控拒单({self.risk_manager.rejected_by}): {direction}, {offset}, {volume}')
+            return False
+
+        self.pending_volumes[(direction, offset)] += volume
+        if offset == Offset.OPEN:
+            self.ledger.freeze(self.instrument_id, direction, volume, self.order_price)
+        self.on_order_request(req)
+        return True
+
+    def get_position_volume(self, direction: Direction) -> float:
+        '''
+        查询合约某方向的持仓量
+        '''
+        return self.ledger.get_volume(self.instrument_id, direction)
+
+    def get_position(self, direction: Direction) -> PositionData:
+        '''
+        查询合约某方向的持仓信息
+        '''
+        return self.ledger.get_position(self.contract.symbol, direction)
     
     def process_order_event(self, event: Event) -> None:
         self.output('处理订单更新')
         order: OrderData = event.data
+        self.orders[order.orderid] = order
         if order.is_active():
             self.active_orders[order.orderid] = order
-            self.orders[order.orderid] = order
         else:
-            self.active_orders.pop(order.orderid)
+            self.active_orders.pop(order.orderid, None)
+            # 撤单/拒单: 未成交部分不再在途
+            if order.status in (Status.CANCELLED, Status.REJECTED):
+                remaining: float = order.order_volume - order.traded
+                self.pending_volumes[(order.direction, order.offset)] -= remaining
+                if order.offset == Offset.OPEN:
+                    self.ledger.unfreeze(self.instrument_id, order.direction, remaining, order.order_price)
         
     def process_trade_event(self, event: Event) -> None:
         self.output('处理成交更新')
         trade: TradeData = event.data
-        
-        if trade.offset == Offset.CLOSE:
-            direction = Direction.LONG if trade.direction == Direction.SHORT else Direction.SHORT
-            positionid: str = f"{trade.symbol}.{direction}"
-            self.positions[positionid].all_volume -= trade.fill_volume
-            if self.positions[positionid].all_volume <= 0:
-                self.positions.pop(positionid)
-        if trade.offset == Offset.OPEN:
-            direction = trade.direction
-            positionid: str = f"{trade.symbol}.{trade.direction}"
-            pos: PositionData = self.positions.get(positionid)
-            if pos:
-                pos.all_volume += trade.fill_volume
-            else:
-                self.positions[positionid] = PositionData(trade.symbol, trade.exchange, trade.direction, trade.fill_volume)
-    
+        self.trades[trade.tradeid] = trade
+        self.pending_volumes[(trade.direction, trade.offset)] -= trade.fill_volume
 
+        # 解冻开仓保证金, 更新持仓&账户
+        if trade.offset == Offset.OPEN:
+            order: OrderData = self.orders.get(trade.orderid, None)
+            price: float = order.order_price if order else trade.fill_price
+            self.ledger.unfreeze(self.instrument_id, trade.direction, trade.fill_volume, price)
+        self.ledger.update_trade(trade)
     
     
     def output(self, msg) -> None:
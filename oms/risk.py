@@ -0,0 +1,179 @@
+'''
+事前风控
+订单请求发送到交易所前依次通过各项风控检查, 每项检查均为O(1): 只读取预设限额和持仓账本中的增量状态
+'''
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from time import perf_counter_ns
+from typing import Deque, Dict, List, Optional
+
+from datastructure.constant import Offset
+from datastructure.object import OrderRequest
+from .ledger import PositionLedger, DIRECTION_INDEX
+
+
+class RiskCheck(ABC):
+    '''
+    风控检查抽象类
+    '''
+    name: str = ""
+
+    @abstractmethod
+    def check(self, req: OrderRequest) -> bool:
+        '''
+        通过返回True, 拒绝返回False
+        '''
+        pass
+
+    def on_accepted(self, req: OrderRequest) -> None:
+        '''
+        订单通过全部检查后调用, 需要记录已接受委托的检查(如委托频率)在此更新状态
+        '''
+        pass
+
+
+class MaxPositionCheck(RiskCheck):
+    '''
+    最大持仓: 持仓 + 在途开仓 + 本次开仓 <= 限额
+    '''
+    name: str = "max_position"
+
+    def __init__(self, ledger: PositionLedger, limit: float) -> None:
+        self.ledger: PositionLedger = ledger
+        self.limit: float = limit
+
+    def check(self, req: OrderRequest) -> bool:
+        if req.offset != Offset.OPEN:
+            return True
+        i: Optional[int] = self.ledger.instrument_ids.get(req.symbol, None)
+        if i is None:
+            return False
+        d: int = DIRECTION_INDEX[req.direction]
+        volume: float = self.ledger.td_volumes[i, d] + self.ledger.yd_volumes[i, d] + self.ledger.frozen_volumes[i, d]
+        return volume + req.volume <= self.limit
+
+
+class OrderRateCheck(RiskCheck):
+    '''
+    委托频率: 任意长度为interval的滑动窗口(按委托时间戳计)内最多limit笔委托
+    用长度为limit的队列记录最近limit笔已接受委托的时间戳, 最早一笔距今不足interval时拒绝
+    只统计通过全部检查的委托, 被其他检查拒绝的委托不占用额度
+    '''
+    name: str = "order_rate"
+
+    def __init__(self, limit: int, interval: timedelta = timedelta(seconds=1)) -> None:
+        self.limit: int = limit
+        self.interval: timedelta = interval
+        self.timestamps: Deque[datetime] = deque(maxlen=limit)
+
+    def check(self, req: OrderRequest) -> bool:
+        dq: Deque[datetime] = self.timestamps
+        if len(dq) < self.limit:
+            return True
+        return bool(dq) and req.datetime - dq[0] >= self.interval
+
+    def on_accepted(self, req: OrderRequest) -> None:
+        self.timestamps.append(req.datetime)
+
+
+class MarginCheck(RiskCheck):
+    '''
+    可用资金: 开仓所需保证金 <= 账户可用资金
+    '''
+    name: str = "margin"
+
+    def __init__(self, ledger: PositionLedger) -> None:
+        self.ledger: PositionLedger = ledger
+
+    def check(self, req: OrderRequest) -> bool:
+        if req.offset != Offset.OPEN:
+            return True
+        i: Optional[int] = self.ledger.instrument_ids.get(req.symbol, None)
+        if i is None:
+            return False
+        margin: float = req.price * req.volume * self.ledger.sizes[i] * self.ledger.margin_rates[i]
+        return margin <= self.ledger.account.balance
+
+
+class PriceBandCheck(RiskCheck):
+    '''
+    价格笼子: 委托价偏离最新价不超过band(比例), 尚无行情时不检查
+    '''
+    name: str = "price_band"
+
+    def __init__(self, ledger: PositionLedger, band: float) -> None:
+        self.ledger: PositionLedger = ledger
+        self.band: float = band
+
+    def check(self, req: OrderRequest) -> bool:
+        i: Optional[int] = self.ledger.instrument_ids.get(req.symbol, None)
+        if i is None:
+            return False
+        last_price: float = self.ledger.last_prices[i]
+        if not last_price:
+            return True
+        return abs(req.price - last_price) <= self.band * last_price
+
+
+class RiskManager:
+    '''
+    风控流水线: 按添加顺序执行检查, 任一检查拒绝即停止; 全部通过后依次调用各检查的on_accepted
+    记录每项检查的检查次数、拒单次数和累计耗时(纳秒)
+    '''
+    def __init__(self, timing: bool = True) -> None:
+        self.checks: List[RiskCheck] = []
+        self.timing: bool = timing                              # 是否统计耗时
+        self.check_counts: Dict[str, int] = defaultdict(int)    # {check name: 检查次数}
+        self.rejections: Dict[str, int] = defaultdict(int)      # {check name: 拒单次数}
+        self.timings: Dict[str, int] = defaultdict(int)         # {check name: 累计耗时ns}
+        self.rejected_by: str = ""                              # 最近一次拒单的检查
+
+    def add_check(self, check: RiskCheck) -> None:
+        '''
+        添加风控检查
+        '''
+        self.checks.append(check)
+
+    def remove_check(self, name: str) -> None:
+        '''
+        移除风控检查
+        '''
+        self.checks = [check for check in self.checks if check.name != name]
+
+    def check_order(self, req: OrderRequest) -> bool:
+        '''
+        订单请求通过所有检查返回True
+        '''
+        for check in self.checks:
+            name: str = check.name
+            self.check_counts[name] += 1
+            if self.timing:
+                start: int = perf_counter_ns()
+                passed: bool = check.check(req)
+                self.timings[name] += perf_counter_ns() - start
+            else:
+                passed: bool = check.check(req)
+            if not passed:
+                self.rejections[name] += 1
+                self.rejected_by = name
+                return False
+        for check in self.checks:
+            check.on_accepted(req)
+        return True
+
+    def get_statistics(self) -> Dict[str, Dict[str, float]]:
+        '''
+        每项检查的统计: 检查次数、拒单次数、累计耗时和平均耗时(ns)
+        '''
+        statistics: Dict[str, Dict[str, float]] = {}
+        for check in self.checks:
+            name: str = check.name
+            count: int = self.check_counts[name]
+            statistics[name] = {
+                "count": count,
+                "rejected": self.rejections[name],
+                "total_ns": self.timings[name],
+                "average_ns": self.timings[name] / count if count else 0
+            }
+        return statistics
@@ -0,0 +1,43 @@
+'''
+df2data按列批量构造TickData与逐行(iterrows)构造的耗时对比
+python tests/bench_df2data.py
+'''
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.data_process import history_tickdata_processor     # noqa: E402
+from fake_database import df2data_rows, make_tick_df     # noqa: E402
+
+
+N: int = 20000          # 每个交易日的tick数
+DAYS: List[str] = ["2023-01-03", "2023-01-04", "2023-01-05", "2023-01-06", "2023-01-09"]
+
+
+def per_tick(func: Callable[[pd.DataFrame], list], df: pd.DataFrame, repeat: int = 3) -> float:
+    '''
+    func转换df的最短耗时, 返回每个tick耗时(微秒)
+    '''
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+    return best / len(df) * 1e6
+
+
+def main() -> None:
+    df: pd.DataFrame = make_tick_df(days=DAYS, n=N)
+    rows: float = per_tick(df2data_rows, df, repeat=1)
+    columns: float = per_tick(history_tickdata_processor.df2data, df)
+    print(f"{len(df)} ticks")
+    print(f"iterrows  {rows:6.2f} us/tick")
+    print(f"df2data   {columns:6.2f} us/tick  {rows / columns:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
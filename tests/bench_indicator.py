@@ -0,0 +1,73 @@
+'''
+增量指标单次更新耗时, 与每个bar对整段数组调用一次talib对比
+python tests/bench_indicator.py
+'''
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+import talib
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from utils.indicator import SMA, EMA, RollingStd, ATR, RSI, Bollinger, MACD     # noqa: E402
+
+
+N: int = 100000         # 更新次数
+WINDOW: int = 1000      # talib每次计算的数组长度(同ArrayManager默认size的量级)
+
+
+def per_update(func: Callable[[], None], count: int) -> float:
+    '''
+    func执行count次更新, 返回每次更新耗时(微秒)
+    '''
+    start: float = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main() -> None:
+    rng: np.random.Generator = np.random.default_rng(0)
+    close: np.ndarray = 4000 + np.cumsum(rng.integers(-3, 4, N)).astype(float)
+    high: np.ndarray = close + 2
+    low: np.ndarray = close - 2
+    closes: list = close.tolist()
+    bars: list = list(zip(high.tolist(), low.tolist(), closes))
+
+    def single(indicator) -> Callable[[], None]:
+        def func() -> None:
+            update = indicator.update
+            for x in closes:
+                update(x)
+        return func
+
+    def atr() -> None:
+        update = ATR(14).update
+        for h, l, c in bars:
+            update(h, l, c)
+
+    cases: Dict[str, Callable[[], None]] = {
+        "SMA(20)": single(SMA(20)),
+        "EMA(20)": single(EMA(20)),
+        "RollingStd(20)": single(RollingStd(20)),
+        "ATR(14)": atr,
+        "RSI(14)": single(RSI(14)),
+        "Bollinger(20)": single(Bollinger(20)),
+        "MACD(12, 26, 9)": single(MACD()),
+    }
+    for name, func in cases.items():
+        print(f"{name:<16} {per_update(func, N):.3f} us/update")
+
+    array: np.ndarray = close[:WINDOW]
+    count: int = 10000
+
+    def talib_sma() -> None:
+        for _ in range(count):
+            talib.SMA(array, 20)
+
+    print(f"{'talib.SMA(20)':<16} {per_update(talib_sma, count):.3f} us/call over {WINDOW} bars")
+
+
+if __name__ == "__main__":
+    main()
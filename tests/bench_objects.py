@@ -0,0 +1,73 @@
+'''
+slotted dataclass与普通dataclass的内存占用和属性访问耗时对比(耗时含lambda调用开销, 用于相对比较)
+另列出不带datetime_ns的slotted TickData, 两者之差为每个tick保存纳秒时间戳的开销(1个slot + 1个int对象)
+python tests/bench_objects.py
+'''
+import sys
+import timeit
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from datastructure.constant import Exchange        # noqa: E402
+from datastructure.object import BarData, BaseData, TickData, add_slots     # noqa: E402
+
+
+N: int = 100000
+
+
+def get_specs(cls: type, exclude: tuple = ()) -> list:
+    return [
+        (f.name, f.type) if f.default is MISSING else (f.name, f.type, field(default=f.default))
+        for f in fields(cls) if f.name not in exclude
+    ]
+
+
+def make_plain(cls: type) -> type:
+    '''
+    字段和__post_init__相同的普通dataclass(实例带__dict__)
+    '''
+    namespace: dict = {"__post_init__": cls.__post_init__} if hasattr(cls, "__post_init__") else {}
+    return make_dataclass("Plain" + cls.__name__, get_specs(cls), namespace=namespace)
+
+
+def make_without_ns(cls: type) -> type:
+    '''
+    不带datetime_ns字段的slotted dataclass
+    '''
+    return add_slots(make_dataclass(cls.__name__ + "NoNs", get_specs(cls, ("datetime_ns",)), bases=(BaseData,)))
+
+
+def measure(factory: Callable[[int], object]) -> float:
+    '''
+    构造N个实例, 返回每个实例占用字节数(含新建的float)
+    '''
+    tracemalloc.start()
+    objects: List[object] = [factory(i) for i in range(N)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size / N
+
+
+def main() -> None:
+    dt: datetime = datetime(2023, 1, 3, 9)
+    for cls in (TickData, BarData):
+        variants: List[type] = [make_plain(cls), cls]
+        if cls is TickData:
+            variants.append(make_without_ns(cls))
+        for c in variants:
+            def factory(i: int, c=c) -> object:
+                return c("rb2305", Exchange.SHFE, dt, volume=i * 1.5, turnover=i * 2.5)
+            obj = factory(1)
+            get: float = min(timeit.repeat(lambda: obj.volume, number=N, repeat=5)) / N * 1e9
+            set_: float = min(timeit.repeat(lambda: setattr(obj, "volume", 1.0), number=N, repeat=5)) / N * 1e9
+            new: float = min(timeit.repeat(lambda: factory(1), number=N, repeat=5)) / N * 1e9
+            print(f"{c.__name__:<14} {measure(factory):6.0f} B/instance  get {get:5.1f} ns  set {set_:5.1f} ns  init {new:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 仓库根目录加入sys.path, 与在根目录运行脚本时的导入方式一致
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
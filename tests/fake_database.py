@@ -0,0 +1,115 @@
+'''
+测试用内存数据库: tick数据存于DataFrame, 记录load_tick_df的调用
+'''
+from datetime import datetime
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from datastructure.constant import Exchange, Interval
+from datastructure.object import BarData, TickData, HistoryRequest
+from db.database import BaseDatabase, BarOverview, TickOverview, TICK_COLUMNS, ticks_to_df
+from utils.data_process import history_tickdata_processor
+
+
+def make_tick_df(symbol: str = "rb2305", exchange: str = "SHFE", days: List[str] = None, n: int = 200) -> pd.DataFrame:
+    '''
+    每个日期9点起每500ms一个tick, 成交量为当日累计值
+    '''
+    frames: List[pd.DataFrame] = []
+    rng: np.random.Generator = np.random.default_rng(0)
+    for day in days or ["2023-01-03", "2023-01-04", "2023-01-05"]:
+        price: np.ndarray = 4000 + np.cumsum(rng.integers(-2, 3, n))
+        volume: np.ndarray = np.cumsum(rng.integers(0, 20, n)).astype(float)
+        frames.append(pd.DataFrame({
+            "symbol": symbol,
+            "exchange": exchange,
+            "datetime": pd.date_range(f"{day} 09:00:00", periods=n, freq="500ms"),
+            "volume": volume,
+            "turnover": volume * 4000 * 10,
+            "open_interest": 10000.0,
+            "last_price": price.astype(float),
+            "highest_price": price.astype(float) + 5,
+            "lowest_price": price.astype(float) - 5,
+            "bid_price_1": price.astype(float) - 1,
+            "ask_price_1": price.astype(float) + 1,
+            "bid_volume_1": 5.0,
+            "ask_volume_1": 6.0,
+        }))
+    return pd.concat(frames, ignore_index=True).loc[:, TICK_COLUMNS]
+
+
+def df2data_rows(df: pd.DataFrame) -> List[TickData]:
+    '''
+    逐行构造TickData(df2data向量化之前的实现), 用于对比
+    '''
+    ticks: List[TickData] = []
+    for _, row in df.iterrows():
+        ticks.append(TickData(
+            symbol=row['symbol'],
+            exchange=Exchange(row['exchange']),
+            datetime=row['datetime'],
+            volume=row['volume'],
+            turnover=row["turnover"],
+            open_interest=row['open_interest'],
+            last_price=row['last_price'],
+            highest_price=row['highest_price'],
+            lowest_price=row['lowest_price'],
+            bid_price_1=row['bid_price_1'],
+            bid_volume_1=row['bid_volume_1'],
+            ask_price_1=row['ask_price_1'],
+            ask_volume_1=row['ask_volume_1']
+        ))
+    return ticks
+
+
+class MemoryDatabase(BaseDatabase):
+    '''
+    内存数据库
+    '''
+    def __init__(self, df: pd.DataFrame = None) -> None:
+        self.df: pd.DataFrame = df if df is not None else pd.DataFrame(columns=TICK_COLUMNS)
+        self.queries: List[Tuple[str, datetime, datetime]] = []
+        self.overview_reads: int = 0
+        self.batches: List[List[HistoryRequest]] = []      # load_tick_df_many的请求
+
+    def save_bar_data(self, bars: List[BarData]) -> bool:
+        return False
+
+    def save_tick_data(self, ticks: List[TickData]) -> bool:
+        self.df = pd.concat([self.df, ticks_to_df(ticks)], ignore_index=True)
+        return True
+
+    def load_bar_data(self, symbol: str, exchange: Exchange, interval: Interval, start: datetime, end: datetime) -> List[BarData]:
+        return []
+
+    def load_tick_data(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> List[TickData]:
+        return history_tickdata_processor.df2data(self.load_tick_df(symbol, exchange, start, end))
+
+    def load_tick_df_many(self, reqs: List[HistoryRequest]) -> List[pd.DataFrame]:
+        self.batches.append(reqs)
+        return super().load_tick_df_many(reqs)
+
+    def load_tick_df(self, symbol: str, exchange: Exchange, start: datetime, end: datetime) -> pd.DataFrame:
+        self.queries.append((symbol, start, end))
+        df: pd.DataFrame = self.df
+        mask = (df["symbol"] == symbol) & (df["exchange"] == exchange.value) & (df["datetime"] >= start) & (df["datetime"] <= end)
+        return df.loc[mask].reset_index(drop=True)
+
+    def delete_bar_data(self, symbol: str, exchange: Exchange, interval: Interval) -> int:
+        return 0
+
+    def delete_tick_data(self, symbol: str, exchange: Exchange) -> int:
+        return 0
+
+    def get_bar_overview(self) -> List[BarOverview]:
+        return []
+
+    def get_tick_overview(self) -> List[TickOverview]:
+        self.overview_reads += 1
+        return [
+            TickOverview(symbol=symbol, exchange=Exchange(exchange), count=len(group),
+                         start=group["datetime"].min().to_pydatetime(), end=group["datetime"].max().to_pydatetime())
+            for (symbol, exchange), group in self.df.groupby(["symbol", "exchange"])
+        ]
@@ -0,0 +1,130 @@
+'''
+测试用dolphindb替身: 未安装dolphindb时注册假模块, 使db.to_dolphindb可导入; FakeSession模拟连接
+'''
+import sys
+import types
+from typing import Dict, List
+
+import pandas as pd
+
+
+class FakeSession:
+    '''
+    模拟ddb.session: 记录执行的脚本, broken为True时run抛出异常
+    '''
+    def __init__(self) -> None:
+        self.closed: bool = True
+        self.broken: bool = False
+        self.scripts: List[str] = []
+        self.frames: List[pd.DataFrame] = []    # 查询返回的数据, 游标查询时每个DataFrame为一块
+        self.tables: Dict[str, pd.DataFrame] = {}   # 指定表名时toDF返回该表(不执行where条件)
+        self.blocks: List[FakeBlock] = []
+
+    def connect(self, host: str, port: int, user: str, password: str) -> bool:
+        self.closed = False
+        return True
+
+    def run(self, script: str, *args, fetchSize: int = None, **kwargs):
+        if self.broken or self.closed:
+            raise RuntimeError("connection lost")
+        self.scripts.append(script)
+        if fetchSize is not None:
+            block: FakeBlock = FakeBlock(list(self.frames))
+            self.blocks.append(block)
+            return block
+        return 1
+
+    def loadTable(self, tableName: str, dbPath: str) -> "FakeTable":
+        return FakeTable(self, tableName)
+
+    def isClosed(self) -> bool:
+        return self.closed
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeTable:
+    '''
+    模拟session.loadTable返回的表: select/where只记录SQL
+    '''
+    def __init__(self, session: FakeSession, name: str) -> None:
+        self.session: FakeSession = session
+        self.name: str = name
+        self.sql: str = f"select * from {name}"
+
+    def select(self, columns: List[str]) -> "FakeTable":
+        self.sql = self.sql.replace("*", ",".join(columns))
+        return self
+
+    def where(self, condition: str) -> "FakeTable":
+        self.sql += f" where {condition}" if " where " not in self.sql else f" and {condition}"
+        return self
+
+    def delete(self) -> "FakeTable":
+        self.sql = f"delete from {self.name}"
+        return self
+
+    def execute(self) -> None:
+        self.session.scripts.append(self.sql)
+        self.session.tables.pop(self.name, None)
+
+    def showSQL(self) -> str:
+        return self.sql
+
+    def toDF(self) -> pd.DataFrame:
+        self.session.scripts.append(self.sql)
+        if self.name in self.session.tables:
+            return self.session.tables[self.name].copy()
+        if self.session.frames:
+            return pd.concat(self.session.frames, ignore_index=True)
+        return pd.DataFrame()
+
+
+class FakeUpsert:
+    '''
+    模拟ddb.tableUpsert: 按keyColNames去重后写入session.tables
+    '''
+    def __init__(self, dbPath: str, tableName: str, ddbSession: FakeSession, keyColNames: List[str]) -> None:
+        self.session: FakeSession = ddbSession
+        self.name: str = tableName
+        self.keys: List[str] = keyColNames
+
+    def upsert(self, df: pd.DataFrame) -> None:
+        frames: List[pd.DataFrame] = [self.session.tables[self.name], df] if self.name in self.session.tables else [df]
+        table: pd.DataFrame = pd.concat(frames, ignore_index=True).drop_duplicates(self.keys, keep="last")
+        self.session.tables[self.name] = table.reset_index(drop=True)
+
+
+class FakeBlock:
+    '''
+    模拟服务端游标(BlockReader)
+    '''
+    def __init__(self, frames: List[pd.DataFrame]) -> None:
+        self.frames: List[pd.DataFrame] = frames
+        self.skipped: bool = False
+
+    def hasNext(self) -> bool:
+        return bool(self.frames)
+
+    def read(self) -> pd.DataFrame:
+        return self.frames.pop(0).copy()
+
+    def skipAll(self) -> None:
+        self.frames.clear()
+        self.skipped = True
+
+
+def install() -> None:
+    '''
+    未安装dolphindb时注册假模块
+    '''
+    try:
+        import dolphindb  # noqa: F401
+    except ImportError:
+        module = types.ModuleType("dolphindb")
+        module.session = FakeSession
+        module.tableUpsert = FakeUpsert
+        module.settings = types.ModuleType("dolphindb.settings")
+        sys.modules["dolphindb"] = module
+        sys.modules["dolphindb.settings"] = module.settings
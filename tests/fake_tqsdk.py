@@ -0,0 +1,43 @@
+'''
+测试用tqsdk csv文件: 字段顺序同tqsdk下载的tick数据, datetime为9位小数的北京时间字符串, datetime_nano为UTC纳秒时间戳
+'''
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+# tqsdk tick字段(不含"交易所.合约."前缀)
+TQSDK_FIELDS: List[str] = [
+    "last_price", "highest", "lowest", "volume", "amount", "open_interest",
+    "bid_price1", "bid_volume1", "ask_price1", "ask_volume1"
+]
+
+
+def write_tqsdk_csv(path: Path, symbol: str = "rb2305", exchange: str = "SHFE", start: str = "2023-01-03 09:00:00.5",
+                    n: int = 20, freq: str = "500ms", nano: bool = True) -> Path:
+    '''
+    从start起每freq一个tick; 第2行有缺失值, 附加一个多余字段
+    '''
+    rng: np.random.Generator = np.random.default_rng(0)
+    datetimes: pd.DatetimeIndex = pd.date_range(start, periods=n, freq=freq) + pd.Timedelta(nanoseconds=123)
+    price: np.ndarray = 4000 + np.cumsum(rng.integers(-2, 3, n)).astype(float)
+    volume: np.ndarray = np.cumsum(rng.integers(0, 20, n)).astype(float)
+    prefix: str = f"{exchange}.{symbol}."
+    data: dict = {"datetime": datetimes.strftime("%Y-%m-%d %H:%M:%S.%f") + "123"}
+    if nano:
+        data["datetime_nano"] = (datetimes - pd.Timedelta(hours=8)).asi8
+    values: dict = {
+        "last_price": price, "highest": price + 5, "lowest": price - 5, "volume": volume, "amount": volume * price * 10,
+        "open_interest": np.full(n, 10000.0), "bid_price1": price - 1, "bid_volume1": np.full(n, 5.0),
+        "ask_price1": price + 1, "ask_volume1": np.full(n, 6.0)
+    }
+    for name in TQSDK_FIELDS:
+        data[prefix + name] = values[name]
+    data[prefix + "average"] = price
+    df: pd.DataFrame = pd.DataFrame(data)
+    df.loc[1, prefix + "last_price"] = np.nan
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+    return path
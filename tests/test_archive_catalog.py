@@ -0,0 +1,76 @@
+import os
+import shutil
+from pathlib import Path
+from typing import List
+
+import utils.archive_catalog as archive_catalog
+from utils.archive_catalog import ArchiveCatalog
+from fake_tqsdk import write_tqsdk_csv
+
+
+def write(root: Path, day: str, exchange: str, symbol: str) -> str:
+    return str(write_tqsdk_csv(root.joinpath(day, f"{exchange}.{symbol}.csv"), symbol, exchange, n=3))
+
+
+def touch(path: Path, seconds: float) -> None:
+    '''
+    修改时间后移, 避免文件系统时间精度导致修改时间不变
+    '''
+    stat: os.stat_result = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + seconds))
+
+
+def test_scan_refresh_and_filters(tmp_path: Path, monkeypatch) -> None:
+    root: Path = tmp_path.joinpath("data")
+    rb: str = write(root, "20230103", "SHFE", "rb2305")
+    hc: str = write(root, "20230103", "SHFE", "hc2305")
+    sc: str = write(root, "20230104", "INE", "sc2305")
+    root.joinpath("20230104", "notes.txt").write_text("")
+    headers: List[str] = []
+    read_csv_header = archive_catalog.read_csv_header
+    monkeypatch.setattr(archive_catalog, "read_csv_header", lambda path: headers.append(path) or read_csv_header(path))
+
+    # 首次扫描
+    catalog: ArchiveCatalog = ArchiveCatalog(str(root), str(tmp_path.joinpath("catalog.sqlite")))
+    assert sorted(catalog.refresh()) == sorted([rb, hc, sc])
+    assert catalog.get_days() == ["20230103", "20230104"]
+    assert catalog.get_files() == sorted([rb, hc]) + [sc]
+    assert catalog.get_file_info(sc)["exchange"] == "INE" and catalog.get_file_info(sc)["symbol"] == "sc2305"
+
+    # 过滤: 日期闭区间、交易所、合约
+    assert catalog.get_files(start_day="20230104") == [sc]
+    assert catalog.get_files(end_day="20230103") == sorted([rb, hc])
+    assert catalog.get_files(exchange="SHFE") == sorted([rb, hc])
+    assert catalog.get_files(exchange="SHFE", symbol="hc2305") == [hc]
+    assert catalog.get_files(start_day="20230103", end_day="20230103", exchange="INE") == []
+
+    # 文件夹未变化: 不读取表头; 重新打开索引同样跳过
+    headers.clear()
+    assert catalog.refresh() == []
+    catalog.close()
+    catalog = ArchiveCatalog(str(root), str(tmp_path.joinpath("catalog.sqlite")))
+    assert catalog.refresh() == []
+    assert headers == []
+
+    # 新增文件改变文件夹修改时间: 只读取新文件的表头
+    cu: str = write(root, "20230104", "SHFE", "cu2305")
+    touch(root.joinpath("20230104"), 10)
+    assert catalog.refresh() == [cu]
+    assert headers == [cu]
+    assert catalog.get_files(start_day="20230104") == [sc, cu]
+
+    # 原地改写的文件只在full刷新时发现
+    touch(Path(rb), 10)
+    assert catalog.refresh() == []
+    assert catalog.refresh(full=True) == [rb]
+
+    # 删除文件和日文件夹
+    os.remove(hc)
+    touch(root.joinpath("20230103"), 20)
+    assert catalog.refresh() == []
+    assert catalog.get_files(end_day="20230103") == [rb]
+    shutil.rmtree(root.joinpath("20230104"))
+    catalog.refresh()
+    assert catalog.get_days() == ["20230103"]
+    assert catalog.get_files() == [rb]
+    catalog.close()
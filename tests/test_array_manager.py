@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+from typing import List
+
+import numpy as np
+import pytest
+
+from datastructure.constant import Exchange, Interval
+from datastructure.object import BarData
+from utils.utils_class import ArrayManager
+
+
+FIELDS: List[str] = ["open_price", "high_price", "low_price", "close_price", "volume", "turnover", "open_interest"]
+ARRAYS: List[str] = ["open", "high", "low", "close", "volume", "turnover", "open_interest"]
+
+
+def make_bars(n: int) -> List[BarData]:
+    start: datetime = datetime(2023, 1, 3, 9)
+    return [
+        BarData("rb2305", Exchange.SHFE, start + timedelta(minutes=i), Interval.MINUTE,
+                volume=1000 + i, turnover=2000 + i, open_interest=3000 + i,
+                open_price=4000 + i, high_price=5000 + i, low_price=6000 + i, close_price=7000 + i)
+        for i in range(n)
+    ]
+
+
+def test_arrays_hold_last_size_bars_in_order() -> None:
+    size: int = 5
+    am: ArrayManager = ArrayManager(size)
+    bars: List[BarData] = make_bars(2 * size + 3)
+    for i, bar in enumerate(bars):
+        am.update_bar(bar)
+        count: int = i + 1
+        assert am.inited == (count >= size)
+        recent: List[BarData] = bars[max(0, count - size): count]
+        for name, field in zip(ARRAYS, FIELDS):
+            array: np.ndarray = getattr(am, name)
+            assert array.shape == (size,) and array.flags.c_contiguous
+            # 未装满时前面补0
+            expected: List[float] = [0.0] * (size - len(recent)) + [getattr(bar, field) for bar in recent]
+            assert array.tolist() == expected
+
+
+def test_mirrored_writes_keep_buffer_halves_equal() -> None:
+    am: ArrayManager = ArrayManager(4)
+    for bar in make_bars(11):
+        am.update_bar(bar)
+    np.testing.assert_array_equal(am.buffer[:, :4], am.buffer[:, 4:])
+    assert am.index == 11 % 4
+    assert am.close.base is am.buffer
+
+
+def test_indicator_cache_is_read_only_and_cleared_per_bar() -> None:
+    am: ArrayManager = ArrayManager(5)
+    bars: List[BarData] = make_bars(8)
+    for bar in bars[:7]:
+        am.update_bar(bar)
+
+    sma: np.ndarray = am.sma(3, array=True)
+    assert am.sma(3, array=True) is sma
+    assert am.sma(3) == sma[-1] == 7005.0
+    assert am.ema(3) == am.ema(3)
+    assert am.get_cache_statistics() == {"hits": 2, "misses": 3, "hit_rate": 0.4}
+
+    # 缓存结果只读, 原地修改失败
+    assert not sma.flags.writeable
+    with pytest.raises(ValueError):
+        sma[-1] = 0
+    assert am.sma(3, array=True)[-1] == 7005.0
+
+    # 新bar到达后重新计算
+    am.update_bar(bars[7])
+    assert am.sma(3) == 7006.0
+    assert am.sma(3, array=True) is not sma
+    assert am.get_cache_statistics()["misses"] == 5
@@ -0,0 +1,85 @@
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from datastructure.constant import Exchange, Interval
+from db.bar_cache import BarCache
+from utils.resample import resample_tick_df, resample_threshold_bars
+from fake_database import MemoryDatabase, make_tick_df
+
+
+START: datetime = datetime(2023, 1, 3)
+END: datetime = datetime(2023, 1, 6, 17)
+
+
+def resample_by_day(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    每个交易日单独合成(成交量为交易日累计值)
+    '''
+    frames = [resample_tick_df(group) for _, group in df.groupby(df["datetime"].dt.date)]
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_hits_and_fingerprint_invalidation(tmp_path: Path) -> None:
+    database: MemoryDatabase = MemoryDatabase(make_tick_df(days=["2023-01-03", "2023-01-04", "2023-01-05"]))
+    cache: BarCache = BarCache(database, str(tmp_path))
+
+    # 首次读取: 只合成tick数据范围内的交易日, 01-06无数据不写入分区
+    df: pd.DataFrame = cache.load_bar_df("rb2305", Exchange.SHFE, START, END)
+    pd.testing.assert_frame_equal(df, resample_by_day(database.df), check_dtype=False)
+    assert cache.get_statistics() == {"hits": 0, "misses": 3, "hit_rate": 0}
+    assert len(database.queries) == 3
+    partition_dir: Path = tmp_path.joinpath("bar", Exchange.SHFE.value, "rb2305", "1m")
+    assert sorted(path.name for path in partition_dir.iterdir()) == ["20230103", "20230104", "20230105"]
+
+    # 再次读取全部命中, 不读取tick
+    pd.testing.assert_frame_equal(cache.load_bar_df("rb2305", Exchange.SHFE, START, END), df)
+    assert cache.get_statistics() == {"hits": 3, "misses": 3, "hit_rate": 0.5}
+    assert len(database.queries) == 3
+
+    # 追加01-06数据: 已完整的01-03/01-04仍然命中, 只重新合成合成时不完整的01-05和新增的01-06
+    database.df = make_tick_df(days=["2023-01-03", "2023-01-04", "2023-01-05", "2023-01-06"])
+    df = cache.load_bar_df("rb2305", Exchange.SHFE, START, END)
+    pd.testing.assert_frame_equal(df, resample_by_day(database.df), check_dtype=False)
+    assert cache.get_statistics() == {"hits": 5, "misses": 5, "hit_rate": 0.5}
+    assert [query[2].date().isoformat() for query in database.queries[3:]] == ["2023-01-05", "2023-01-06"]
+    assert df["datetime"].dt.date.astype(str).unique().tolist()[-1] == "2023-01-06"
+
+    # 结束时间不变而条数变化(修改历史数据): 以当前指纹写入的01-05/01-06重新合成, 更早的完整分区需调用invalidate
+    database.df = database.df.iloc[1:]
+    cache.load_bar_df("rb2305", Exchange.SHFE, START, END)
+    assert cache.get_statistics()["misses"] == 7
+
+
+def test_symbol_without_ticks(tmp_path: Path) -> None:
+    database: MemoryDatabase = MemoryDatabase(make_tick_df(days=["2023-01-03"]))
+    cache: BarCache = BarCache(database, str(tmp_path))
+
+    # 无tickoverview的合约直接返回空表, 不读取tick也不写入分区
+    df: pd.DataFrame = cache.load_bar_df("hc2305", Exchange.SHFE, START, END)
+    assert df.empty
+    assert database.queries == []
+    assert not tmp_path.joinpath("bar").exists()
+
+    # 查询区间远大于数据范围时只合成有数据的交易日
+    cache.load_bar_df("rb2305", Exchange.SHFE, datetime(2022, 1, 1), datetime(2024, 1, 1))
+    assert cache.get_statistics()["misses"] == 1
+    assert len(database.queries) == 1
+
+
+def test_specs_are_cached_separately(tmp_path: Path) -> None:
+    database: MemoryDatabase = MemoryDatabase(make_tick_df(days=["2023-01-03"]))
+    cache: BarCache = BarCache(database, str(tmp_path))
+    end: datetime = datetime(2023, 1, 3, 17)
+
+    minute: pd.DataFrame = cache.load_bar_df("rb2305", Exchange.SHFE, START, end)
+    volume: pd.DataFrame = cache.load_bar_df("rb2305", Exchange.SHFE, START, end, Interval.VOLUME, 200)
+    pd.testing.assert_frame_equal(volume, resample_threshold_bars(database.df, Interval.VOLUME, 200), check_dtype=False)
+    assert len(minute) != len(volume)
+    assert cache.get_statistics()["misses"] == 2
+
+    # 清除合约缓存后重新合成
+    cache.invalidate("rb2305", Exchange.SHFE)
+    cache.load_bar_df("rb2305", Exchange.SHFE, START, end)
+    assert cache.get_statistics() == {"hits": 0, "misses": 3, "hit_rate": 0}
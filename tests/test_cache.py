@@ -0,0 +1,178 @@
+from datetime import datetime
+from pathlib import Path
+from threading import Thread
+from typing import List
+
+import pandas as pd
+
+import fake_dolphindb
+from datastructure.constant import Exchange
+from datastructure.object import HistoryRequest
+from datastructure.setting import SETTING
+import db.cache
+import db.database
+from db.cache import CachedDatabase
+from fake_database import MemoryDatabase, make_tick_df
+
+fake_dolphindb.install()
+import db.to_dolphindb as to_dolphindb       # noqa: E402
+
+
+START: datetime = datetime(2010, 1, 1)
+END: datetime = datetime(2030, 12, 31)
+
+
+def test_walk_is_bounded_by_overview(tmp_path: Path) -> None:
+    # 数据只有周五和下周一, 读取区间为默认的2010-2030
+    database: MemoryDatabase = MemoryDatabase(make_tick_df(days=["2023-01-06", "2023-01-09"]))
+    cache: CachedDatabase = CachedDatabase(database, str(tmp_path), 1 << 30)
+
+    df: pd.DataFrame = cache.load_tick_df("rb2305", Exchange.SHFE, START, END)
+    assert len(df) == len(database.df)
+    assert database.overview_reads == 1
+    # 周五至周一一次查询, 周末只记录在索引中, 不写分区
+    assert len(database.queries) == 1
+    assert len(cache.index) == 2
+    assert sorted(cache.empty_days) == ["tick/SHFE/rb2305/20230107", "tick/SHFE/rb2305/20230108"]
+    assert len(list(tmp_path.glob("tick/*/*/*/meta.json"))) == 2
+
+    # 再次读取全部命中, 重新打开后索引一致
+    df2: pd.DataFrame = CachedDatabase(database, str(tmp_path), 1 << 30).load_tick_df("rb2305", Exchange.SHFE, START, END)
+    assert len(database.queries) == 1
+    pd.testing.assert_frame_equal(df, df2, check_dtype=False)
+
+
+def test_fingerprint_change_refetches_empty_days(tmp_path: Path) -> None:
+    database: MemoryDatabase = MemoryDatabase(make_tick_df(days=["2023-01-06", "2023-01-09"]))
+    cache: CachedDatabase = CachedDatabase(database, str(tmp_path), 1 << 30)
+    cache.load_tick_df("rb2305", Exchange.SHFE, START, END)
+
+    # 底层数据补上周六, 指纹变化后缓存失效
+    database.df = make_tick_df(days=["2023-01-06", "2023-01-07", "2023-01-09"])
+    df: pd.DataFrame = cache.load_tick_df("rb2305", Exchange.SHFE, START, END)
+    assert len(df) == len(database.df)
+    assert list(cache.empty_days) == ["tick/SHFE/rb2305/20230108"]
+
+
+def test_concurrent_loads(tmp_path: Path) -> None:
+    symbols: List[str] = [f"rb23{i:02d}" for i in range(1, 9)]
+    database: MemoryDatabase = MemoryDatabase(pd.concat([make_tick_df(symbol) for symbol in symbols], ignore_index=True))
+    cache: CachedDatabase = CachedDatabase(database, str(tmp_path), 1 << 30)
+    results: dict = {}
+
+    def load(symbol: str) -> None:
+        results[symbol] = len(cache.load_tick_df(symbol, Exchange.SHFE, START, END))
+
+    threads: List[Thread] = [Thread(target=load, args=(symbol,)) for symbol in symbols for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {symbol: 600 for symbol in symbols}
+    reopened: CachedDatabase = CachedDatabase(database, str(tmp_path), 1 << 30)
+    assert list(reopened.index.items()) == list(cache.index.items())
+    assert reopened.total_size == cache.total_size == sum(cache.index.values())
+
+
+def test_load_tick_data_many_fetches_missing_ranges_in_one_batch(tmp_path: Path) -> None:
+    symbols: List[str] = ["rb2301", "rb2302", "rb2303"]
+    database: MemoryDatabase = MemoryDatabase(pd.concat([make_tick_df(symbol) for symbol in symbols], ignore_index=True))
+    cache: CachedDatabase = CachedDatabase(database, str(tmp_path), 1 << 30)
+    # rb2301的第一天已缓存
+    cache.load_tick_df("rb2301", Exchange.SHFE, datetime(2023, 1, 3), datetime(2023, 1, 3, 23))
+    database.queries.clear()
+
+    reqs: List[HistoryRequest] = [HistoryRequest(symbol, Exchange.SHFE, START, END) for symbol in symbols]
+    results = cache.load_tick_data_many(reqs)
+    assert [len(ticks) for ticks in results] == [600, 600, 600]
+    assert [tick.symbol for tick in results[1][:1]] == ["rb2302"]
+    assert len(database.batches) == 1
+    assert [(req.symbol, req.start.day) for req in database.batches[0]] == [("rb2301", 4), ("rb2302", 3), ("rb2303", 3)]
+
+    # 全部命中时不查询数据库
+    cached = cache.load_tick_data_many(reqs)
+    assert database.batches[-1] == []
+    assert [ticks[-1] for ticks in cached] == [ticks[-1] for ticks in results]
+
+
+def test_stream_reads_overview_and_saves_index_once(tmp_path: Path, monkeypatch) -> None:
+    database: MemoryDatabase = MemoryDatabase(make_tick_df(days=["2023-01-06", "2023-01-09", "2023-01-10"]))
+    cache: CachedDatabase = CachedDatabase(database, str(tmp_path), 1 << 30)
+    saves: List[int] = []
+    save_index = cache.save_index
+    monkeypatch.setattr(cache, "save_index", lambda: saves.append(1) or save_index())
+
+    chunks = list(cache.stream_tick_data("rb2305", Exchange.SHFE, START, END, chunk_size=150))
+    assert [len(chunk) for chunk in chunks] == [150, 50] * 3
+    assert database.overview_reads == 1
+    assert len(saves) == 1
+    # 只逐日查询tickoverview范围内的日期(01-06至01-10)
+    assert len(database.queries) == 5
+
+    # 提前结束也保存索引
+    iterator = cache.stream_tick_data("rb2305", Exchange.SHFE, START, END, chunk_size=150)
+    next(iterator)
+    iterator.close()
+    assert len(saves) == 2 and database.overview_reads == 2
+    assert len(database.queries) == 5
+
+
+def test_default_database_keeps_ingest_entry_point(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(to_dolphindb.Database, "init_db", lambda self: None)
+    monkeypatch.setattr(db.database, "database", None)
+    monkeypatch.setitem(SETTING, "database.cache_path", str(tmp_path))
+
+    # 默认不启用缓存
+    database = db.database.get_database()
+    assert isinstance(database, to_dolphindb.Database)
+    assert callable(database._save_all_history_tickdata)
+
+    # 启用缓存时未包装的属性转发给dolphindb
+    monkeypatch.setattr(db.database, "database", None)
+    monkeypatch.setitem(SETTING, "database.cache", True)
+    cached = db.database.get_database()
+    assert isinstance(cached, CachedDatabase)
+    assert cached._save_all_history_tickdata.__self__ is cached.database
+
+
+def test_forwarded_writes_invalidate_by_fingerprint(tmp_path: Path) -> None:
+    database: MemoryDatabase = MemoryDatabase(make_tick_df(days=["2023-01-03"]))
+    cache: CachedDatabase = CachedDatabase(database, str(tmp_path), 1 << 30)
+    cache.load_tick_df("rb2305", Exchange.SHFE, START, END)
+    database.queries.clear()
+
+    # 绕过缓存直接写入底层数据库(如历史数据导入)
+    cache.database.save_tick_df(make_tick_df(days=["2023-01-03"], n=300).iloc[200:])
+    df: pd.DataFrame = cache.load_tick_df("rb2305", Exchange.SHFE, START, END)
+    assert len(df) == 300
+    assert len(database.queries) == 1
+
+
+def test_failed_delete_is_retried_on_evict(tmp_path: Path, monkeypatch) -> None:
+    database: MemoryDatabase = MemoryDatabase(make_tick_df(days=["2023-01-06", "2023-01-09"]))
+    cache: CachedDatabase = CachedDatabase(database, str(tmp_path), 1 << 30)
+    cache.load_tick_df("rb2305", Exchange.SHFE, START, END)
+    total_size: int = cache.total_size
+    remove_partition = db.cache.remove_partition
+
+    def locked(path: Path) -> None:
+        raise PermissionError(path)
+
+    # 删除失败: 分区移出索引但仍计入总大小, 不再被读取
+    monkeypatch.setattr(db.cache, "remove_partition", locked)
+    cache.invalidate("rb2305", Exchange.SHFE)
+    assert not cache.index
+    assert sorted(cache.pending_deletes) == ["tick/SHFE/rb2305/20230106", "tick/SHFE/rb2305/20230109"]
+    assert cache.total_size == total_size
+    assert len(list(tmp_path.glob("tick/*/*/*/meta.json"))) == 2
+
+    # 重新打开后仍记录待删除分区
+    cache = CachedDatabase(database, str(tmp_path), 1 << 30)
+    assert cache.total_size == total_size and len(cache.pending_deletes) == 2
+
+    # 下次淘汰时重试删除
+    monkeypatch.setattr(db.cache, "remove_partition", remove_partition)
+    cache.flush()
+    assert not cache.pending_deletes and cache.total_size == 0
+    assert not list(tmp_path.glob("tick/*/*/*/meta.json"))
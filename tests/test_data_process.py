@@ -0,0 +1,89 @@
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from datastructure.constant import Exchange
+from datastructure.object import TickData
+from utils.data_process import history_tickdata_processor, TQSDK_COLUMNS
+from utils.trading_calendar import get_product, trading_time_mask
+from fake_database import df2data_rows, make_tick_df
+from fake_tqsdk import write_tqsdk_csv
+
+
+def test_df2data_matches_row_by_row_construction() -> None:
+    df: pd.DataFrame = pd.concat([make_tick_df("rb2305", "SHFE"), make_tick_df("sc2305", "INE")], ignore_index=True)
+    df["datetime"] += pd.Timedelta(microseconds=7)
+    # 整数字段(清洗后volume等为int64)
+    df["volume"] = df["volume"].astype("int64")
+
+    ticks: List[TickData] = history_tickdata_processor.df2data(df)
+    assert ticks == df2data_rows(df)
+    assert [tick.datetime_ns for tick in ticks] == [tick.datetime_ns for tick in df2data_rows(df)]
+    assert {tick.exchange for tick in ticks} == {Exchange.SHFE, Exchange.INE}
+    assert all(type(tick.datetime) is datetime and type(tick.last_price) is float for tick in ticks)
+    assert type(ticks[0].volume) is int
+
+
+def test_df2data_keeps_row_order_of_filtered_frame() -> None:
+    df: pd.DataFrame = make_tick_df(n=10)
+    part: pd.DataFrame = df.iloc[::-3]
+    assert history_tickdata_processor.df2data(part) == df2data_rows(part)
+    assert history_tickdata_processor.df2data(df.iloc[:0]) == []
+
+
+def read_tqsdk_csv(csv_path: Path) -> pd.DataFrame:
+    '''
+    读取全部字段后按datetime字符串解析(类型化读取之前的实现), 截断到微秒
+    '''
+    df: pd.DataFrame = pd.read_csv(csv_path)
+    exchange_str, symbol_str = df.columns[2].split('.')[:2]
+    prefix: str = f"{exchange_str}.{symbol_str}."
+    df = df.drop(columns=['datetime_nano'], errors='ignore').dropna()
+    df = df.loc[:, ['datetime'] + [prefix + field for field in TQSDK_COLUMNS]]
+    df.columns = ['datetime'] + list(TQSDK_COLUMNS.values())
+    df['datetime'] = pd.to_datetime(df['datetime'].str[:-3], format="%Y-%m-%d %H:%M:%S.%f")
+    df['symbol'] = symbol_str
+    df['exchange'] = exchange_str
+    return df.loc[trading_time_mask(df['datetime'].to_numpy(), get_product(symbol_str))]
+
+
+def assert_same_as_string_path(csv_path: Path) -> pd.DataFrame:
+    df: pd.DataFrame = history_tickdata_processor.tqsdk_data_process(str(csv_path))
+    expected: pd.DataFrame = read_tqsdk_csv(csv_path)
+    pd.testing.assert_frame_equal(df, expected.loc[:, df.columns], check_dtype=False)
+    assert df['datetime'].dtype == 'datetime64[ns]'
+    assert df['volume'].dtype == 'int64' and df['last_price'].dtype == 'float64'
+    return df
+
+
+def test_tqsdk_datetime_nano_converted_to_shanghai(tmp_path: Path) -> None:
+    # 铜夜盘跨午夜: UTC时间仍在前一日16点前后
+    csv_path: Path = write_tqsdk_csv(tmp_path.joinpath("SHFE.cu2305.csv"), "cu2305", start="2023-01-03 23:59:58", n=10)
+    df: pd.DataFrame = assert_same_as_string_path(csv_path)
+    assert len(df) == 9      # 第2行有缺失值
+    assert df['datetime'].dt.date.astype(str).unique().tolist() == ["2023-01-03", "2023-01-04"]
+    # 纳秒部分截断到微秒
+    assert (df['datetime'].dt.nanosecond == 0).all()
+    assert df['datetime'].iloc[0] == pd.Timestamp("2023-01-03 23:59:58")
+
+
+def test_tqsdk_falls_back_to_datetime_string(tmp_path: Path) -> None:
+    csv_path: Path = write_tqsdk_csv(tmp_path.joinpath("SHFE.rb2305.csv"), start="2023-01-03 10:14:58", n=10, nano=False)
+    df: pd.DataFrame = assert_same_as_string_path(csv_path)
+    # 先截断到微秒再过滤: 10:15:00.000000123计为10:15:00收盘tick, 之后为休息时段
+    assert df['datetime'].max() == pd.Timestamp("2023-01-03 10:15:00")
+
+
+def test_tqsdk_missing_datetime_nano(tmp_path: Path) -> None:
+    csv_path: Path = write_tqsdk_csv(tmp_path.joinpath("SHFE.rb2305.csv"), start="2023-01-03 09:30:00", n=10)
+    raw: pd.DataFrame = pd.read_csv(csv_path, dtype=str)
+    raw.loc[4, 'datetime_nano'] = np.nan
+    raw.to_csv(csv_path, index=False)
+
+    df: pd.DataFrame = history_tickdata_processor.tqsdk_data_process(str(csv_path))
+    expected: pd.DataFrame = read_tqsdk_csv(csv_path).drop(index=4)
+    pd.testing.assert_frame_equal(df, expected.loc[:, df.columns], check_dtype=False)
+    assert df['datetime'].dtype == 'datetime64[ns]'
@@ -0,0 +1,47 @@
+import pandas as pd
+
+import fake_dolphindb
+from fake_dolphindb import FakeSession, FakeUpsert
+from fake_database import make_tick_df
+
+fake_dolphindb.install()
+import db.to_dolphindb as to_dolphindb       # noqa: E402
+from db.to_dolphindb import Database, SessionPool       # noqa: E402
+
+
+def make_database(session: FakeSession) -> Database:
+    database: Database = Database.__new__(Database)
+    database.db_paths = {"tick_db": "dfs://tick_db"}
+    database.tb_names = {"tick_tb": "tick", "tickoverview_tb": "tickoverview"}
+    database.pool = SessionPool("localhost", 8848, "admin", "123456", size=1)
+    database.pool.new_session = lambda: session
+    return database
+
+
+def test_overview_counts_follow_inserted_frame(monkeypatch) -> None:
+    monkeypatch.setattr(to_dolphindb.ddb, "tableUpsert", FakeUpsert)
+    session: FakeSession = FakeSession()
+    session.connect("localhost", 8848, "admin", "123456")
+    database: Database = make_database(session)
+    df: pd.DataFrame = make_tick_df(days=["2023-01-03", "2023-01-04"])
+    first, second = df.iloc[:300], df.iloc[300:]
+
+    # 首次写入
+    assert database.save_tick_df(first)
+    overview: pd.DataFrame = session.tables["tickoverview"]
+    assert overview["count"].tolist() == [300]
+
+    # 追加
+    database.save_tick_df(second)
+    overview = session.tables["tickoverview"]
+    assert overview["count"].tolist() == [400]
+    assert overview["end"].tolist() == [df["datetime"].max()]
+
+    # 重复导入: 已存在的时间戳不计入, 不执行count(*)
+    session.scripts.clear()
+    database.save_tick_df(df.iloc[250:350])
+    overview = session.tables["tickoverview"]
+    assert overview["count"].tolist() == [400] == [len(session.tables["tick"])]
+    assert not any("count(*)" in script for script in session.scripts)
+    # tickoverview按(symbol, exchange)精确匹配
+    assert 'delete from tickoverview where (symbol="rb2305" and exchange="SHFE")' in session.scripts
@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import List
+
+import pandas as pd
+
+import fake_dolphindb
+from fake_dolphindb import FakeSession
+from fake_database import make_tick_df
+
+fake_dolphindb.install()
+from datastructure.constant import Exchange        # noqa: E402
+from db.to_dolphindb import Database, SessionPool, TICK_QUERY_COLUMNS     # noqa: E402
+
+
+START: datetime = datetime(2023, 1, 1)
+END: datetime = datetime(2023, 1, 31)
+
+
+def make_database(frames: List[pd.DataFrame]) -> Database:
+    '''
+    不连接服务端的Database, 连接池中的session按块返回frames
+    '''
+    def new_session() -> FakeSession:
+        session: FakeSession = FakeSession()
+        session.connect("localhost", 8848, "admin", "123456")
+        session.frames = frames
+        sessions.append(session)
+        return session
+
+    sessions: List[FakeSession] = []
+    database: Database = Database.__new__(Database)
+    database.db_paths = {"tick_db": "dfs://tick_db"}
+    database.tb_names = {"tick_tb": "tick"}
+    database.pool = SessionPool("localhost", 8848, "admin", "123456", size=1)
+    database.pool.new_session = new_session
+    database.sessions = sessions
+    return database
+
+
+def get_frames() -> List[pd.DataFrame]:
+    df: pd.DataFrame = make_tick_df().loc[:, TICK_QUERY_COLUMNS]
+    return [df.iloc[i: i + 100].reset_index(drop=True) for i in range(0, len(df), 100)]
+
+
+def test_stream_reads_all_blocks() -> None:
+    database: Database = make_database(get_frames())
+    chunks = list(database.stream_tick_data("rb2305", Exchange.SHFE, START, END))
+    assert [len(chunk) for chunk in chunks] == [100] * 6
+    assert chunks[0][0].symbol == "rb2305" and chunks[0][0].exchange == Exchange.SHFE
+    assert "symbol" not in database.sessions[0].scripts[0].split(" where ")[0]
+    assert database.pool._idle.qsize() == 1 and database.pool._created == 1
+
+
+def test_stream_closed_early_returns_session() -> None:
+    database: Database = make_database(get_frames())
+    iterator = database.stream_tick_data("rb2305", Exchange.SHFE, START, END)
+    assert len(next(iterator)) == 100
+    assert database.pool._idle.qsize() == 0
+    iterator.close()
+
+    session: FakeSession = database.sessions[0]
+    assert session.blocks[0].skipped
+    assert database.pool._idle.qsize() == 1 and database.pool._created == 1
+    # 归还的连接可继续使用
+    assert len(database.load_tick_df("rb2305", Exchange.SHFE, START, END)) == 600
+    assert len(database.sessions) == 1
+
+
+def test_stream_abandoned_iterator_returns_session() -> None:
+    database: Database = make_database(get_frames())
+    iterator = database.stream_tick_data("rb2305", Exchange.SHFE, START, END)
+    next(iterator)
+    del iterator
+    assert database.pool._idle.qsize() == 1 and database.pool._created == 1
+
+
+def test_load_tick_pushes_down_time_range() -> None:
+    database: Database = make_database(get_frames())
+    start: datetime = datetime(2023, 1, 3, 9)
+    end: datetime = datetime(2023, 1, 3, 15, 0, 0, 500000)
+    df: pd.DataFrame = database.load_tick_df("rb2305", Exchange.SHFE, start, end)
+    assert (df["symbol"] == "rb2305").all() and (df["exchange"] == Exchange.SHFE.value).all()
+
+    sql: str = database.sessions[0].scripts[-1]
+    select, condition = sql.split(" where ")
+    # 时间条件下推到服务端(NANOTIMESTAMP常量), 只选取TICK_QUERY_COLUMNS
+    assert "datetime>=2023.01.03T09:00:00.000000000" in condition
+    assert "datetime<=2023.01.03T15:00:00.500000000" in condition
+    assert 'symbol="rb2305"' in condition and 'exchange="SHFE"' in condition
+    assert select == f"select {','.join(TICK_QUERY_COLUMNS)} from tick"
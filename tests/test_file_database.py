@@ -0,0 +1,97 @@
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pytest
+
+from datastructure.constant import Exchange, Interval
+from datastructure.object import BarData, TickData
+from datastructure.setting import SETTING
+import db.database
+from db.database import TickOverview
+from db.to_file import Database
+from utils.data_process import history_tickdata_processor
+from fake_database import make_tick_df
+
+
+START: datetime = datetime(2010, 1, 1)
+END: datetime = datetime(2030, 1, 1)
+
+
+@pytest.fixture
+def database(tmp_path: Path, monkeypatch) -> Database:
+    monkeypatch.setitem(SETTING, "database.path", str(tmp_path))
+    return Database()
+
+
+def test_tick_round_trip(database: Database) -> None:
+    rb: pd.DataFrame = make_tick_df("rb2305", "SHFE", days=["2023-01-03", "2023-01-04"], n=20)
+    sc: pd.DataFrame = make_tick_df("sc2305", "INE", days=["2023-01-04"], n=10)
+    ticks: List[TickData] = history_tickdata_processor.df2data(rb)
+    assert database.save_tick_data(ticks)
+    assert database.save_tick_df(sc)
+    assert not database.save_tick_data([])
+
+    assert database.load_tick_data("rb2305", Exchange.SHFE) == ticks
+    assert database.load_tick_data("sc2305", Exchange.INE) == history_tickdata_processor.df2data(sc)
+    assert database.load_tick_data("hc2305", Exchange.SHFE) == []
+    # 闭区间, 只读取区间内的日期分区
+    part: List[TickData] = database.load_tick_data("rb2305", Exchange.SHFE, datetime(2023, 1, 3, 9, 0, 5), datetime(2023, 1, 4, 9, 0, 1))
+    assert part == [tick for tick in ticks if datetime(2023, 1, 3, 9, 0, 5) <= tick.datetime <= datetime(2023, 1, 4, 9, 0, 1)]
+    assert part[0].datetime == datetime(2023, 1, 3, 9, 0, 5)
+
+    overviews: List[TickOverview] = sorted(database.get_tick_overview(), key=lambda overview: overview.symbol)
+    assert [(o.symbol, o.exchange, o.count) for o in overviews] == [("rb2305", Exchange.SHFE, 40), ("sc2305", Exchange.INE, 10)]
+    assert overviews[0].start == rb["datetime"].min() and overviews[0].end == rb["datetime"].max()
+    assert database.get_tick_fingerprint("rb2305", Exchange.SHFE) == [40, str(rb["datetime"].max())]
+
+
+def test_save_tick_df_keeps_input_frame(database: Database) -> None:
+    df: pd.DataFrame = make_tick_df(days=["2023-01-03"], n=10)
+    df["datetime"] = df["datetime"].astype(str)
+    before: pd.DataFrame = df.copy()
+    assert database.save_tick_df(df)
+    pd.testing.assert_frame_equal(df, before)
+    assert len(database.load_tick_data("rb2305", Exchange.SHFE)) == 10
+
+
+def test_rewrite_keeps_last_and_delete(database: Database) -> None:
+    df: pd.DataFrame = make_tick_df(days=["2023-01-03"], n=10)
+    database.save_tick_df(df)
+    # 同一时间戳重复写入保留最后一条, 新增的tick追加到分区
+    update: pd.DataFrame = make_tick_df(days=["2023-01-03"], n=12).iloc[8:].assign(last_price=1.0)
+    database.save_tick_df(update)
+    loaded: pd.DataFrame = database.load_tick_df("rb2305", Exchange.SHFE, START, END)
+    assert len(loaded) == 12
+    assert loaded["last_price"].tolist()[8:] == [1.0] * 4
+    assert loaded["last_price"].tolist()[:8] == df["last_price"].tolist()[:8]
+    assert database.get_tick_overview()[0].count == 12
+
+    assert database.delete_tick_data("rb2305", Exchange.SHFE) == 12
+    assert database.get_tick_overview() == []
+    assert database.load_tick_df("rb2305", Exchange.SHFE, START, END).empty
+    assert database.delete_tick_data("rb2305", Exchange.SHFE) == 0
+
+
+def test_bar_round_trip(database: Database) -> None:
+    bars: List[BarData] = [
+        BarData("rb2305", Exchange.SHFE, datetime(2023, 1, 3, 9, i), Interval.MINUTE, volume=i, open_price=4000 + i,
+                high_price=4001 + i, low_price=3999 + i, close_price=4000 + i)
+        for i in range(5)
+    ]
+    assert database.save_bar_data(bars)
+    assert database.load_bar_data("rb2305", Exchange.SHFE, Interval.MINUTE, START, END) == bars
+    overview = database.get_bar_overview()[0]
+    assert (overview.symbol, overview.interval, overview.count) == ("rb2305", Interval.MINUTE, 5)
+    assert database.delete_bar_data("rb2305", Exchange.SHFE, Interval.MINUTE) == 5
+    assert database.get_bar_overview() == []
+
+
+def test_get_database_returns_file_backend(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setitem(SETTING, "database.path", str(tmp_path))
+    monkeypatch.setitem(SETTING, "database.name", "file")
+    monkeypatch.setitem(SETTING, "database.cache", True)
+    monkeypatch.setattr(db.database, "database", None)
+    # 本地文件数据库不包装缓存
+    assert isinstance(db.database.get_database(), Database)
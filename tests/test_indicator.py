@@ -0,0 +1,68 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from utils.indicator import SMA, EMA, RollingStd, ATR, RSI, Bollinger, MACD
+
+talib = pytest.importorskip("talib")
+
+
+def make_bars(n: int = 3000, seed: int = 0):
+    '''
+    随机游走价格(最小变动1), 返回(最高价, 最低价, 收盘价)
+    '''
+    rng: np.random.Generator = np.random.default_rng(seed)
+    close: np.ndarray = 4000 + np.cumsum(rng.integers(-3, 4, n)).astype(float)
+    high: np.ndarray = close + rng.integers(0, 4, n)
+    low: np.ndarray = close - rng.integers(0, 4, n)
+    return high, low, close
+
+
+def assert_same(actual: List[float], expected: np.ndarray) -> None:
+    '''
+    nan位置一致, 数值误差不超过1e-6
+    '''
+    actual: np.ndarray = np.asarray(actual, dtype=float)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6, equal_nan=True)
+
+
+def run(indicator, *columns: np.ndarray) -> list:
+    return [indicator.update(*values) for values in zip(*columns)]
+
+
+@pytest.mark.parametrize("n", [2, 5, 20])
+def test_single_output(n: int) -> None:
+    high, low, close = make_bars()
+    assert_same(run(SMA(n), close), talib.SMA(close, n))
+    assert_same(run(EMA(n), close), talib.EMA(close, n))
+    assert_same(run(RollingStd(n), close), talib.STDDEV(close, n, 1))
+    assert_same(run(ATR(n), high, low, close), talib.ATR(high, low, close, n))
+    assert_same(run(RSI(n), close), talib.RSI(close, n))
+
+
+@pytest.mark.parametrize("n, dev", [(2, 2), (5, 2), (20, 1.5)])
+def test_bollinger(n: int, dev: float) -> None:
+    _, _, close = make_bars()
+    upper, middle, lower = zip(*run(Bollinger(n, dev), close))
+    expected = talib.BBANDS(close, n, dev, dev, 0)
+    for actual, values in zip((upper, middle, lower), expected):
+        assert_same(actual, values)
+
+
+@pytest.mark.parametrize("fast, slow, signal", [(12, 26, 9), (5, 10, 3), (26, 12, 9)])
+def test_macd(fast: int, slow: int, signal: int) -> None:
+    _, _, close = make_bars()
+    macd, signal_line, hist = zip(*run(MACD(fast, slow, signal), close))
+    expected = talib.MACD(close, fast, slow, signal)
+    for actual, values in zip((macd, signal_line, hist), expected):
+        assert_same(actual, values)
+
+
+def test_inited() -> None:
+    sma: SMA = SMA(3)
+    sma.update(1)
+    sma.update(2)
+    assert not sma.inited
+    assert sma.update(3) == 2 and sma.inited
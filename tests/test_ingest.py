@@ -0,0 +1,130 @@
+import os
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, List
+
+import pandas as pd
+
+import db.ingest as ingest
+from db.ingest import CsvIngestor, IngestManifest
+from fake_database import MemoryDatabase
+from fake_tqsdk import write_tqsdk_csv
+
+
+class InlineExecutor:
+    '''
+    替换ProcessPoolExecutor: 提交时在当前进程解析, 记录已提交但未被取走结果的文件数
+    '''
+    instances: List["InlineExecutor"] = []
+
+    def __init__(self, workers: int) -> None:
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+        InlineExecutor.instances.append(self)
+
+    def __enter__(self) -> "InlineExecutor":
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def submit(self, fn: Callable, *args) -> Future:
+        executor: InlineExecutor = self
+
+        class TrackedFuture(Future):
+            def result(self, timeout: float = None):
+                executor.in_flight -= 1
+                return super().result(timeout)
+
+        future: Future = TrackedFuture()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return future
+
+
+class CountingDatabase(MemoryDatabase):
+    '''
+    记录save_tick_df的批次行数
+    '''
+    def __init__(self) -> None:
+        super().__init__()
+        self.saved: List[int] = []
+
+    def save_tick_df(self, df: pd.DataFrame) -> bool:
+        self.saved.append(len(df))
+        return super().save_tick_df(df)
+
+
+def make_csvs(root: Path, symbols: List[str]) -> List[str]:
+    return [str(write_tqsdk_csv(root.joinpath("20230103", f"SHFE.{symbol}.csv"), symbol)) for symbol in symbols]
+
+
+def run(database: CountingDatabase, manifest_path: Path, csv_paths: List[str], workers: int = 1) -> CsvIngestor:
+    ingestor: CsvIngestor = CsvIngestor(database, str(manifest_path), workers)
+    assert ingestor.run(csv_paths)
+    return ingestor
+
+
+def test_manifest_skips_unchanged_files(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", InlineExecutor)
+    csv_paths: List[str] = make_csvs(tmp_path.joinpath("data"), ["rb2305", "hc2305"])
+    manifest_path: Path = tmp_path.joinpath("manifest.jsonl")
+    database: CountingDatabase = CountingDatabase()
+
+    # 两个文件合并为一批写入
+    ingestor: CsvIngestor = run(database, manifest_path, csv_paths)
+    assert ingestor.done_files == 2
+    assert database.saved == [38]
+    assert sorted(database.df["symbol"].unique()) == ["hc2305", "rb2305"]
+    assert sorted(IngestManifest(str(manifest_path)).completed) == sorted(csv_paths)
+
+    # 重新运行: 大小和修改时间未变, 全部跳过
+    ingestor = run(database, manifest_path, csv_paths)
+    assert ingestor.total_files == 0
+    assert database.saved == [38]
+
+    # 修改时间变化的文件重新导入
+    stat: os.stat_result = os.stat(csv_paths[1])
+    os.utime(csv_paths[1], (stat.st_atime, stat.st_mtime + 10))
+    ingestor = run(database, manifest_path, csv_paths)
+    assert ingestor.total_files == 1
+    assert database.saved == [38, 19]
+    assert IngestManifest(str(manifest_path)).is_completed(csv_paths[1])
+
+
+def test_failed_file_is_not_recorded(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", InlineExecutor)
+    csv_paths: List[str] = make_csvs(tmp_path.joinpath("data"), ["rb2305"])
+    broken: Path = tmp_path.joinpath("data", "20230103", "SHFE.hc2305.csv")
+    broken.write_text("datetime\n")
+    manifest_path: Path = tmp_path.joinpath("manifest.jsonl")
+
+    ingestor: CsvIngestor = CsvIngestor(CountingDatabase(), str(manifest_path), 1)
+    assert not ingestor.run(csv_paths + [str(broken)])
+    assert ingestor.failed_files == [str(broken)]
+    assert list(IngestManifest(str(manifest_path)).completed) == csv_paths
+
+
+def test_in_flight_files_are_bounded(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", InlineExecutor)
+    InlineExecutor.instances.clear()
+    csv_paths: List[str] = make_csvs(tmp_path.joinpath("data"), [f"rb23{i:02d}" for i in range(1, 8)])
+    database: CountingDatabase = CountingDatabase()
+
+    # 每个文件19行, 每2个文件写入一批
+    ingestor: CsvIngestor = CsvIngestor(database, str(tmp_path.joinpath("manifest.jsonl")), workers=2, batch_rows=30)
+    assert ingestor.run(csv_paths)
+    assert InlineExecutor.instances[0].max_in_flight == 4
+    assert database.saved == [38, 38, 38, 19]
+    assert ingestor.total_rows == 133
+
+
+def test_process_pool_ingest(tmp_path: Path) -> None:
+    csv_paths: List[str] = make_csvs(tmp_path.joinpath("data"), ["rb2305", "hc2305"])
+    database: CountingDatabase = CountingDatabase()
+    run(database, tmp_path.joinpath("manifest.jsonl"), csv_paths, workers=2)
+    assert sum(database.saved) == len(database.df) == 38
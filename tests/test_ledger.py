@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+
+from datastructure.constant import Direction, Exchange, Offset
+from datastructure.object import AccountData, ContractData, TickData, TradeData
+from oms.ledger import PositionLedger
+
+
+T: datetime = datetime(2023, 1, 3, 9, 0, 0)
+
+
+def make_trade(direction: Direction, offset: Offset, price: float, volume: float) -> TradeData:
+    return TradeData("rb2305", Exchange.SHFE, "1", "1", T, direction, offset, price, volume)
+
+
+def make_ledger() -> PositionLedger:
+    # 合约乘数10, 保证金率10%, 手续费率万分之一
+    ledger: PositionLedger = PositionLedger(1000000)
+    ledger.register(ContractData("rb2305", Exchange.SHFE, 10, 1, 0.1, 0.0001))
+    return ledger
+
+
+def test_trade_sequence_matches_hand_computed_account() -> None:
+    ledger: PositionLedger = make_ledger()
+    account: AccountData = ledger.account
+
+    # 买开2手@4000: 冻结保证金4000*2*10*0.1
+    ledger.freeze(0, Direction.LONG, 2, 4000)
+    assert account.frozen_margin == 8000
+    assert account.balance == 992000
+    ledger.unfreeze(0, Direction.LONG, 2, 4000)
+    ledger.update_trade(make_trade(Direction.LONG, Offset.OPEN, 4000, 2))
+    assert account.frozen_margin == 0
+    assert account.commission == pytest.approx(8)
+    assert account.ocupying_margin == pytest.approx(8000)
+    assert account.balance == pytest.approx(1000000 - 8 - 8000)
+
+    # 盯市4010
+    ledger.update_tick(TickData("rb2305", Exchange.SHFE, T, last_price=4010))
+    assert account.float_pnl == pytest.approx(200)
+    assert account.ocupying_margin == pytest.approx(8020)
+    assert account.dynamic_equity == pytest.approx(1000192)
+
+    # 换日后再买开1手@4020, 均价(4000*2+4020)/3
+    ledger.roll_day()
+    ledger.update_trade(make_trade(Direction.LONG, Offset.OPEN, 4020, 1))
+    position = ledger.get_position("rb2305", Direction.LONG)
+    assert (position.yd_volume, position.td_volume) == (2, 1)
+    assert position.average_price == pytest.approx(12020 / 3)
+
+    # 卖平2手@4030: 先平昨仓
+    ledger.update_trade(make_trade(Direction.SHORT, Offset.CLOSE, 4030, 2))
+    position = ledger.get_position("rb2305", Direction.LONG)
+    assert (position.yd_volume, position.td_volume) == (0, 1)
+    commission: float = 8 + 4.02 + 8.06
+    trade_pnl: float = (4030 - 12020 / 3) * 2 * 10
+    float_pnl: float = (4010 - 12020 / 3) * 1 * 10
+    assert account.commission == pytest.approx(commission)
+    assert account.trade_pnl == pytest.approx(trade_pnl)
+    assert account.float_pnl == pytest.approx(float_pnl) == position.all_pnl
+    assert account.ocupying_margin == pytest.approx(4010) == position.occupying_margin
+    assert account.dynamic_equity == pytest.approx(1000000 + trade_pnl + float_pnl - commission)
+    assert account.balance == pytest.approx(account.dynamic_equity - 4010)
+
+    # 全部平仓后均价清零, 保证金和浮动盈亏归零
+    ledger.update_trade(make_trade(Direction.SHORT, Offset.CLOSE, 4010, 1))
+    position = ledger.get_position("rb2305", Direction.LONG)
+    assert position.all_volume == 0 and position.average_price == 0
+    assert account.ocupying_margin == pytest.approx(0)
+    assert account.float_pnl == pytest.approx(0)
+
+
+def test_unfreeze_is_capped_by_frozen() -> None:
+    ledger: PositionLedger = make_ledger()
+    ledger.freeze(0, Direction.SHORT, 1, 4000)
+    ledger.unfreeze(0, Direction.SHORT, 3, 4000)
+    assert ledger.frozen_volumes[0, 1] == 0
+    assert ledger.account.frozen_margin == 0
+    assert ledger.account.balance == 1000000
+
+
+def test_grow_keeps_positions() -> None:
+    ledger: PositionLedger = PositionLedger(1000000, capacity=1)
+    ledger.register(ContractData("rb2305", Exchange.SHFE, 10, 1, 0.1, 0.0001))
+    ledger.update_trade(make_trade(Direction.LONG, Offset.OPEN, 4000, 1))
+    assert ledger.register(ContractData("hc2305", Exchange.SHFE, 10, 1, 0.1, 0.0001)) == 1
+    assert ledger.capacity == 2
+    assert ledger.get_volume(0, Direction.LONG) == 1
+    assert ledger.sizes.tolist() == [10, 10]
@@ -0,0 +1,42 @@
+import copy
+import pickle
+from dataclasses import asdict, fields, replace
+from datetime import datetime
+
+import pytest
+
+from datastructure.constant import Direction, Exchange, Offset, Status
+from datastructure.object import BarData, CancelRequest, OrderData, OrderRequest, TickData, TradeData
+
+
+def make_tick() -> TickData:
+    return TickData("rb2305", Exchange.SHFE, datetime(2023, 1, 3, 9, 0, 0, 500000), volume=10, last_price=4000)
+
+
+@pytest.mark.parametrize("cls", [TickData, BarData, OrderData, TradeData, OrderRequest, CancelRequest])
+def test_slots_declared_for_all_fields(cls: type) -> None:
+    assert cls.__slots__ == tuple(f.name for f in fields(cls))
+    assert "__dict__" not in dir(cls)
+
+
+def test_slotted_instance_behaviour() -> None:
+    tick: TickData = make_tick()
+    assert not hasattr(tick, "__dict__")
+    assert tick.turnover == 0 and tick.gateway_name == ""
+    with pytest.raises(AttributeError):
+        tick.extra = 1
+
+    tick.last_price = 4001
+    assert tick == replace(make_tick(), last_price=4001)
+    assert pickle.loads(pickle.dumps(tick)) == tick
+    assert copy.copy(tick) == tick and copy.deepcopy(tick) == tick
+    assert asdict(tick)["volume"] == 10
+
+
+def test_gateway_name_field() -> None:
+    req: OrderRequest = OrderRequest("rb2305", Exchange.SHFE, Direction.LONG, datetime(2023, 1, 3, 9), 1, 4000, Offset.OPEN)
+    order: OrderData = req.create_order_data("1", "SIM")
+    assert order.gateway_name == "SIM" and order.status == Status.SUBMITTING
+    assert order.create_cancel_request().orderid == "1"
+    # 没有gateway_name字段的类只读取类属性
+    assert BarData("rb2305", Exchange.SHFE, datetime(2023, 1, 3, 9)).gateway_name == ""
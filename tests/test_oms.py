@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import List, Tuple
+
+from core.event import Event, EventEngine, EVENT_ORDER, EVENT_STRATEGY, EVENT_TICK, EVENT_TRADE
+from datastructure.constant import Direction, Exchange, Offset, Status
+from datastructure.object import ContractData, OrderData, OrderRequest, SignalData, TickData, TradeData
+from oms.omsEngine import OmsEngine
+from utils.utils_class import TickBuffer
+
+
+T: datetime = datetime(2023, 1, 3, 9, 0, 0)
+
+
+def make_oms(monkeypatch, order_volume: float = 1) -> Tuple[OmsEngine, List[OrderRequest]]:
+    contract: ContractData = ContractData("rb2305", Exchange.SHFE, 10, 1, 0.1, 0.0001)
+    oms: OmsEngine = OmsEngine(EventEngine(), contract)
+    oms.order_volume = order_volume
+    requests: List[OrderRequest] = []
+    monkeypatch.setattr(oms, "output", lambda msg: None)
+    monkeypatch.setattr(oms, "on_order_request", requests.append)
+    return oms, requests
+
+
+def signal(oms: OmsEngine, direction: Direction) -> None:
+    oms.process_signal_event(Event(EVENT_STRATEGY, SignalData(T, direction)))
+
+
+def fill(oms: OmsEngine, direction: Direction, offset: Offset, volume: float) -> None:
+    trade: TradeData = TradeData("rb2305", Exchange.SHFE, "1", "1", T, direction, offset, oms.order_price, volume)
+    oms.process_trade_event(Event(EVENT_TRADE, trade))
+
+
+def sent(requests: List[OrderRequest]) -> List[Tuple[Direction, Offset, float]]:
+    result = [(req.direction, req.offset, req.volume) for req in requests]
+    requests.clear()
+    return result
+
+
+def test_repeated_signal_is_coalesced(monkeypatch) -> None:
+    oms, requests = make_oms(monkeypatch)
+    signal(oms, Direction.LONG)
+    assert sent(requests) == [(Direction.LONG, Offset.OPEN, 1)]
+
+    # 委托未成交和成交后重复信号都不再下单
+    signal(oms, Direction.LONG)
+    assert sent(requests) == []
+    fill(oms, Direction.LONG, Offset.OPEN, 1)
+    signal(oms, Direction.LONG)
+    assert sent(requests) == []
+    assert oms.pending_volumes[(Direction.LONG, Offset.OPEN)] == 0
+
+
+def test_flip_long_to_short_closes_then_opens(monkeypatch) -> None:
+    oms, requests = make_oms(monkeypatch)
+    signal(oms, Direction.LONG)
+    fill(oms, Direction.LONG, Offset.OPEN, 1)
+    sent(requests)
+
+    signal(oms, Direction.SHORT)
+    assert sent(requests) == [(Direction.SHORT, Offset.CLOSE, 1), (Direction.SHORT, Offset.OPEN, 1)]
+    assert oms.pending_volumes[(Direction.SHORT, Offset.CLOSE)] == 1
+    assert oms.pending_volumes[(Direction.SHORT, Offset.OPEN)] == 1
+
+    # 在途平仓计入预期仓位, 反手信号不重复下单
+    signal(oms, Direction.SHORT)
+    assert sent(requests) == []
+
+
+def test_partially_filled_close_nets_remaining_position(monkeypatch) -> None:
+    oms, requests = make_oms(monkeypatch, order_volume=2)
+    signal(oms, Direction.LONG)
+    fill(oms, Direction.LONG, Offset.OPEN, 2)
+    sent(requests)
+    signal(oms, Direction.SHORT)
+    assert sent(requests) == [(Direction.SHORT, Offset.CLOSE, 2), (Direction.SHORT, Offset.OPEN, 2)]
+
+    # 平仓成交1手, 剩余1手在途: 预期仓位已是-2
+    fill(oms, Direction.SHORT, Offset.CLOSE, 1)
+    signal(oms, Direction.SHORT)
+    assert sent(requests) == []
+
+    # 剩余平仓委托撤单后, 只对剩余1手多仓补发平仓
+    order: OrderData = OrderData("rb2305", Exchange.SHFE, "2", T, direction=Direction.SHORT, offset=Offset.CLOSE,
+                                 order_price=oms.order_price, order_volume=2, traded=1, status=Status.CANCELLED)
+    oms.process_order_event(Event(EVENT_ORDER, order))
+    assert oms.pending_volumes[(Direction.SHORT, Offset.CLOSE)] == 0
+    signal(oms, Direction.SHORT)
+    assert sent(requests) == [(Direction.SHORT, Offset.CLOSE, 1)]
+
+
+def make_tick(i: int, symbol: str = "rb2305") -> TickData:
+    return TickData(symbol, Exchange.SHFE, T, volume=i, last_price=4000 + i)
+
+
+def test_tick_buffer_wraps_around() -> None:
+    buffer: TickBuffer = TickBuffer(3)
+    assert buffer.latest is None and buffer.to_list() == [] and len(buffer) == 0
+
+    ticks: List[TickData] = [make_tick(i) for i in range(8)]
+    for i, tick in enumerate(ticks):
+        buffer.update_tick(tick)
+        assert buffer.latest is tick
+        assert buffer.to_list() == ticks[max(0, i - 2): i + 1]
+
+    assert buffer.count == 8 and len(buffer) == 3
+    assert [buffer.get(n) for n in range(3)] == ticks[:-4:-1]
+    assert buffer.get(3) is None and buffer.get(-1) is None
+
+
+def test_get_tick_returns_latest_per_symbol(monkeypatch) -> None:
+    oms, _ = make_oms(monkeypatch)
+    assert oms.get_tick("rb2305") is None
+    for i in range(oms.tick_buffer_size * 2 + 3):
+        oms.process_tick_event(Event(EVENT_TICK, make_tick(i)))
+    oms.process_tick_event(Event(EVENT_TICK, make_tick(100, "hc2305")))
+
+    assert oms.get_tick("rb2305").volume == oms.tick_buffer_size * 2 + 2
+    assert oms.get_tick("hc2305").volume == 100
+    assert [tick.volume for tick in oms.ticks["rb2305"].to_list()] == list(range(13, 23))
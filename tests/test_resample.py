@@ -0,0 +1,139 @@
+from dataclasses import fields
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datastructure.constant import Interval
+from datastructure.object import BarData, TickData
+from utils.data_process import history_tickdata_processor
+from utils.resample import resample_tick_df, resample_threshold_bars, df2bars
+from utils.utils_class import BarGenerator, ThresholdBarGenerator, WindowGenerator
+
+
+# rb交易时段(交易日2023-01-04的夜盘在01-03晚上)
+SESSIONS: List[tuple] = [
+    ("2023-01-03 21:00", "2023-01-03 23:00"),
+    ("2023-01-04 09:00", "2023-01-04 10:15"),
+    ("2023-01-04 10:30", "2023-01-04 11:30"),
+    ("2023-01-04 13:30", "2023-01-04 15:00"),
+]
+
+
+def make_tick_df(seed: int) -> pd.DataFrame:
+    '''
+    一个交易日的rb2305 tick, 每个时段约每500ms一个tick, 时间戳带随机微秒(部分为整秒)
+    另加入最新价为0、时间戳逆序和重复的脏数据
+    '''
+    rng: np.random.Generator = np.random.default_rng(seed)
+    stamps: List[np.ndarray] = []
+    for start, end in SESSIONS:
+        base: np.ndarray = np.arange(pd.Timestamp(start).value, pd.Timestamp(end).value, 500_000_000) // 1000
+        jitter: np.ndarray = rng.integers(0, 500_000, len(base))
+        jitter[rng.random(len(base)) < 0.3] = 0     # 整秒/整500ms
+        stamps.append(base + jitter)
+    us: np.ndarray = np.concatenate(stamps)
+    n: int = len(us)
+
+    # 脏数据: 重复、逆序
+    duplicates: np.ndarray = rng.choice(n, n // 100, replace=False)
+    us[duplicates] = us[duplicates - 1]
+    regressions: np.ndarray = rng.choice(n, n // 200, replace=False)
+    us[regressions] -= 3_000_000
+
+    price: np.ndarray = 4000 + np.cumsum(rng.integers(-2, 3, n)).astype(float)
+    volume: np.ndarray = np.cumsum(rng.integers(0, 30, n)).astype(float)
+    volume[rng.random(n) < 0.002] -= 50     # 累计成交量回退
+    df: pd.DataFrame = pd.DataFrame({
+        "symbol": "rb2305",
+        "exchange": "SHFE",
+        "datetime": us.astype("datetime64[us]"),
+        "volume": volume,
+        "turnover": volume * price * 10,
+        "open_interest": 100000 + np.cumsum(rng.integers(-5, 6, n)).astype(float),
+        "last_price": price,
+        "highest_price": np.maximum.accumulate(price + rng.integers(0, 3, n)),
+        "lowest_price": np.minimum.accumulate(price - rng.integers(0, 3, n)),
+        "bid_price_1": price - 1,
+        "ask_price_1": price + 1,
+        "bid_volume_1": 5.0,
+        "ask_volume_1": 6.0,
+    })
+    df.loc[rng.random(n) < 0.002, "last_price"] = 0
+    return df
+
+
+def assert_bars_equal(actual: List[BarData], expected: List[BarData]) -> None:
+    '''
+    逐根逐字段比较
+    '''
+    assert len(actual) == len(expected)
+    for a, b in zip(actual, expected):
+        for f in fields(BarData):
+            assert getattr(a, f.name) == getattr(b, f.name), (f.name, a, b)
+
+
+def stream_bars(ticks: List[TickData], windows: List[tuple] = ()) -> tuple:
+    '''
+    逐tick输入BarGenerator(可带窗口), 最后调用generate, 返回(回调收到的1分钟bar, 各窗口bar)
+    '''
+    bars: List[BarData] = []
+    generator: BarGenerator = BarGenerator(bars.append)
+    window_generators: List[WindowGenerator] = [
+        generator.add_window(window, lambda bar: None, interval) for window, interval in windows
+    ]
+    for tick in ticks:
+        generator.update_tick(tick)
+    generator.generate()
+    for window_generator in window_generators:
+        window_generator.generate()
+    return bars, [g.window_bars for g in window_generators]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_minute_bars_match_bar_generator(seed: int) -> None:
+    df: pd.DataFrame = make_tick_df(seed)
+    ticks: List[TickData] = history_tickdata_processor.df2data(df)
+    expected, _ = stream_bars(ticks)
+
+    bar_df: pd.DataFrame = resample_tick_df(df)
+    assert_bars_equal(df2bars(bar_df), expected)
+    # datetime列为字符串时结果相同
+    text_df: pd.DataFrame = df.assign(datetime=df["datetime"].astype(str))
+    assert_bars_equal(df2bars(resample_tick_df(text_df)), expected)
+
+
+@pytest.mark.parametrize("window, interval", [(5, Interval.MINUTE), (15, Interval.MINUTE), (1, Interval.HOUR), (1, Interval.DAILY)])
+def test_window_bars_match_bar_generator(window: int, interval: Interval) -> None:
+    df: pd.DataFrame = make_tick_df(0)
+    ticks: List[TickData] = history_tickdata_processor.df2data(df)
+    _, (expected,) = stream_bars(ticks, [(window, interval)])
+    assert expected
+
+    # 批量合成的1分钟bar输入窗口
+    generator: WindowGenerator = WindowGenerator(window, lambda bar: None, interval)
+    for bar in df2bars(resample_tick_df(df)):
+        generator.update_bar(bar)
+    generator.generate()
+    assert_bars_equal(generator.window_bars, expected)
+
+
+@pytest.mark.parametrize("interval, threshold", [
+    (Interval.VOLUME, 500), (Interval.TURNOVER, 2e7), (Interval.RANGE, 6), (Interval.TICK_COUNT, 100)
+])
+def test_threshold_bars_match_generator(interval: Interval, threshold: float) -> None:
+    df: pd.DataFrame = make_tick_df(1)
+    generator: ThresholdBarGenerator = ThresholdBarGenerator(lambda bar: None, interval, threshold)
+    for tick in history_tickdata_processor.df2data(df):
+        generator.update_tick(tick)
+    generator.generate()
+
+    assert_bars_equal(df2bars(resample_threshold_bars(df, interval, threshold)), generator.bars)
+
+
+def test_empty_and_dirty_only() -> None:
+    df: pd.DataFrame = make_tick_df(0).iloc[:10].assign(last_price=0.0)
+    assert resample_tick_df(df).empty
+    assert df2bars(resample_tick_df(df.iloc[:0])) == []
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+from typing import Dict
+
+from datastructure.constant import Direction, Exchange, Offset
+from datastructure.object import ContractData, OrderRequest, TickData, TradeData
+from oms.ledger import PositionLedger
+from oms.risk import MarginCheck, MaxPositionCheck, OrderRateCheck, PriceBandCheck, RiskCheck, RiskManager
+
+
+T: datetime = datetime(2023, 1, 3, 9, 0, 0)
+
+
+class RejectCheck(RiskCheck):
+    name: str = "reject"
+
+    def __init__(self) -> None:
+        self.reject: bool = False
+
+    def check(self, req: OrderRequest) -> bool:
+        return not self.reject
+
+
+def make_request(
+    dt: datetime = T,
+    volume: float = 1,
+    price: float = 4000,
+    offset: Offset = Offset.OPEN,
+    symbol: str = "rb2305"
+) -> OrderRequest:
+    return OrderRequest(
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        direction=Direction.LONG,
+        datetime=dt,
+        volume=volume,
+        price=price,
+        offset=offset
+    )
+
+
+def make_ledger() -> PositionLedger:
+    # 合约乘数10, 保证金率10%: 保证金 = 价格 * 手数
+    ledger: PositionLedger = PositionLedger(1000000)
+    ledger.register(ContractData("rb2305", Exchange.SHFE, 10, 1, 0.1, 0.0001))
+    return ledger
+
+
+def test_order_rate_counts_accepted_orders_only() -> None:
+    rate_check: OrderRateCheck = OrderRateCheck(limit=2, interval=timedelta(seconds=1))
+    reject_check: RejectCheck = RejectCheck()
+    manager: RiskManager = RiskManager()
+    manager.add_check(rate_check)
+    manager.add_check(reject_check)
+
+    # 被后续检查拒绝的委托不占用频率额度
+    reject_check.reject = True
+    for i in range(5):
+        assert not manager.check_order(make_request(T))
+    assert len(rate_check.timestamps) == 0
+
+    reject_check.reject = False
+    assert manager.check_order(make_request(T))
+    assert manager.check_order(make_request(T))
+    assert not manager.check_order(make_request(T))
+    assert manager.rejected_by == "order_rate"
+    assert list(rate_check.timestamps) == [T, T]
+
+
+def test_order_rate_sliding_window() -> None:
+    rate_check: OrderRateCheck = OrderRateCheck(limit=2, interval=timedelta(seconds=1))
+    manager: RiskManager = RiskManager()
+    manager.add_check(rate_check)
+
+    assert manager.check_order(make_request(T))
+    assert manager.check_order(make_request(T + timedelta(milliseconds=500)))
+    assert not manager.check_order(make_request(T + timedelta(milliseconds=900)))
+    # 最早一笔恰好距今interval时放行
+    assert manager.check_order(make_request(T + timedelta(seconds=1)))
+    # 固定窗口在此会重新计数; 滑动窗口内(0.5s, 1.4s]已有2笔
+    assert not manager.check_order(make_request(T + timedelta(milliseconds=1400)))
+    assert manager.check_order(make_request(T + timedelta(milliseconds=1500)))
+
+
+def test_max_position_boundary() -> None:
+    ledger: PositionLedger = make_ledger()
+    ledger.update_trade(TradeData("rb2305", Exchange.SHFE, "1", "1", T, Direction.LONG, Offset.OPEN, 4000, 3))
+    ledger.freeze(0, Direction.LONG, 2, 4000)
+    check: MaxPositionCheck = MaxPositionCheck(ledger, limit=10)
+
+    # 持仓3 + 冻结2 + 本次5 == 限额
+    assert check.check(make_request(volume=5))
+    assert not check.check(make_request(volume=6))
+    # 平仓不受开仓限额约束
+    assert check.check(make_request(volume=100, offset=Offset.CLOSE))
+
+
+def test_margin_boundary() -> None:
+    ledger: PositionLedger = make_ledger()
+    check: MarginCheck = MarginCheck(ledger)
+
+    assert check.check(make_request(price=ledger.account.balance))
+    assert not check.check(make_request(price=ledger.account.balance + 0.01))
+    assert check.check(make_request(price=ledger.account.balance + 0.01, offset=Offset.CLOSE))
+
+
+def test_price_band_boundary() -> None:
+    ledger: PositionLedger = make_ledger()
+    check: PriceBandCheck = PriceBandCheck(ledger, band=0.01)
+
+    # 尚无行情时不检查
+    assert check.check(make_request(price=100000))
+
+    ledger.update_tick(TickData("rb2305", Exchange.SHFE, T, last_price=4000))
+    assert check.check(make_request(price=4040))
+    assert check.check(make_request(price=3960))
+    assert not check.check(make_request(price=4040.5))
+    assert not check.check(make_request(price=3959))
+
+
+def test_unknown_symbol_is_rejected() -> None:
+    ledger: PositionLedger = make_ledger()
+    request: OrderRequest = make_request(symbol="hc2305")
+
+    assert not MaxPositionCheck(ledger, limit=10).check(request)
+    assert not MarginCheck(ledger).check(request)
+    assert not PriceBandCheck(ledger, band=0.01).check(request)
+
+
+def test_remove_check() -> None:
+    reject_check: RejectCheck = RejectCheck()
+    reject_check.reject = True
+    manager: RiskManager = RiskManager()
+    manager.add_check(MaxPositionCheck(make_ledger(), limit=10))
+    manager.add_check(reject_check)
+    assert not manager.check_order(make_request())
+
+    manager.remove_check("reject")
+    assert manager.check_order(make_request())
+    assert list(manager.get_statistics()) == ["max_position"]
+
+
+def test_statistics_after_mixed_sequence() -> None:
+    ledger: PositionLedger = make_ledger()
+    ledger.update_tick(TickData("rb2305", Exchange.SHFE, T, last_price=4000))
+    manager: RiskManager = RiskManager()
+    manager.add_check(MaxPositionCheck(ledger, limit=2))
+    manager.add_check(PriceBandCheck(ledger, band=0.01))
+
+    assert manager.check_order(make_request())
+    assert not manager.check_order(make_request(volume=3))
+    assert manager.rejected_by == "max_position"
+    assert manager.check_order(make_request())
+    assert not manager.check_order(make_request(price=4100))
+    assert manager.rejected_by == "price_band"
+
+    statistics: Dict[str, Dict[str, float]] = manager.get_statistics()
+    assert statistics["max_position"]["count"] == 4
+    assert statistics["max_position"]["rejected"] == 1
+    # 被max_position拒绝的委托不再执行后续检查
+    assert statistics["price_band"]["count"] == 3
+    assert statistics["price_band"]["rejected"] == 1
+    for value in statistics.values():
+        assert value["average_ns"] == value["total_ns"] / value["count"]
+
+    # 不统计耗时时平均耗时为0
+    manager = RiskManager(timing=False)
+    manager.add_check(MaxPositionCheck(ledger, limit=2))
+    manager.check_order(make_request())
+    assert manager.get_statistics()["max_position"] == {"count": 1, "rejected": 0, "total_ns": 0, "average_ns": 0}
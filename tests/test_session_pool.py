@@ -0,0 +1,142 @@
+from queue import Empty
+from typing import List
+
+import pytest
+
+import fake_dolphindb
+from fake_dolphindb import FakeSession
+
+fake_dolphindb.install()
+from db.to_dolphindb import SessionPool     # noqa: E402
+
+
+class Factory:
+    '''
+    替换SessionPool.new_session, 记录创建的连接, fail为True时连接失败
+    '''
+    def __init__(self) -> None:
+        self.sessions: List[FakeSession] = []
+        self.fail: bool = False
+
+    def __call__(self) -> FakeSession:
+        if self.fail:
+            raise ConnectionError("connect failed")
+        session: FakeSession = FakeSession()
+        session.connect("localhost", 8848, "admin", "123456")
+        self.sessions.append(session)
+        return session
+
+
+def make_pool(size: int = 2, health_check_interval: float = 60) -> SessionPool:
+    pool: SessionPool = SessionPool("localhost", 8848, "admin", "123456", size, health_check_interval)
+    pool.new_session = Factory()
+    return pool
+
+
+def test_borrow_and_reuse() -> None:
+    pool: SessionPool = make_pool()
+    with pool.session() as first:
+        pass
+    with pool.session() as second:
+        assert second is first
+    assert len(pool.new_session.sessions) == 1
+    assert pool._created == 1
+    assert pool._idle.qsize() == 1
+
+
+def test_size_cap() -> None:
+    pool: SessionPool = make_pool(size=2)
+    a: FakeSession = pool.acquire()
+    b: FakeSession = pool.acquire()
+    assert a is not b
+    with pytest.raises(Empty):
+        pool.acquire(timeout=0.01)
+    assert pool._created == 2
+
+    pool.release(a)
+    assert pool.acquire(timeout=0.01) is a
+    assert len(pool.new_session.sessions) == 2
+
+
+def test_unhealthy_idle_session_is_replaced() -> None:
+    pool: SessionPool = make_pool(size=1)
+    with pool.session() as session:
+        pass
+    session.close()
+    with pool.session() as replacement:
+        assert replacement is not session
+        assert not replacement.isClosed()
+    assert pool._created == 1
+
+    # 空闲超过health_check_interval时ping, ping失败同样重连
+    pool.health_check_interval = 0
+    replacement.broken = True
+    with pool.session() as third:
+        assert third is not replacement
+    assert replacement.isClosed()
+    assert pool._created == 1
+
+
+def test_failed_replacement_frees_slot() -> None:
+    pool: SessionPool = make_pool(size=1)
+    with pool.session() as session:
+        pass
+    session.close()
+    pool.new_session.fail = True
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool._created == 0
+
+    pool.new_session.fail = False
+    with pool.session() as session:
+        assert not session.isClosed()
+    assert pool._created == 1
+
+
+def test_failed_create_frees_slot() -> None:
+    pool: SessionPool = make_pool(size=1)
+    pool.new_session.fail = True
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool._created == 0
+
+
+def test_error_keeps_healthy_session_and_drops_broken_one() -> None:
+    pool: SessionPool = make_pool(size=1)
+    with pytest.raises(ValueError):
+        with pool.session() as session:
+            raise ValueError("bad query")
+    assert pool._idle.qsize() == 1 and pool._created == 1
+
+    with pytest.raises(RuntimeError):
+        with pool.session() as session:
+            session.broken = True
+            session.run("select 1")
+    assert session.isClosed()
+    assert pool._idle.qsize() == 0 and pool._created == 0
+
+
+def test_interrupt_discards_session() -> None:
+    pool: SessionPool = make_pool(size=1)
+    with pytest.raises(KeyboardInterrupt):
+        with pool.session() as session:
+            raise KeyboardInterrupt
+    assert session.isClosed()
+    assert pool._created == 0
+    with pool.session() as session:
+        assert not session.isClosed()
+
+
+def test_closed_generator_releases_session() -> None:
+    pool: SessionPool = make_pool(size=1)
+
+    def rows():
+        with pool.session() as session:
+            for i in range(10):
+                yield session, i
+
+    iterator = rows()
+    session, _ = next(iterator)
+    iterator.close()
+    assert pool._idle.qsize() == 1 and pool._created == 1
+    assert pool.acquire(timeout=0.01) is session
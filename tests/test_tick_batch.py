@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datastructure.constant import Exchange
+from datastructure.object import TickData
+from datastructure.tick_batch import TickBatch, TickView
+from db.database import TICK_COLUMNS
+from utils.data_process import history_tickdata_processor
+from fake_database import make_tick_df
+
+
+def test_concat_remaps_codes() -> None:
+    a: pd.DataFrame = pd.concat([make_tick_df("rb2305", "SHFE", n=3), make_tick_df("sc2305", "INE", n=3)], ignore_index=True)
+    b: pd.DataFrame = pd.concat([make_tick_df("sc2305", "INE", n=2), make_tick_df("hc2305", "SHFE", n=2)], ignore_index=True)
+    batch_a: TickBatch = TickBatch.from_df(a)
+    batch_b: TickBatch = TickBatch.from_df(b)
+    # 两个batch中sc2305/INE的编码不同
+    assert batch_a.symbols == ["rb2305", "sc2305"] and batch_b.symbols == ["sc2305", "hc2305"]
+    assert batch_a.exchanges == [Exchange.SHFE, Exchange.INE] and batch_b.exchanges == [Exchange.INE, Exchange.SHFE]
+
+    batch: TickBatch = TickBatch.concat([batch_a, TickBatch.empty(), batch_b])
+    assert batch.symbols == ["rb2305", "sc2305", "hc2305"]
+    assert batch.exchanges == [Exchange.SHFE, Exchange.INE]
+    expected: pd.DataFrame = pd.concat([a, b], ignore_index=True)
+    pd.testing.assert_frame_equal(batch.to_df(), expected.loc[:, TICK_COLUMNS], check_dtype=False)
+    assert batch.to_ticks() == history_tickdata_processor.df2data(expected)
+    # 原batch不受影响
+    assert batch_b.columns["symbol"].tolist()[:2] == [0, 0]
+
+    assert len(TickBatch.concat([])) == 0
+
+
+def test_slice_time_is_closed_interval() -> None:
+    df: pd.DataFrame = make_tick_df(days=["2023-01-03"], n=10)
+    batch: TickBatch = TickBatch.from_df(df)
+    # 边界时间戳恰好为tick时间
+    start, end = datetime(2023, 1, 3, 9, 0, 1), datetime(2023, 1, 3, 9, 0, 3)
+    part: TickBatch = batch.slice_time(start, end)
+    assert [row.datetime for row in part] == [dt for dt in df["datetime"].dt.to_pydatetime() if start <= dt <= end]
+    assert (part[0].datetime, part[-1].datetime, len(part)) == (start, end, 5)
+    # 视图共享内存
+    assert np.shares_memory(part.data, batch.data)
+
+    assert len(batch.slice_time(datetime(2023, 1, 3, 9, 0, 3), datetime(2023, 1, 3, 9, 0, 3))) == 1
+    assert len(batch.slice_time(datetime(2023, 1, 3, 9, 0, 3, 1), datetime(2023, 1, 3, 9, 0, 3, 499999))) == 0
+    assert len(batch.slice_time(datetime(2023, 1, 3), datetime(2023, 1, 4))) == 10
+
+
+def test_slice_trading_day() -> None:
+    df: pd.DataFrame = make_tick_df(days=["2023-01-05", "2023-01-06"], n=5)
+    night: pd.DataFrame = make_tick_df(days=["2023-01-06"], n=5)
+    night["datetime"] += pd.Timedelta(hours=12)     # 周五夜盘归属下周一
+    batch: TickBatch = TickBatch.from_df(pd.concat([df, night], ignore_index=True))
+    days: List[int] = sorted(set(batch.columns["trading_day"].tolist()))
+    assert [len(batch.slice_trading_day(day)) for day in days] == [5, 5, 5]
+    assert batch.slice_trading_day(days[-1])[0].datetime == datetime(2023, 1, 6, 21)
+    assert len(batch.slice_trading_day(days[0] - 1)) == 0
+
+
+def test_getitem_negative_index_and_bounds() -> None:
+    df: pd.DataFrame = make_tick_df(n=4)
+    batch: TickBatch = TickBatch.from_df(df)
+    ticks: List[TickData] = history_tickdata_processor.df2data(df)
+    last: TickView = batch[-1]
+    assert isinstance(last, TickView)
+    assert last.to_tick() == ticks[-1]
+    assert batch[-len(batch)].to_tick() == ticks[0]
+    assert [row.to_tick() for row in batch[-3:-1]] == ticks[-3:-1]
+    with pytest.raises(IndexError):
+        batch[len(batch)]
+    with pytest.raises(IndexError):
+        batch[-len(batch) - 1]
+
+
+def test_empty_batch() -> None:
+    for batch in (TickBatch.empty(), TickBatch.from_df(make_tick_df().iloc[:0]), TickBatch.from_ticks([])):
+        assert len(batch) == 0
+        assert list(batch) == [] and batch.to_ticks() == []
+        df: pd.DataFrame = batch.to_df()
+        assert df.empty and list(df.columns) == TICK_COLUMNS
+        assert len(batch.slice_time(datetime(2023, 1, 1), datetime(2023, 12, 31))) == 0
+        with pytest.raises(IndexError):
+            batch[0]
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Dict, List
+
+import pandas as pd
+
+from core.event import Event, EventEngine, EVENT_TICK
+from datastructure.constant import Exchange
+from datastructure.object import ContractData, TickData, datetime_to_ns
+from datastructure.tick_batch import TickBatch
+from exchange.simExchange import SimExchange
+import oms.omsEngine as oms_engine
+from oms.omsEngine import OmsEngine
+from utils.data_process import history_tickdata_processor
+from fake_database import make_tick_df
+
+
+def make_df() -> pd.DataFrame:
+    # 跨越夜盘(18点后归属下一个交易日)和周末
+    df: pd.DataFrame = make_tick_df(days=["2023-01-05", "2023-01-06"], n=50)
+    night: pd.DataFrame = make_tick_df(days=["2023-01-06"], n=50)
+    night["datetime"] += pd.Timedelta(hours=12)
+    return pd.concat([df, night], ignore_index=True)
+
+
+def test_datetime_ns_stored_at_build() -> None:
+    df: pd.DataFrame = make_df()
+    ticks: List[TickData] = history_tickdata_processor.df2data(df)
+    assert [tick.datetime_ns for tick in ticks] == [datetime_to_ns(tick.datetime) for tick in ticks]
+    assert [tick.datetime_ns for tick in ticks] == df["datetime"].to_numpy(dtype="datetime64[ns]").view("int64").tolist()
+
+    # 未传入时由datetime计算, 不参与比较
+    tick: TickData = TickData("rb2305", Exchange.SHFE, datetime(2023, 1, 3, 21, 0, 0, 500))
+    assert tick.datetime_ns == datetime_to_ns(tick.datetime)
+    assert tick == TickData("rb2305", Exchange.SHFE, datetime(2023, 1, 3, 21, 0, 0, 500), datetime_ns=0)
+
+    batch: TickBatch = TickBatch.from_df(df)
+    assert batch.to_ticks() == ticks
+    assert [tick.datetime_ns for tick in batch.to_ticks()] == batch.datetime_ns.tolist()
+    assert TickBatch.from_ticks(ticks).datetime_ns.tolist() == batch.datetime_ns.tolist()
+
+
+def replay(history_data) -> Dict:
+    contract: ContractData = ContractData("rb2305", Exchange.SHFE, 10, 1, 0.1, 0.0001)
+    exchange: SimExchange = SimExchange(EventEngine(), datetime(2023, 1, 1), datetime(2023, 1, 31), contract)
+    exchange.history_data = history_data
+    exchange._tick_generator = exchange._generate_new_tick()
+    while True:
+        tick = exchange.publish_md()
+        if tick is None:
+            break
+        exchange.update_daily_close(Event(EVENT_TICK, tick))
+    return {d: (result.close_price, result.pre_close) for d, result in exchange.daily_results.items()}
+
+
+def test_trading_days_match_between_tick_and_batch_replay() -> None:
+    df: pd.DataFrame = make_df()
+    results: Dict = replay(history_tickdata_processor.df2data(df))
+    assert [d.isoformat() for d in results] == ["2023-01-05", "2023-01-06", "2023-01-09"]
+    assert replay(TickBatch.from_df(df)) == results
+
+
+def oms_roll_days(ticks, monkeypatch) -> List[int]:
+    contract: ContractData = ContractData("rb2305", Exchange.SHFE, 10, 1, 0.1, 0.0001)
+    oms: OmsEngine = OmsEngine(EventEngine(), contract)
+    monkeypatch.setattr(oms, "output", lambda msg: None)
+    rolls: List[int] = []
+    monkeypatch.setattr(oms.ledger, "roll_day", lambda: rolls.append(oms.trading_day))
+    for tick in ticks:
+        oms.process_tick_event(Event(EVENT_TICK, tick))
+    return rolls + [oms.trading_day]
+
+
+def test_oms_rolls_day_on_clock_boundaries(monkeypatch) -> None:
+    df: pd.DataFrame = make_df()
+    calls: List[int] = []
+    get_index = oms_engine.get_trading_day_index
+    monkeypatch.setattr(oms_engine, "get_trading_day_index", lambda ns: calls.append(ns) or get_index(ns))
+
+    # 每个交易日只计算一次交易日序号, 首日不换日
+    days: List[int] = oms_roll_days(history_tickdata_processor.df2data(df), monkeypatch)
+    assert len(calls) == 3
+    batch: TickBatch = TickBatch.from_df(df)
+    assert days == sorted(set(batch.columns["trading_day"].tolist()))
+
+    # 列式回放直接使用TickView.trading_day
+    calls.clear()
+    assert oms_roll_days(batch, monkeypatch) == days
+    assert calls == []
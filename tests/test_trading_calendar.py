@@ -0,0 +1,83 @@
+from datetime import date, datetime, timedelta
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datastructure.object import datetime_to_ns
+from utils.data_process import history_tickdata_processor
+from utils.trading_calendar import (DAY_NS, get_trading_time, get_trading_day_index, get_trading_day_bounds,
+                                    parse_time_of_day, trading_day_to_date, trading_time_mask)
+from utils.utils_function import get_trading_day
+
+
+def split_by_strings(df: pd.DataFrame, asset: str) -> pd.DataFrame:
+    '''
+    按"HH:MM:SS.fffffffff"字符串比较过滤(向量化之前的实现), datetime列为9位小数的字符串
+    '''
+    (s0, e0, s1, e1, s2, e2, s3, e3) = get_trading_time(asset)
+    hms: pd.Series = df['datetime'].str[11:]
+    day = ((hms >= s1) & (hms <= e1)) | ((hms >= s2) & (hms <= e2)) | ((hms >= s3) & (hms <= e3))
+    if s0 <= e0:
+        return df.loc[((hms >= s0) & (hms <= e0)) | day]
+    return df.loc[((hms >= s0) & (hms <= '23:59:59.500000000')) | ((hms >= '00:00:00.000000000') & (hms <= e0)) | day]
+
+
+def make_datetimes() -> pd.DatetimeIndex:
+    # 周五早上至周六凌晨每500ms一个tick, 加上所有时段边界前后1ns
+    grid: pd.DatetimeIndex = pd.date_range("2023-01-06 00:00:00", "2023-01-07 03:00:00", freq="500ms")
+    boundaries: pd.DatetimeIndex = grid[(grid.second == 0) & (grid.microsecond == 0) | (grid.microsecond == 500000)]
+    boundaries = boundaries[boundaries.minute.isin([0, 15, 30])]
+    offsets: List[pd.DatetimeIndex] = [boundaries + pd.Timedelta(nanoseconds=ns) for ns in (-1, 1)]
+    return grid.append(offsets).sort_values()
+
+
+@pytest.mark.parametrize("asset", ["rb", "cu", "au", "jd", "if"])
+def test_trading_time_mask_matches_string_filter(asset: str) -> None:
+    datetimes: pd.DatetimeIndex = make_datetimes()
+    df: pd.DataFrame = pd.DataFrame({"datetime": datetimes.strftime("%Y-%m-%d %H:%M:%S.%f") + datetimes.nanosecond.map("{:03d}".format)})
+    expected: pd.Index = split_by_strings(df, asset).index
+
+    # 唯一的差别: 字符串过滤把跨午夜夜盘的前半段截止在23:59:59.5, 日历中夜盘连续到24点
+    night_start, night_end = get_trading_time(asset)[:2]
+    gap: np.ndarray = (datetimes.asi8 % DAY_NS > parse_time_of_day("23:59:59.5")) & (night_start > night_end)
+
+    mask: np.ndarray = trading_time_mask(datetimes.to_numpy(), asset)
+    assert np.flatnonzero(mask & ~gap).tolist() == expected.tolist()
+    assert mask[gap].all()
+    # split_no_trading_time_df使用同一掩码
+    df = history_tickdata_processor.split_no_trading_time_df(pd.DataFrame({"datetime": datetimes}), asset)
+    assert df.index.difference(expected).tolist() == np.flatnonzero(gap).tolist()
+
+
+def test_trading_time_mask_night_sessions() -> None:
+    datetimes: np.ndarray = pd.to_datetime([
+        "2023-01-06 21:00:00.5", "2023-01-06 23:00:00.0", "2023-01-06 23:00:00.5", "2023-01-07 00:59:59.5",
+        "2023-01-07 01:00:00.0", "2023-01-07 01:00:00.5", "2023-01-07 02:30:00.0", "2023-01-07 02:30:00.5", None
+    ]).to_numpy()
+    assert trading_time_mask(datetimes, "rb").tolist() == [True, True, False, False, False, False, False, False, False]
+    assert trading_time_mask(datetimes, "cu").tolist() == [True, True, True, True, True, False, False, False, False]
+    assert trading_time_mask(datetimes, "au").tolist() == [True, True, True, True, True, True, True, False, False]
+
+
+def test_trading_day_index_matches_get_trading_day() -> None:
+    # 周四至下周二每15分钟, 加上18点和0点前后1微秒
+    start: datetime = datetime(2023, 1, 5)
+    datetimes: List[datetime] = [start + timedelta(minutes=15 * i) for i in range(6 * 96)]
+    for d in range(6):
+        for hour in (0, 18):
+            t: datetime = start + timedelta(days=d, hours=hour)
+            datetimes += [t - timedelta(microseconds=1), t + timedelta(microseconds=1)]
+
+    datetime_ns: np.ndarray = np.array([datetime_to_ns(dt) for dt in datetimes], dtype=np.int64)
+    indexes: np.ndarray = get_trading_day_index(datetime_ns)
+    assert [trading_day_to_date(index) for index in indexes] == [get_trading_day(dt) for dt in datetimes]
+
+    # 周五夜盘和周末归属下周一
+    friday_night: int = datetime_to_ns(datetime(2023, 1, 6, 21))
+    assert trading_day_to_date(get_trading_day_index(friday_night)) == date(2023, 1, 9)
+    for ns, index in zip(datetime_ns.tolist(), indexes.tolist()):
+        start_ns, end_ns = get_trading_day_bounds(index)
+        assert start_ns <= ns < end_ns or trading_day_to_date(index).weekday() == 0
+    assert get_trading_day_bounds(get_trading_day_index(friday_night))[0] == datetime_to_ns(datetime(2023, 1, 6, 18))
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import pandas as pd
+import pytest
+
+from datastructure.constant import Exchange, Interval
+from datastructure.object import BarData
+from utils.utils_class import WindowGenerator
+
+
+# rb两个交易日(2023-01-04, 2023-01-05)的交易时段, 交易日的夜盘在前一日晚上
+DAY1: List[Tuple[str, str]] = [
+    ("2023-01-03 21:00", "2023-01-03 23:00"),
+    ("2023-01-04 09:00", "2023-01-04 10:15"),
+    ("2023-01-04 10:30", "2023-01-04 11:30"),
+    ("2023-01-04 13:30", "2023-01-04 15:00"),
+]
+DAY2: List[Tuple[str, str]] = [
+    ("2023-01-04 21:00", "2023-01-04 23:00"),
+    ("2023-01-05 09:00", "2023-01-05 10:15"),
+    ("2023-01-05 10:30", "2023-01-05 11:30"),
+    ("2023-01-05 13:30", "2023-01-05 15:00"),
+]
+
+
+def make_bars(sessions: List[Tuple[str, str]]) -> List[BarData]:
+    '''
+    每个时段内的1分钟bar(datetime为分钟起点), 第i根bar开盘价4000+i, 成交量1
+    '''
+    bars: List[BarData] = []
+    for start, end in sessions:
+        for dt in pd.date_range(start, end, freq="1min", inclusive="left").to_pydatetime():
+            i: int = len(bars)
+            bars.append(BarData("rb2305", Exchange.SHFE, dt, Interval.MINUTE, volume=1, turnover=10, open_interest=i,
+                                open_price=4000 + i, high_price=4000 + i + 0.5, low_price=4000 + i - 0.5, close_price=4000 + i + 0.25))
+    return bars
+
+
+def run(bars: List[BarData], window: int, interval: Interval) -> List[BarData]:
+    received: List[BarData] = []
+    generator: WindowGenerator = WindowGenerator(window, received.append, interval)
+    for bar in bars:
+        generator.update_bar(bar)
+    assert received == generator.window_bars
+    return received
+
+
+def assert_window(window_bar: BarData, bars: List[BarData]) -> None:
+    '''
+    窗口bar的开高低收量等于对应1分钟bar的汇总
+    '''
+    assert window_bar.open_price == bars[0].open_price
+    assert window_bar.high_price == max(bar.high_price for bar in bars)
+    assert window_bar.low_price == min(bar.low_price for bar in bars)
+    assert window_bar.close_price == bars[-1].close_price
+    assert window_bar.volume == len(bars)
+    assert window_bar.turnover == 10 * len(bars)
+    assert window_bar.open_interest == bars[-1].open_interest
+
+
+def spans(window_bars: List[BarData], bars: List[BarData]) -> List[Tuple[str, int]]:
+    '''
+    (窗口起点, 包含的1分钟bar数), 并检查OHLCV
+    '''
+    result: List[Tuple[str, int]] = []
+    i: int = 0
+    for window_bar in window_bars:
+        n: int = int(window_bar.volume)
+        assert_window(window_bar, bars[i: i + n])
+        result.append((window_bar.datetime.strftime("%m-%d %H:%M"), n))
+        i += n
+    return result
+
+
+def test_minute_windows_close_at_session_ends() -> None:
+    bars: List[BarData] = make_bars(DAY1)
+    window_bars: List[BarData] = run(bars, 30, Interval.MINUTE)
+    assert spans(window_bars, bars) == [
+        ("01-03 21:00", 30), ("01-03 21:30", 30), ("01-03 22:00", 30), ("01-03 22:30", 30),
+        ("01-04 09:00", 30), ("01-04 09:30", 30), ("01-04 10:00", 15),     # 10:15休市强制结束
+        ("01-04 10:30", 30), ("01-04 11:00", 30),
+        ("01-04 13:30", 30), ("01-04 14:00", 30), ("01-04 14:30", 30),     # 午休不跨越
+    ]
+    assert all(bar.interval == Interval.MINUTE for bar in window_bars)
+
+
+def test_hour_windows() -> None:
+    bars: List[BarData] = make_bars(DAY1)
+    window_bars: List[BarData] = run(bars, 1, Interval.HOUR)
+    assert spans(window_bars, bars) == [
+        ("01-03 21:00", 60), ("01-03 22:00", 60),
+        ("01-04 09:00", 60), ("01-04 10:00", 15), ("01-04 10:30", 30), ("01-04 11:00", 30),
+        ("01-04 13:30", 30), ("01-04 14:00", 60),
+    ]
+
+    # 2小时窗口: 在偶数整点或休市时结束
+    window_bars = run(bars, 2, Interval.HOUR)
+    assert spans(window_bars, bars) == [
+        ("01-03 21:00", 60), ("01-03 22:00", 60),
+        ("01-04 09:00", 60), ("01-04 10:00", 15), ("01-04 10:30", 60),
+        ("01-04 13:30", 30), ("01-04 14:00", 60),
+    ]
+
+
+def test_daily_windows_include_previous_night() -> None:
+    bars: List[BarData] = make_bars(DAY1 + DAY2)
+    window_bars: List[BarData] = run(bars, 1, Interval.DAILY)
+    assert [bar.datetime for bar in window_bars] == [datetime(2023, 1, 4), datetime(2023, 1, 5)]
+    assert spans(window_bars, bars) == [("01-04 00:00", 345), ("01-05 00:00", 345)]
+
+    # 2个交易日一根
+    window_bars = run(bars, 2, Interval.DAILY)
+    assert spans(window_bars, bars) == [("01-04 00:00", 690)]
+
+
+def test_daily_rollover_without_close_bar() -> None:
+    # 第一个交易日缺少14:59的收盘bar, 下一个交易日的夜盘bar到达时结束
+    bars: List[BarData] = [bar for bar in make_bars(DAY1 + DAY2) if bar.datetime != datetime(2023, 1, 4, 14, 59)]
+    received: List[BarData] = []
+    generator: WindowGenerator = WindowGenerator(1, received.append, Interval.DAILY)
+    for bar in bars:
+        generator.update_bar(bar)
+        if bar.datetime == datetime(2023, 1, 4, 21):
+            assert len(received) == 1
+    assert spans(received, bars) == [("01-04 00:00", 344), ("01-05 00:00", 345)]
+
+
+def test_daily_friday_night_belongs_to_monday() -> None:
+    sessions: List[Tuple[str, str]] = [
+        ("2023-01-06 09:00", "2023-01-06 10:15"), ("2023-01-06 10:30", "2023-01-06 11:30"), ("2023-01-06 13:30", "2023-01-06 15:00"),
+        ("2023-01-06 21:00", "2023-01-06 23:00"), ("2023-01-09 09:00", "2023-01-09 10:15"),
+    ]
+    bars: List[BarData] = make_bars(sessions)
+    received: List[BarData] = run(bars, 1, Interval.DAILY)
+    assert spans(received, bars) == [("01-06 00:00", 225)]
+
+    # 周五夜盘和周一上午合并为周一, 未收盘时generate立即结束
+    generator: WindowGenerator = WindowGenerator(1, lambda bar: None, Interval.DAILY)
+    for bar in bars:
+        generator.update_bar(bar)
+    monday: BarData = generator.generate()
+    assert monday.datetime == datetime(2023, 1, 9)
+    assert_window(monday, bars[225:])
+    assert generator.generate() is None
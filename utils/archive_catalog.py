@@ -0,0 +1,161 @@
+'''
+历史数据csv目录索引
+把存放tqsdk历史数据的文件夹({root}/{日期}/{csv})索引到sqlite, 记录每个文件的日期、交易所、合约、大小和修改时间
+按日文件夹的修改时间增量刷新, 查询时不再遍历文件系统
+'''
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from datastructure.setting import SETTING
+
+
+CREATE_SCRIPT: str = '''
+CREATE TABLE IF NOT EXISTS folders (
+    root TEXT NOT NULL,
+    day TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (root, day)
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    day TEXT NOT NULL,
+    exchange TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_day ON files (root, day);
+CREATE INDEX IF NOT EXISTS files_symbol ON files (root, exchange, symbol);
+'''
+
+
+def read_csv_header(csv_path: str) -> Tuple[str, str]:
+    '''
+    从csv表头读取(交易所, 合约), 第3列形如SHFE.rb2305.last_price, 无法识别返回空字符串
+    '''
+    try:
+        with open(csv_path) as f:
+            columns: List[str] = f.readline().strip().split(',')
+        exchange_str, symbol_str = columns[2].split('.')[:2]
+    except (OSError, UnicodeDecodeError, IndexError, ValueError):
+        return "", ""
+    return exchange_str, symbol_str
+
+
+class ArchiveCatalog:
+    '''
+    历史数据csv目录索引
+    1.folders表记录每个日文件夹上次刷新时的修改时间, 未变化的文件夹跳过(增删文件会改变文件夹修改时间)
+    2.files表记录每个csv文件的日期、交易所、合约、大小和修改时间, 只对新增或变化的文件读取表头
+    '''
+    def __init__(self, root: str, catalog_path: str = None) -> None:
+        self.root: str = os.path.abspath(root)
+        self.catalog_path: Path = Path(catalog_path or SETTING["data.archive_catalog"])
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection: sqlite3.Connection = sqlite3.connect(str(self.catalog_path))
+        self.connection.executescript(CREATE_SCRIPT)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def refresh(self, full: bool = False) -> List[str]:
+        '''
+        增量刷新索引, 返回新增或变化的文件路径
+        full为True时检查所有文件的大小和修改时间(文件被原地改写时文件夹修改时间不变)
+        '''
+        folder_mtimes: Dict[str, float] = dict(self.connection.execute(
+            "SELECT day, mtime FROM folders WHERE root = ?", (self.root,)
+        ))
+        days: List[str] = sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir())
+
+        changed: List[str] = []
+        with self.connection:
+            for day in set(folder_mtimes) - set(days):
+                self.remove_day(day)
+            for day in days:
+                folder: str = os.path.join(self.root, day)
+                mtime: float = os.stat(folder).st_mtime
+                if not full and folder_mtimes.get(day, None) == mtime:
+                    continue
+                changed.extend(self.refresh_day(day, folder))
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO folders (root, day, mtime) VALUES (?, ?, ?)", (self.root, day, mtime)
+                )
+        return changed
+
+    def refresh_day(self, day: str, folder: str) -> List[str]:
+        '''
+        刷新一个日文件夹, 返回新增或变化的文件路径
+        '''
+        known: Dict[str, Tuple[int, float]] = {
+            path: (size, mtime) for path, size, mtime in self.connection.execute(
+                "SELECT path, size, mtime FROM files WHERE root = ? AND day = ?", (self.root, day)
+            )
+        }
+
+        changed: List[str] = []
+        for entry in os.scandir(folder):
+            if not entry.is_file() or not entry.name.endswith(".csv"):
+                continue
+            stat: os.stat_result = entry.stat()
+            path: str = entry.path
+            if known.pop(path, None) == (stat.st_size, stat.st_mtime):
+                continue
+            exchange_str, symbol_str = read_csv_header(path)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, root, day, exchange, symbol, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, self.root, day, exchange_str, symbol_str, stat.st_size, stat.st_mtime)
+            )
+            changed.append(path)
+
+        # 已删除的文件
+        self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in known])
+        return changed
+
+    def remove_day(self, day: str) -> None:
+        '''
+        日文件夹已删除: 删除其索引
+        '''
+        self.connection.execute("DELETE FROM files WHERE root = ? AND day = ?", (self.root, day))
+        self.connection.execute("DELETE FROM folders WHERE root = ? AND day = ?", (self.root, day))
+
+    def get_files(
+        self,
+        start_day: str = None,
+        end_day: str = None,
+        exchange: str = None,
+        symbol: str = None
+    ) -> List[str]:
+        '''
+        按日期区间(闭区间, 与文件夹名同格式)、交易所、合约查询文件路径, 按日期和路径排序
+        '''
+        sql: str = "SELECT path FROM files WHERE root = ?"
+        params: List = [self.root]
+        for condition, value in (("day >= ?", start_day), ("day <= ?", end_day), ("exchange = ?", exchange), ("symbol = ?", symbol)):
+            if value is not None:
+                sql += f" AND {condition}"
+                params.append(value)
+        sql += " ORDER BY day, path"
+        return [path for path, in self.connection.execute(sql, params)]
+
+    def get_days(self) -> List[str]:
+        '''
+        已索引的日期(文件夹名)
+        '''
+        return [day for day, in self.connection.execute(
+            "SELECT day FROM folders WHERE root = ? ORDER BY day", (self.root,)
+        )]
+
+    def get_file_info(self, path: str) -> Optional[Dict]:
+        '''
+        单个文件的索引信息
+        '''
+        row: Optional[Tuple] = self.connection.execute(
+            "SELECT day, exchange, symbol, size, mtime FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("day", "exchange", "symbol", "size", "mtime"), row))
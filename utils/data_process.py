@@ -3,14 +3,39 @@ tqsdk数据处理脚本
 '''
 
 from typing import Tuple, List, Dict
+from dataclasses import fields
+from functools import cached_property
+import numpy as np
 import pandas as pd
-from datetime import datetime
 import os
 
 from datastructure.object import TickData
 from datastructure.constant import Exchange
+from utils.trading_calendar import get_trading_time, get_product, trading_time_mask
+from utils.archive_catalog import ArchiveCatalog
 
 
+# TickData字段名, 按构造函数参数顺序(前3个为symbol, exchange, datetime), 不含最后的datetime_ns
+TICK_FIELDS: List[str] = [f.name for f in fields(TickData) if f.name != "datetime_ns"]
+# tqsdk csv中datetime字段格式(纳秒)
+DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S.%f"
+# tqsdk csv中datetime_nano为UTC纳秒时间戳, 转换为交易所所在时区
+CHINA_TZ: str = "Asia/Shanghai"
+# tqsdk字段(去掉"交易所.合约."前缀) -> tick字段
+TQSDK_COLUMNS: Dict[str, str] = {
+    'last_price': 'last_price', 'highest': 'highest_price', 'lowest': 'lowest_price', 'volume': 'volume',
+    'amount': 'turnover', 'open_interest': 'open_interest', 'bid_price1': 'bid_price_1', 'bid_volume1': 'bid_volume_1',
+    'ask_price1': 'ask_price_1', 'ask_volume1': 'ask_volume_1'
+}
+# 整数字段(数据库中为LONG)
+INT_COLUMNS: List[str] = ['volume', 'open_interest', 'bid_volume_1', 'ask_volume_1']
+
+# 安装了pyarrow时使用其多线程csv解析
+try:
+    import pyarrow
+    CSV_ENGINE: str = "pyarrow"
+except ImportError:
+    CSV_ENGINE: str = "c"
 
 
 class history_tickdata_processor: ##待完善
@@ -19,14 +44,31 @@ class history_tickdata_processor: ##待完善
     '''
     def __init__(self, product_folder_path="/home/tushetou/futures_history_data"):
         self.product_folder_path: str = product_folder_path
-        self.daily_folder_paths: List[str] = [self.product_folder_path + '/' + daily for daily in os.listdir(self.product_folder_path)]
-        self.all_csv_paths: Dict[str: List[str]] = self.get_all_csv_paths()
-    
-    def get_all_csv_paths(self):
-        d: Dict = {}
-        for daily_folder_path in self.daily_folder_paths:
-            csv_paths: List[str] = [daily_folder_path + '/' + csv for csv in os.listdir(daily_folder_path)]
-            d[daily_folder_path] = csv_paths
+
+    @cached_property
+    def catalog(self) -> ArchiveCatalog:
+        '''
+        文件夹索引, 首次访问时增量刷新
+        '''
+        catalog: ArchiveCatalog = ArchiveCatalog(self.product_folder_path)
+        catalog.refresh()
+        return catalog
+
+    @property
+    def daily_folder_paths(self) -> List[str]:
+        return [os.path.join(self.catalog.root, day) for day in self.catalog.get_days()]
+
+    @property
+    def all_csv_paths(self) -> Dict[str, List[str]]:
+        return self.get_all_csv_paths()
+
+    def get_all_csv_paths(self) -> Dict[str, List[str]]:
+        '''
+        {日文件夹路径: 该日所有csv路径}
+        '''
+        d: Dict = {daily_folder_path: [] for daily_folder_path in self.daily_folder_paths}
+        for csv_path in self.catalog.get_files():
+            d[os.path.dirname(csv_path)].append(csv_path)
         return d
 
 
@@ -34,100 +76,76 @@ class history_tickdata_processor: ##待完善
     # 给定标的, 返回交易时间段
     @staticmethod
     def get_trading_time (asset: str) -> Tuple:
-        ###refer to : http://qhsxf.com/%E6%9C%9F%E8%B4%A7%E4%BA%A4%E6%98%93%E6%97%B6%E9%97%B4.html
-        CZCE_NIGHT1 = ['fg', 'sa', 'ma', 'sr', 'ta', 'rm', 'oi', 'cf', 'cf', 'cy', 'pf', 'zc']
-        CZCE_NIGHT2 = ['sm', 'sf', 'wh', 'jr', 'lr', 'pm', 'ri', 'rs', 'pk', 'ur', 'cj', 'ap']
-        DCE_NIGHT1 = ['i', 'j', 'jm', 'a', 'b', 'ma', 'p', 'y', 'c', 'cs', 'pp', 'v', 'eb', 'eg', 'pg', 'rr', 'i']
-        DCE_NIGHT2 = ['bb', 'fb' 'Ih', 'jd']
-        SHFE_NIGHT1 = ['cu', 'pb', 'al', 'zn', 'sn', 'ni', 'ss']
-        SHFE_NIGHT2 = ['fu', 'ru', 'bu', 'sp', 'rb', 'hc']
-        SHFE_NIGHT3 = ['au', 'ag']
-        SHFE_NIGHT4 = ['wr']
-        GFEX_NIGHT = ['si']
-        INE_NIGHT1 = ['sc']
-        INE_NIGHT2 = ['bc']
-        INE_NIGHT3 = ['lu', 'nr']
-        CFFEX_DAY1  = ['if', 'ih', 'ic', 'im']
-        CFFEX_DAY2 = ['t', 'tf', 'ts']
-        if asset in CZCE_NIGHT1 or asset in DCE_NIGHT1 or asset in SHFE_NIGHT2 or asset in INE_NIGHT3: 
-            return ("21:00:00.500000000", "23:00:00.000000000", "09:00:00.500000000", "10:15:00.000000000", "10:30:00.500000000", "11:30:00.000000000", "13:30:00.500000000","15:00:00.000000000")
-        if asset in SHFE_NIGHT1 or asset in INE_NIGHT2:
-            return ("21:00:00.500000000", "01:00:00.000000000", "09:00:00.500000000", "10:15:00.000000000", "10:30:00.500000000", "11:30:00.000000000", "13:30:00.500000000","15:00:00.000000000")
-        if asset in SHFE_NIGHT3 or asset in INE_NIGHT1:
-            return ("21:00:00.500000000", "02:30:00.000000000", "09:00:00.500000000", "10:15:00.000000000", "10:30:00.500000000", "11:30:00.000000000", "13:30:00.500000000","15:00:00.000000000")
-        if asset in CZCE_NIGHT2 or asset in DCE_NIGHT2 or asset in SHFE_NIGHT4 or asset in GFEX_NIGHT:
-            return ("99:99:99.000000000", "99:99:99.500000000", "09:00:00.500000000", "10:15:00.000000000", "10:30:00.500000000", "11:30:00.000000000", "13:30:00.500000000", "15:00:00.000000000")
-        # 暂时不支持中金所
-        # if asset in CFFEX_DAY1:
-        #     return ("00:00:00.000000000", "00:00:00.500000000", "09:30:00.500000000", "11:30:00.000000000", "13:00:00.500000000", "15:00:00.000000000")
-        # if asset in CFFEX_DAY2:
-        #     return ("00:00:00.000000000", "00:00:00.500000000", "09:15:00.500000000", "11:30:00.000000000", "13:00:00.500000000", "15:15:00.000000000")
-        # 其他不支持的品种
-        else:
-            return ("99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000")
-    
+        return get_trading_time(asset)
+
     # 剔除非交易时间段数据
-    @classmethod
-    def split_no_trading_time_df(cls, df: pd.DataFrame, asset: str) -> pd.DataFrame:
-        dp = cls()
-        (s0, e0, s1, e1, s2, e2, s3, e3)= dp.get_trading_time(asset)
-        hms = df['datetime'].apply(lambda x: float('nan') if pd.isna(x) else x[11:])# hms:时分秒
-        if s0 <= e0:
-            df = df.loc[((hms >= s0)&(hms <=e0))|((hms >= s1)&(hms <=e1))|((hms >= s2)&(hms <=e2))|((hms >= s3)&(hms <=e3))]
-        else:
-            df = df.loc[((hms >= s0)&(hms <='23:59:59.500000000'))|((hms >= '00:00:00.000000000')&(hms <=e0))|((hms >= s1)&(hms <=e1))|((hms >= s2)&(hms <=e2))|((hms >= s3)&(hms <=e3))]
-        return df
+    @staticmethod
+    def split_no_trading_time_df(df: pd.DataFrame, asset: str) -> pd.DataFrame:
+        '''
+        按品种交易时段(闭区间)过滤, datetime列可为字符串或datetime
+        '''
+        datetimes: pd.Series = df['datetime']
+        if not pd.api.types.is_datetime64_dtype(datetimes):
+            datetimes = pd.to_datetime(datetimes, format=DATETIME_FORMAT)
+        datetimes: np.ndarray = datetimes.to_numpy(dtype='datetime64[ns]')
+        return df.loc[trading_time_mask(datetimes, asset)]
 
-    # dropna数据, 加入exchange, symbol字段, 剔除非交易时间段数据, 删除datetime_nano, column名字更新
+    # dropna数据, 加入exchange, symbol字段, 剔除非交易时间段数据, column名字更新
     @classmethod
     def tqsdk_data_process(cls, csv_path: str) -> pd.DataFrame:
         '''
         输入单个csv文件路径
         输出清洗后改csv文件的dataframe
+        按表头只读取需要的列并指定类型; 时间由datetime_nano(UTC纳秒)转换为北京时间, 没有该列时解析datetime字符串
         '''
-        dp = cls()
-        df = pd.read_csv(csv_path)
-        exchange_str, symbol_str,  = df.columns[2].split('.')[:2]
-        df.drop(['datetime_nano'], axis=1, inplace=True)
+        with open(csv_path) as f:
+            header: List[str] = f.readline().strip().split(',')
+        exchange_str, symbol_str,  = header[2].split('.')[:2]
+        prefix = f"{exchange_str}.{symbol_str}."
+        columns: Dict[str, str] = {prefix + field: name for field, name in TQSDK_COLUMNS.items()}
+        time_column: str = 'datetime_nano' if 'datetime_nano' in header else 'datetime'
+        dtype: Dict[str, str] = {column: 'float64' for column in columns}
+        dtype[time_column] = 'int64' if time_column == 'datetime_nano' else 'object'
+
+        usecols: List[str] = [time_column] + list(columns)
+        try:
+            df = pd.read_csv(csv_path, usecols=usecols, dtype=dtype, engine=CSV_ENGINE)
+        except ValueError: # datetime_nano有缺失值, 按可空整数读取
+            dtype[time_column] = 'Int64'
+            df = pd.read_csv(csv_path, usecols=usecols, dtype=dtype, engine=CSV_ENGINE)
         df.dropna(inplace=True)
-        # 检查数据是否有多余字段, 删除额外信息
-        if len(df.columns) > 11:
-            prefix = f"{exchange_str}.{symbol_str}." 
-            df = df.loc[:, ['datetime', prefix + 'last_price', prefix + 'highest', prefix + 'lowest', prefix + 'volume', prefix + 'amount', prefix + 'open_interest', 
-                            prefix + 'bid_price1', prefix + 'bid_volume1', prefix + 'ask_price1', prefix + 'ask_volume1']]
-
-        df.columns = ['datetime', 'last_price', 'highest_price', 'lowest_price', 'volume', 'turnover', 'open_interest', 'bid_price_1', 'bid_volume_1', 'ask_price_1', 'ask_volume_1']
-        df['datetime'] = df['datetime'].apply(lambda x: x[:-3])
+        df.rename(columns=columns, inplace=True)
+        df = df.loc[:, [time_column] + list(TQSDK_COLUMNS.values())]
+        for name in INT_COLUMNS:
+            df[name] = df[name].astype('int64')
+
+        if time_column == 'datetime_nano':
+            datetimes = pd.to_datetime(df.pop('datetime_nano').to_numpy('int64'), utc=True).tz_convert(CHINA_TZ).tz_localize(None)
+        else:
+            datetimes = pd.DatetimeIndex(pd.to_datetime(df.pop('datetime'), format=DATETIME_FORMAT))
+        df.insert(0, 'datetime', datetimes.floor('us')) # 精确到微秒
         df['symbol'] = symbol_str
         df['exchange'] = exchange_str
-        symbol_type = ''.join([chr for chr in symbol_str if chr.isalpha() ])
-        symbol_type = symbol_type.lower()
-        df = dp.split_no_trading_time_df(df, symbol_type)
-        df['datetime'] = df['datetime'].apply(lambda x: datetime.strptime(x, "%Y-%m-%d %H:%M:%S.%f")) # 时间格式由字符串转换为datetime
+        df = cls.split_no_trading_time_df(df, get_product(symbol_str))
         return df
-    
+
     @staticmethod
     def df2data(df: pd.DataFrame) -> List[TickData]:
         '''
         输入清洗后单个csv文件的dataframe
         输出该文件的list of tickdata
+        按列取出python list后批量构造TickData, exchange每个取值只解析一次
+        datetime经datetime64[us]转为python datetime(tolist直接转换, 不逐个构造Timestamp), datetime_ns按列计算后传入
         '''
-        TickData_list: list[TickData] = []
-        for index, row in df.iterrows():
-            data: TickData = TickData(
-                symbol=row['symbol'],
-                exchange=Exchange(row['exchange']),
-                datetime=row['datetime'],
-                volume=row['volume'],
-                turnover=row["turnover"],
-                open_interest=row['open_interest'],
-                last_price=row['last_price'],
-                highest_price=row['highest_price'],
-                lowest_price=row['lowest_price'],
-                bid_price_1=row['bid_price_1'],
-                bid_volume_1=row['bid_volume_1'],
-                ask_price_1=row['ask_price_1'],
-                ask_volume_1=row['ask_volume_1']
-            )
-            TickData_list.append(data)
-        return TickData_list
+        if df.empty:
+            return []
+        exchanges: Dict = {value: Exchange(value) for value in df['exchange'].unique()}
+        datetimes: np.ndarray = pd.to_datetime(df['datetime']).to_numpy(dtype='datetime64[us]')
+        columns: List[list] = [
+            df['symbol'].tolist(),
+            [exchanges[value] for value in df['exchange'].tolist()],
+            datetimes.tolist()
+        ]
+        columns += [df[name].tolist() for name in TICK_FIELDS[3:]]
+        columns.append((datetimes.view(np.int64) * 1000).tolist())
+        return list(map(TickData, *columns))
@@ -0,0 +1,221 @@
+'''
+增量技术指标
+每个指标保存自身状态, 每输入一个新值只做O(1)更新; 输出与talib同名指标一致(包括初始化方式), 未满足计算条件时输出nan
+'''
+from collections import deque
+from math import sqrt, nan
+from typing import Deque, Tuple
+
+
+class Indicator:
+    '''
+    增量指标父类
+    '''
+    def __init__(self) -> None:
+        self.count: int = 0         # 已输入数据个数
+        self.value: float = nan     # 最新指标值
+
+    @property
+    def inited(self) -> bool:
+        '''
+        指标值是否已可用
+        '''
+        return self.value == self.value # nan != nan
+
+
+class SMA(Indicator):
+    '''
+    简单移动平均, 同talib.SMA
+    '''
+    def __init__(self, n: int) -> None:
+        super().__init__()
+        self.n: int = n
+        self.window: Deque[float] = deque(maxlen=n)
+        self.total: float = 0
+
+    def update(self, x: float) -> float:
+        if len(self.window) == self.n:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        self.count += 1
+        if self.count >= self.n:
+            self.value = self.total / self.n
+        return self.value
+
+
+class EMA(Indicator):
+    '''
+    指数移动平均, 同talib.EMA: 以前n个值的简单平均为初始值, 之后value += k * (x - value), k = 2 / (n + 1)
+    '''
+    def __init__(self, n: int) -> None:
+        super().__init__()
+        self.n: int = n
+        self.k: float = 2 / (n + 1)
+        self.total: float = 0
+
+    def update(self, x: float) -> float:
+        self.count += 1
+        if self.count < self.n:
+            self.total += x
+        elif self.count == self.n:
+            self.value = (self.total + x) / self.n
+        else:
+            self.value += self.k * (x - self.value)
+        return self.value
+
+
+class RollingStd(Indicator):
+    '''
+    滚动总体标准差, 同talib.STDDEV(nbdev=1), 方差小于1e-8时为0
+    按Welford方法滑动更新均值和离差平方和, 避免价格较大时平方和相减的精度损失
+    '''
+    def __init__(self, n: int) -> None:
+        super().__init__()
+        self.n: int = n
+        self.window: Deque[float] = deque(maxlen=n)
+        self.mean: float = 0
+        self.m2: float = 0      # 离差平方和
+
+    def update(self, x: float) -> float:
+        if len(self.window) == self.n:
+            old: float = self.window[0]
+            old_mean: float = self.mean
+            self.mean += (x - old) / self.n
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        else:
+            delta: float = x - self.mean
+            self.mean += delta / (len(self.window) + 1)
+            self.m2 += delta * (x - self.mean)
+        self.window.append(x)
+        self.count += 1
+        if self.count >= self.n:
+            variance: float = self.m2 / self.n
+            self.value = sqrt(variance) if variance >= 1e-8 else 0
+        return self.value
+
+
+class ATR(Indicator):
+    '''
+    平均真实波幅, 同talib.ATR: 真实波幅从第2个bar开始计算, 以前n个真实波幅的简单平均为初始值, 之后Wilder平滑
+    '''
+    def __init__(self, n: int) -> None:
+        super().__init__()
+        self.n: int = n
+        self.last_close: float = nan
+        self.total: float = 0
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.count += 1
+        if self.count > 1:
+            tr: float = max(high, self.last_close) - min(low, self.last_close)
+            if self.count <= self.n:
+                self.total += tr
+            elif self.count == self.n + 1:
+                self.value = (self.total + tr) / self.n
+            else:
+                self.value = (self.value * (self.n - 1) + tr) / self.n
+        self.last_close = close
+        return self.value
+
+
+class RSI(Indicator):
+    '''
+    相对强弱指标, 同talib.RSI: 以前n个涨跌幅的简单平均为初始值, 之后Wilder平滑
+    '''
+    def __init__(self, n: int) -> None:
+        super().__init__()
+        self.n: int = n
+        self.last_x: float = nan
+        self.gain: float = 0    # 平均涨幅
+        self.loss: float = 0    # 平均跌幅
+
+    def update(self, x: float) -> float:
+        self.count += 1
+        if self.count > 1:
+            change: float = x - self.last_x
+            gain: float = change if change > 0 else 0
+            loss: float = -change if change < 0 else 0
+            if self.count <= self.n + 1:
+                self.gain += gain
+                self.loss += loss
+                if self.count == self.n + 1:
+                    self.gain /= self.n
+                    self.loss /= self.n
+                    self.value = self.calculate()
+            else:
+                self.gain = (self.gain * (self.n - 1) + gain) / self.n
+                self.loss = (self.loss * (self.n - 1) + loss) / self.n
+                self.value = self.calculate()
+        self.last_x = x
+        return self.value
+
+    def calculate(self) -> float:
+        total: float = self.gain + self.loss
+        return 100 * self.gain / total if total else 0
+
+
+class Bollinger(Indicator):
+    '''
+    布林带, 同talib.BBANDS(matype=SMA): 中轨为n期均值, 上下轨为中轨加减dev倍总体标准差
+    value为中轨, update返回(上轨, 中轨, 下轨)
+    '''
+    def __init__(self, n: int, dev: float = 2) -> None:
+        super().__init__()
+        self.dev: float = dev
+        self.std: RollingStd = RollingStd(n)
+        self.upper: float = nan
+        self.lower: float = nan
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        self.count += 1
+        std: float = self.std.update(x)
+        if self.std.inited:
+            self.value = self.std.mean
+            self.upper = self.value + self.dev * std
+            self.lower = self.value - self.dev * std
+        return self.upper, self.value, self.lower
+
+
+class MACD(Indicator):
+    '''
+    MACD, 同talib.MACD
+    快慢线同时在第slow个值开始输出: 快线初始值取第slow个值之前fast个值的均值(而不是前fast个值)
+    信号线以前signal个MACD值的均值为初始值, 三个输出均从第slow + signal - 1个值开始
+    value为MACD值, update返回(MACD, 信号线, 柱)
+    '''
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9) -> None:
+        super().__init__()
+        if slow < fast:
+            fast, slow = slow, fast
+        self.slow: int = slow
+        self.fast_sma: SMA = SMA(fast)
+        self.slow_sma: SMA = SMA(slow)
+        self.fast_k: float = 2 / (fast + 1)
+        self.slow_k: float = 2 / (slow + 1)
+        self.fast_ema: float = nan
+        self.slow_ema: float = nan
+        self.signal_ema: EMA = EMA(signal)
+        self.signal: float = nan
+        self.hist: float = nan
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        self.count += 1
+        if self.count < self.slow:
+            self.fast_sma.update(x)
+            self.slow_sma.update(x)
+            return self.value, self.signal, self.hist
+        if self.count == self.slow:
+            self.fast_ema = self.fast_sma.update(x)
+            self.slow_ema = self.slow_sma.update(x)
+        else:
+            self.fast_ema += self.fast_k * (x - self.fast_ema)
+            self.slow_ema += self.slow_k * (x - self.slow_ema)
+
+        macd: float = self.fast_ema - self.slow_ema
+        self.signal_ema.update(macd)
+        if self.signal_ema.inited:
+            self.value = macd
+            self.signal = self.signal_ema.value
+            self.hist = self.value - self.signal
+        return self.value, self.signal, self.hist
@@ -0,0 +1,210 @@
+'''
+tick数据批量合成bar
+对整段(如一个交易日)单合约tick数组做numpy分组聚合, 结果与逐个tick调用BarGenerator/ThresholdBarGenerator.update_tick(最后调用generate)一致
+'''
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from datastructure.constant import Exchange, Interval
+from datastructure.object import BarData
+
+
+# bar数据字段
+BAR_COLUMNS: List[str] = [
+    "symbol", "exchange", "datetime", "interval", "volume", "turnover", "open_interest",
+    "open_price", "high_price", "low_price", "close_price"
+]
+US_PER_MINUTE: int = 60 * 1000000
+
+
+def get_valid_mask(us: np.ndarray, last_price: np.ndarray) -> np.ndarray:
+    '''
+    剔除脏数据, 同update_tick: 最新价为0的tick, 以及时间戳早于此前已接受tick的tick
+    此前已接受tick的最大时间戳即此前所有最新价非0 tick的时间戳最大值
+    '''
+    mask: np.ndarray = last_price != 0
+    valid_us: np.ndarray = us[mask]
+    mask[mask] = valid_us >= np.maximum.accumulate(valid_us)
+    return mask
+
+
+def get_microseconds(df: pd.DataFrame) -> np.ndarray:
+    '''
+    datetime列 -> 微秒时间戳(TickData的datetime精确到微秒)
+    '''
+    datetimes: pd.Series = df["datetime"]
+    if not pd.api.types.is_datetime64_dtype(datetimes):
+        datetimes = pd.to_datetime(datetimes)
+    return datetimes.to_numpy(dtype="datetime64[us]").view(np.int64)
+
+
+def get_bar_starts(us: np.ndarray) -> np.ndarray:
+    '''
+    每根分钟bar第一个tick的位置, 同update_tick:
+    tick的分钟数(0-59)与当前bar第一个tick不同且微秒数不为0时开始新bar
+    两次开始新bar之间满足条件的tick分钟数都等于当前bar的分钟数, 所以只需与上一个满足微秒条件的tick比较
+    '''
+    minutes: np.ndarray = (us // US_PER_MINUTE) % 60
+    candidates: np.ndarray = np.flatnonzero(us % 1000000 != 0)
+    candidates = np.concatenate([[0], candidates[candidates > 0]])
+    changed: np.ndarray = minutes[candidates[1:]] != minutes[candidates[:-1]]
+    return np.concatenate([[0], candidates[1:][changed]])
+
+
+def resample_tick_df(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    单合约tick DataFrame(按时间顺序, 字段同TickData) -> 1分钟bar DataFrame(字段见BAR_COLUMNS)
+    1.开盘价为上一个tick的最新价, 第一根bar为第一个tick的最新价
+    2.tick最高价(最低价)高于(低于)上一个tick时才参与计算bar最高价(最低价)
+    3.成交量/成交额为累计值的差(负数记为0), 第一个tick计入全部累计值
+    '''
+    us: np.ndarray = get_microseconds(df)
+    last_price: np.ndarray = df["last_price"].to_numpy(dtype=float)
+    mask: np.ndarray = get_valid_mask(us, last_price)
+    if not mask.any():
+        return pd.DataFrame(columns=BAR_COLUMNS)
+
+    us = us[mask]
+    last_price = last_price[mask]
+    highest: np.ndarray = df["highest_price"].to_numpy(dtype=float)[mask]
+    lowest: np.ndarray = df["lowest_price"].to_numpy(dtype=float)[mask]
+    volume: np.ndarray = df["volume"].to_numpy(dtype=float)[mask]
+    turnover: np.ndarray = df["turnover"].to_numpy(dtype=float)[mask]
+    open_interest: np.ndarray = df["open_interest"].to_numpy()[mask]
+
+    starts: np.ndarray = get_bar_starts(us)
+    ends: np.ndarray = np.append(starts[1:], len(us)) - 1
+
+    # 上一个tick, 第一个tick之前为虚拟tick(价格同第一个tick, 成交量/成交额为0)
+    last_highest: np.ndarray = np.concatenate([[last_price[0]], highest[:-1]])
+    last_lowest: np.ndarray = np.concatenate([[last_price[0]], lowest[:-1]])
+    last_volume: np.ndarray = np.concatenate([[0], volume[:-1]])
+    last_turnover: np.ndarray = np.concatenate([[0], turnover[:-1]])
+
+    high: np.ndarray = np.where(highest > last_highest, np.maximum(last_price, highest), last_price)
+    low: np.ndarray = np.where(lowest < last_lowest, np.minimum(last_price, lowest), last_price)
+    open_index: np.ndarray = np.maximum(starts - 1, 0)
+
+    bars: Dict[str, np.ndarray] = {
+        "symbol": df["symbol"].to_numpy()[mask][starts],
+        "exchange": df["exchange"].to_numpy()[mask][starts],
+        "datetime": (us[starts] // US_PER_MINUTE * US_PER_MINUTE).astype("datetime64[us]"),
+        "interval": Interval.MINUTE.value,
+        "volume": np.add.reduceat(np.maximum(volume - last_volume, 0), starts),
+        "turnover": np.add.reduceat(np.maximum(turnover - last_turnover, 0), starts),
+        "open_interest": open_interest[ends],
+        "open_price": last_price[open_index],
+        "high_price": np.maximum.reduceat(high, starts),
+        "low_price": np.minimum.reduceat(low, starts),
+        "close_price": last_price[ends],
+    }
+    return pd.DataFrame(bars, columns=BAR_COLUMNS)
+
+
+def df2bars(df: pd.DataFrame) -> List[BarData]:
+    '''
+    bar DataFrame(字段见BAR_COLUMNS) -> list of BarData
+    '''
+    if df.empty:
+        return []
+    exchanges: Dict = {value: Exchange(value) for value in df["exchange"].unique()}
+    intervals: Dict = {value: Interval(value) for value in df["interval"].unique()}
+    return list(map(
+        BarData,
+        df["symbol"].tolist(),
+        [exchanges[value] for value in df["exchange"].tolist()],
+        get_microseconds(df).astype("datetime64[us]").tolist(),
+        [intervals[value] for value in df["interval"].tolist()],
+        df["volume"].tolist(),
+        df["turnover"].tolist(),
+        df["open_interest"].tolist(),
+        df["open_price"].tolist(),
+        df["high_price"].tolist(),
+        df["low_price"].tolist(),
+        df["close_price"].tolist()
+    ))
+
+
+def get_threshold_ends(n: int, measure: Callable[[int, int], np.ndarray], threshold: float) -> np.ndarray:
+    '''
+    信息驱动bar每根bar最后一个tick的位置
+    measure(start, stop)返回从start开始逐tick累计的量(长度stop - start), 每根bar结束于首次达到threshold的tick
+    逐bar查找, 查找范围从上一根bar长度的2倍开始倍增, 总计算量与tick数成正比; 最后一根bar可能未达到阈值
+    '''
+    ends: List[int] = []
+    start: int = 0
+    size: int = 64
+    while start < n:
+        stop: int = min(n, start + size)
+        while True:
+            hits: np.ndarray = np.flatnonzero(measure(start, stop) >= threshold)
+            if len(hits) or stop == n:
+                break
+            stop = min(n, start + 2 * (stop - start))
+        end: int = start + int(hits[0]) if len(hits) else n - 1
+        ends.append(end)
+        size = 2 * (end - start + 1)
+        start = end + 1
+    return np.array(ends, dtype=np.int64)
+
+
+def resample_threshold_bars(df: pd.DataFrame, interval: Interval, threshold: float) -> pd.DataFrame:
+    '''
+    单合约tick DataFrame(按时间顺序, 字段同TickData) -> 信息驱动bar DataFrame(字段见BAR_COLUMNS)
+    规则同ThresholdBarGenerator(逐个tick调用update_tick, 最后调用generate):
+    interval为VOLUME/TURNOVER/RANGE/TICK_COUNT, 累计成交量/成交额/最高价-最低价/tick数达到threshold时结束bar
+    '''
+    us: np.ndarray = get_microseconds(df)
+    last_price: np.ndarray = df["last_price"].to_numpy(dtype=float)
+    mask: np.ndarray = get_valid_mask(us, last_price)
+    if not mask.any():
+        return pd.DataFrame(columns=BAR_COLUMNS)
+
+    us = us[mask]
+    last_price = last_price[mask]
+    volume: np.ndarray = df["volume"].to_numpy(dtype=float)[mask]
+    turnover: np.ndarray = df["turnover"].to_numpy(dtype=float)[mask]
+    open_interest: np.ndarray = df["open_interest"].to_numpy()[mask]
+    n: int = len(us)
+
+    # 第一个tick只作为基准
+    volume_change: np.ndarray = np.maximum(np.diff(volume, prepend=volume[0]), 0)
+    turnover_change: np.ndarray = np.maximum(np.diff(turnover, prepend=turnover[0]), 0)
+
+    # 按bar内顺序累加, 与逐tick累加的浮点结果一致
+    if interval == Interval.VOLUME:
+        ends: np.ndarray = get_threshold_ends(n, lambda start, stop: np.cumsum(volume_change[start: stop]), threshold)
+    elif interval == Interval.TURNOVER:
+        ends = get_threshold_ends(n, lambda start, stop: np.cumsum(turnover_change[start: stop]), threshold)
+    elif interval == Interval.RANGE:
+        ends = get_threshold_ends(
+            n,
+            lambda start, stop: (
+                np.maximum.accumulate(last_price[start: stop]) - np.minimum.accumulate(last_price[start: stop])
+            ),
+            threshold
+        )
+    elif interval == Interval.TICK_COUNT:
+        ends = np.arange(max(int(np.ceil(threshold)), 1) - 1, n, max(int(np.ceil(threshold)), 1))
+        if not len(ends) or ends[-1] != n - 1:
+            ends = np.append(ends, n - 1)
+    else:
+        raise ValueError(f"不支持的bar类型: {interval}")
+    starts: np.ndarray = np.concatenate([[0], ends[:-1] + 1])
+
+    bars: Dict[str, np.ndarray] = {
+        "symbol": df["symbol"].to_numpy()[mask][starts],
+        "exchange": df["exchange"].to_numpy()[mask][starts],
+        "datetime": us[starts].astype("datetime64[us]"),
+        "interval": interval.value,
+        "volume": np.add.reduceat(volume_change, starts),
+        "turnover": np.add.reduceat(turnover_change, starts),
+        "open_interest": open_interest[ends],
+        "open_price": last_price[starts],
+        "high_price": np.maximum.reduceat(last_price, starts),
+        "low_price": np.minimum.reduceat(last_price, starts),
+        "close_price": last_price[ends],
+    }
+    return pd.DataFrame(bars, columns=BAR_COLUMNS)
@@ -0,0 +1,160 @@
+'''
+交易时段日历
+每个品种的交易时段预先转换为当日纳秒数(ns of day)的闭区间数组并按品种缓存, 过滤非交易时段数据只用numpy比较
+'''
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import FrozenSet, List, Tuple
+
+import numpy as np
+
+
+NS_PER_SECOND: int = 1_000_000_000
+DAY_NS: int = 24 * 3600 * NS_PER_SECOND
+NO_SESSION: str = "99:99:99"     # 无此时段(无夜盘/不支持的品种)
+DAY_START: int = 6 * 3600 * NS_PER_SECOND       # 日盘时段开始时间在[6点, 18点)之间, 与get_trading_day一致
+NIGHT_START: int = 18 * 3600 * NS_PER_SECOND
+EPOCH_DATE: date = date(1970, 1, 1)             # 交易日序号的起点(周四)
+EPOCH_WEEKDAY: int = 3
+
+###refer to : http://qhsxf.com/%E6%9C%9F%E8%B4%A7%E4%BA%A4%E6%98%93%E6%97%B6%E9%97%B4.html
+CZCE_NIGHT1 = ['fg', 'sa', 'ma', 'sr', 'ta', 'rm', 'oi', 'cf', 'cf', 'cy', 'pf', 'zc']
+CZCE_NIGHT2 = ['sm', 'sf', 'wh', 'jr', 'lr', 'pm', 'ri', 'rs', 'pk', 'ur', 'cj', 'ap']
+DCE_NIGHT1 = ['i', 'j', 'jm', 'a', 'b', 'ma', 'p', 'y', 'c', 'cs', 'pp', 'v', 'eb', 'eg', 'pg', 'rr', 'i']
+DCE_NIGHT2 = ['bb', 'fb' 'Ih', 'jd']
+SHFE_NIGHT1 = ['cu', 'pb', 'al', 'zn', 'sn', 'ni', 'ss']
+SHFE_NIGHT2 = ['fu', 'ru', 'bu', 'sp', 'rb', 'hc']
+SHFE_NIGHT3 = ['au', 'ag']
+SHFE_NIGHT4 = ['wr']
+GFEX_NIGHT = ['si']
+INE_NIGHT1 = ['sc']
+INE_NIGHT2 = ['bc']
+INE_NIGHT3 = ['lu', 'nr']
+CFFEX_DAY1  = ['if', 'ih', 'ic', 'im']
+CFFEX_DAY2 = ['t', 'tf', 'ts']
+
+
+def get_trading_time(asset: str) -> Tuple:
+    '''
+    给定品种(小写字母代码), 返回交易时间段(夜盘开始, 夜盘结束, 上午1开始, 上午1结束, 上午2开始, 上午2结束, 下午开始, 下午结束)
+    '''
+    if asset in CZCE_NIGHT1 or asset in DCE_NIGHT1 or asset in SHFE_NIGHT2 or asset in INE_NIGHT3:
+        return ("21:00:00.500000000", "23:00:00.000000000", "09:00:00.500000000", "10:15:00.000000000", "10:30:00.500000000", "11:30:00.000000000", "13:30:00.500000000","15:00:00.000000000")
+    if asset in SHFE_NIGHT1 or asset in INE_NIGHT2:
+        return ("21:00:00.500000000", "01:00:00.000000000", "09:00:00.500000000", "10:15:00.000000000", "10:30:00.500000000", "11:30:00.000000000", "13:30:00.500000000","15:00:00.000000000")
+    if asset in SHFE_NIGHT3 or asset in INE_NIGHT1:
+        return ("21:00:00.500000000", "02:30:00.000000000", "09:00:00.500000000", "10:15:00.000000000", "10:30:00.500000000", "11:30:00.000000000", "13:30:00.500000000","15:00:00.000000000")
+    if asset in CZCE_NIGHT2 or asset in DCE_NIGHT2 or asset in SHFE_NIGHT4 or asset in GFEX_NIGHT:
+        return ("99:99:99.000000000", "99:99:99.500000000", "09:00:00.500000000", "10:15:00.000000000", "10:30:00.500000000", "11:30:00.000000000", "13:30:00.500000000", "15:00:00.000000000")
+    # 暂时不支持中金所
+    # if asset in CFFEX_DAY1:
+    #     return ("00:00:00.000000000", "00:00:00.500000000", "09:30:00.500000000", "11:30:00.000000000", "13:00:00.500000000", "15:00:00.000000000")
+    # if asset in CFFEX_DAY2:
+    #     return ("00:00:00.000000000", "00:00:00.500000000", "09:15:00.500000000", "11:30:00.000000000", "13:00:00.500000000", "15:15:00.000000000")
+    # 其他不支持的品种
+    else:
+        return ("99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000","99:99:99.000000000")
+
+
+def get_product(symbol: str) -> str:
+    '''
+    合约代码 -> 品种代码, 如rb2305 -> rb, SR305 -> sr
+    '''
+    return ''.join([c for c in symbol if c.isalpha()]).lower()
+
+
+def parse_time_of_day(s: str) -> int:
+    '''
+    "HH:MM:SS.fffffffff" -> 当日纳秒数
+    '''
+    hms, _, fraction = s.partition(".")
+    hour, minute, second = (int(x) for x in hms.split(":"))
+    return (hour * 3600 + minute * 60 + second) * NS_PER_SECOND + int(fraction.ljust(9, "0")[:9])
+
+
+@lru_cache(maxsize=None)
+def get_sessions(product: str) -> np.ndarray:
+    '''
+    品种交易时段, shape为(n, 2)的int64数组, 每行为[开始, 结束]当日纳秒数(闭区间), 按开始时间排序
+    跨午夜的夜盘拆成[开始, 24点)和[0点, 结束]两段
+    '''
+    times: Tuple = get_trading_time(product)
+    sessions: List[Tuple[int, int]] = []
+    for start_str, end_str in zip(times[::2], times[1::2]):
+        if start_str.startswith(NO_SESSION):
+            continue
+        start: int = parse_time_of_day(start_str)
+        end: int = parse_time_of_day(end_str)
+        if start <= end:
+            sessions.append((start, end))
+        else:
+            sessions.append((start, DAY_NS - 1))
+            sessions.append((0, end))
+    array: np.ndarray = np.array(sorted(sessions), dtype=np.int64).reshape(-1, 2)
+    array.flags.writeable = False   # 缓存共享, 禁止修改
+    return array
+
+
+def get_time_of_day_ns(datetimes: np.ndarray) -> np.ndarray:
+    '''
+    datetime64数组 -> 当日纳秒数数组
+    '''
+    return np.asarray(datetimes, dtype="datetime64[ns]").view(np.int64) % DAY_NS
+
+
+def trading_time_mask(datetimes: np.ndarray, product: str) -> np.ndarray:
+    '''
+    datetime64数组中处于品种交易时段内的位置, NaT为False
+    '''
+    datetimes = np.asarray(datetimes, dtype="datetime64[ns]")
+    time_of_day: np.ndarray = get_time_of_day_ns(datetimes)
+    mask: np.ndarray = np.zeros(len(datetimes), dtype=bool)
+    for start, end in get_sessions(product):
+        mask |= (time_of_day >= start) & (time_of_day <= end)
+    mask &= ~np.isnat(datetimes)
+    return mask
+
+
+
+@lru_cache(maxsize=None)
+def get_session_ends(product: str) -> FrozenSet[int]:
+    '''
+    品种各交易时段的收盘时间(当日纳秒数), 不含跨午夜夜盘拆分出的24点
+    '''
+    return frozenset(int(end) for end in get_sessions(product)[:, 1] if end != DAY_NS - 1)
+
+
+@lru_cache(maxsize=None)
+def get_day_close(product: str) -> int:
+    '''
+    品种日盘收盘时间(当日纳秒数), 即一个交易日的结束; 无交易时段返回-1
+    '''
+    ends: List[int] = [int(end) for start, end in get_sessions(product) if DAY_START <= start < NIGHT_START]
+    return max(ends, default=-1)
+
+
+def get_trading_day_index(datetime_ns: np.ndarray) -> np.ndarray:
+    '''
+    纳秒时间戳数组 -> 所属交易日序号(EPOCH_DATE起的天数), 与get_trading_day一致: 18点以后归属下一日, 周末顺延到周一
+    '''
+    datetime_ns = np.asarray(datetime_ns, dtype=np.int64)
+    day: np.ndarray = datetime_ns // DAY_NS + (datetime_ns % DAY_NS >= NIGHT_START)
+    weekday: np.ndarray = (day + EPOCH_WEEKDAY) % 7
+    return day + np.where(weekday >= 5, 7 - weekday, 0)
+
+
+def trading_day_to_date(index: int) -> date:
+    '''
+    交易日序号 -> date
+    '''
+    return EPOCH_DATE + timedelta(days=int(index))
+
+
+def get_trading_day_bounds(index: int) -> Tuple[int, int]:
+    '''
+    交易日的纳秒时间范围[上一个工作日18点, 当日18点)
+    '''
+    previous: int = int(index) - 1
+    while (previous + EPOCH_WEEKDAY) % 7 >= 5:
+        previous -= 1
+    return previous * DAY_NS + NIGHT_START, int(index) * DAY_NS + NIGHT_START
@@ -1,39 +1,44 @@
-from typing import Callable, Optional, List, Union
+from typing import Callable, Dict, FrozenSet, Optional, List, Tuple, Union
+from datetime import date, datetime, time
 from datastructure.constant import Interval
 from datastructure.object import BarData, TickData
 from datastructure.definition import INTERVAL_DELTA_MAP
+from utils.utils_function import get_trading_day
+from utils.trading_calendar import NS_PER_SECOND, DAY_NS, get_product, get_session_ends, get_day_close
 import numpy as np
 import talib
 
 class BarGenerator:
     '''
     1. tick data -> 1 min bar data
+    2. 1 min bar data -> window bar data(N分钟/N小时/N个交易日), 可同时生成多个周期
     '''
-    #### TODO window ? on_window_bar ?
     def __init__(
             self,
             on_bar: Callable,
-            
-            # window: int = 0,
-            # on_window_bar: Callable = None,
-
+            window: int = 0,
+            on_window_bar: Callable = None,
             interval: Interval = Interval.MINUTE
     ) -> None:
         self.bar: BarData = None
         self.on_bar: Callable = on_bar
         self.bars: List[BarData] = []
 
-        self.interval: Interval = interval
-        self.interval_count: int = 0
-
-        # self.hour_bar: BarData = None
-
-        # self.window: int = window
-        # self.window_bar: BarData = None
-        # self.on_window_bar: Callable = on_window_bar
+        # 窗口bar, 每个1分钟bar生成后依次输入
+        self.windows: List[WindowGenerator] = []
+        if window:
+            self.add_window(window, on_window_bar, interval)
 
         self.last_tick: TickData = None
 
+    def add_window(self, window: int, on_window_bar: Callable, interval: Interval = Interval.MINUTE) -> "WindowGenerator":
+        '''
+        添加窗口bar: interval为MINUTE/HOUR/DAILY, window为每根窗口bar包含的分钟/小时/交易日数
+        '''
+        generator: WindowGenerator = WindowGenerator(window, on_window_bar, interval)
+        self.windows.append(generator)
+        return generator
+
     def update_tick(self, tick: TickData) -> None:
         '''
         不断输入TickData, 产生BarData并存入bars中, 对每个产生的BarData调用传入的callback
@@ -49,7 +54,6 @@ class BarGenerator:
         # 针对第一个tick -> 初始化并不存在的last_tick
         if self.last_tick == None:
             self.last_tick = TickData(
-                gateway_name=tick.gateway_name,
                 symbol=tick.symbol,
                 exchange=tick.exchange,
                 datetime=tick.datetime - INTERVAL_DELTA_MAP[Interval.TICK],
@@ -75,12 +79,12 @@ class BarGenerator:
             self.bar.datetime = self.bar.datetime.replace(second=0, microsecond=0) # 上一个bar生成完毕!
             self.on_bar(self.bar) # 上一个bar, 执行传入的callback
             self.bars.append(self.bar) # 储存合成的bar
+            self.update_windows(self.bar)
             new_minute = True
         # 需要产生新分钟bar
         if new_minute:
             # volume, turnover
             self.bar = BarData(
-                gateway_name=tick.gateway_name,
                 symbol=tick.symbol,
                 exchange=tick.exchange,
                 datetime=tick.datetime, # 需要self.bar.datetime.replace
@@ -122,14 +126,209 @@ class BarGenerator:
         if self.bar:
             bar.datetime = bar.datetime.replace(second=0, microsecond=0)
             self.on_bar(bar)
+            self.update_windows(bar)
         self.bar = None
         return bar
-            
-        
+
+    def update_windows(self, bar: BarData) -> None:
+        '''
+        1分钟bar输入各窗口
+        '''
+        for generator in self.windows:
+            generator.update_bar(bar)
+
+
+class WindowGenerator:
+    '''
+    1 min bar data -> window bar data
+    1.MINUTE: 整N分钟结束(N应为60的因数), HOUR: 整N小时结束, DAILY: 每N个交易日在日盘收盘时结束
+    2.交易时段收盘(如10:15, 11:30, 15:00, 夜盘收盘)时分钟/小时窗口强制结束, 窗口不跨越休市
+    3.日线窗口的datetime为首个交易日0点; 缺少收盘bar时, 下一个交易日的bar到达时结束上一交易日
+    '''
+    def __init__(self, window: int, on_window_bar: Callable, interval: Interval = Interval.MINUTE) -> None:
+        """Constructor"""
+        self.window: int = window
+        self.on_window_bar: Callable = on_window_bar
+        self.interval: Interval = interval
+
+        self.window_bar: BarData = None
+        self.window_bars: List[BarData] = []
+        self.trading_day: date = None       # 当前窗口bar最新的交易日, 交易日结束后置为None
+        self.day_count: int = 0             # 当前窗口bar已结束的交易日数
+
+        # 交易时段, 首个bar到达时按品种读取
+        self.session_ends: FrozenSet[int] = None
+        self.day_close: int = -1
+
+    def update_bar(self, bar: BarData) -> None:
+        '''
+        输入1分钟bar, 窗口结束时执行callback
+        '''
+        if self.session_ends is None:
+            product: str = get_product(bar.symbol)
+            self.session_ends = get_session_ends(product)
+            self.day_close = get_day_close(product)
+
+        # 1分钟bar结束时间(当日纳秒数): bar.datetime为分钟起点, 区间为左开右闭
+        bar_end: int = ((bar.datetime.hour * 60 + bar.datetime.minute + 1) * 60 * NS_PER_SECOND) % DAY_NS
+
+        if self.interval == Interval.DAILY:
+            trading_day: date = get_trading_day(bar.datetime)
+            if self.window_bar and self.trading_day and trading_day != self.trading_day:
+                self.end_day()
+            self.trading_day = trading_day
+
+        if not self.window_bar:
+            dt: datetime = bar.datetime
+            if self.interval == Interval.DAILY:
+                dt = datetime.combine(self.trading_day, time())
+            self.window_bar = BarData(
+                symbol=bar.symbol,
+                exchange=bar.exchange,
+                datetime=dt,
+                interval=self.interval,
+                open_price=bar.open_price,
+                high_price=bar.high_price,
+                low_price=bar.low_price
+            )
+        else:
+            self.window_bar.high_price = max(self.window_bar.high_price, bar.high_price)
+            self.window_bar.low_price = min(self.window_bar.low_price, bar.low_price)
+
+        self.window_bar.close_price = bar.close_price
+        self.window_bar.volume += bar.volume
+        self.window_bar.turnover += bar.turnover
+        self.window_bar.open_interest = bar.open_interest
+
+        if self.interval == Interval.DAILY:
+            if bar_end == self.day_close:
+                self.end_day()
+        elif bar_end in self.session_ends:
+            self.finish()
+        elif self.interval == Interval.MINUTE:
+            if not (bar.datetime.minute + 1) % self.window:
+                self.finish()
+        elif bar.datetime.minute == 59 and not (bar.datetime.hour + 1) % self.window:
+            self.finish()
+
+    def end_day(self) -> None:
+        '''
+        一个交易日结束, 满window个交易日时结束窗口
+        '''
+        self.trading_day = None
+        self.day_count += 1
+        if self.day_count >= self.window:
+            self.finish()
+
+    def finish(self) -> None:
+        '''
+        窗口bar生成完毕, 执行callback
+        '''
+        bar: BarData = self.window_bar
+        self.window_bar = None
+        self.day_count = 0
+        self.window_bars.append(bar)
+        self.on_window_bar(bar)
+
+    def generate(self) -> Optional[BarData]:
+        '''
+        立即结束当前窗口bar, 并执行callback
+        '''
+        bar: BarData = self.window_bar
+        if bar:
+            self.finish()
+        return bar
+
+
+class ThresholdBarGenerator:
+    '''
+    tick data -> 信息驱动bar data, 累计量达到threshold时结束当前bar(达到阈值的tick计入当前bar)
+    1.VOLUME: 成交量, TURNOVER: 成交额, RANGE: 最高价-最低价, TICK_COUNT: tick数
+    2.剔除脏数据同BarGenerator; 成交量/成交额为累计值的差(负数记为0), 第一个tick只作为基准不计入
+    3.bar的datetime为第一个tick的时间, 开高低收均取tick最新价
+    '''
+    def __init__(self, on_bar: Callable, interval: Interval, threshold: float) -> None:
+        """Constructor"""
+        if interval not in (Interval.VOLUME, Interval.TURNOVER, Interval.RANGE, Interval.TICK_COUNT):
+            raise ValueError(f"不支持的bar类型: {interval}")
+        self.on_bar: Callable = on_bar
+        self.interval: Interval = interval
+        self.threshold: float = threshold
+
+        self.bar: BarData = None
+        self.bars: List[BarData] = []
+        self.tick_count: int = 0    # 当前bar的tick数
+        self.last_tick: TickData = None
+
+    def update_tick(self, tick: TickData) -> None:
+        '''
+        不断输入TickData, 达到阈值时产生BarData并执行callback
+        '''
+        if not tick.last_price:
+            return # 剔除最新价为0
+        if self.last_tick and tick.datetime < self.last_tick.datetime:
+            return # 剔除时间戳逆序
+
+        volume_change: float = 0
+        turnover_change: float = 0
+        if self.last_tick:
+            volume_change = max(tick.volume - self.last_tick.volume, 0)
+            turnover_change = max(tick.turnover - self.last_tick.turnover, 0)
+        self.last_tick = tick
+
+        if not self.bar:
+            self.bar = BarData(
+                symbol=tick.symbol,
+                exchange=tick.exchange,
+                datetime=tick.datetime,
+                interval=self.interval,
+                open_price=tick.last_price,
+                high_price=tick.last_price,
+                low_price=tick.last_price
+            )
+            self.tick_count = 0
+        else:
+            self.bar.high_price = max(self.bar.high_price, tick.last_price)
+            self.bar.low_price = min(self.bar.low_price, tick.last_price)
+
+        self.bar.close_price = tick.last_price
+        self.bar.open_interest = tick.open_interest
+        self.bar.volume += volume_change
+        self.bar.turnover += turnover_change
+        self.tick_count += 1
+
+        if self.get_value() >= self.threshold:
+            self.generate()
+
+    def get_value(self) -> float:
+        '''
+        当前bar的累计量
+        '''
+        if self.interval == Interval.VOLUME:
+            return self.bar.volume
+        if self.interval == Interval.TURNOVER:
+            return self.bar.turnover
+        if self.interval == Interval.RANGE:
+            return self.bar.high_price - self.bar.low_price
+        return self.tick_count
+
+    def generate(self) -> Optional[BarData]:
+        '''
+        立即产生bar data, 并执行callback
+        '''
+        bar: BarData = self.bar
+        if bar:
+            self.bars.append(bar)
+            self.on_bar(bar)
+        self.bar = None
+        return bar
+
+
 class ArrayManager:
     '''
     1. time series container of bar data
     2. calculate technical indicator value
+    双倍长度环形存储: 每个bar同时写入位置i和i+size, buffer[:, index: index+size]始终是按时间排序的连续数组(可直接传给talib)
     '''
     def __init__(self, size: int = 100) -> None:
         """Constructor"""
@@ -137,13 +336,23 @@ class ArrayManager:
         self.size: int = size
         self.inited: bool = False
 
-        self.open_array: np.ndarray = np.zeros(size)
-        self.high_array: np.ndarray = np.zeros(size)
-        self.low_array: np.ndarray = np.zeros(size)
-        self.close_array: np.ndarray = np.zeros(size)
-        self.volume_array: np.ndarray = np.zeros(size)
-        self.turnover_array: np.ndarray = np.zeros(size)
-        self.open_interest_array: np.ndarray = np.zeros(size)
+        # 各行依次为open, high, low, close, volume, turnover, open_interest
+        self.buffer: np.ndarray = np.zeros((7, 2 * size))
+        self.index: int = 0 # 下一个写入位置
+
+        self.open_array: np.ndarray = None
+        self.high_array: np.ndarray = None
+        self.low_array: np.ndarray = None
+        self.close_array: np.ndarray = None
+        self.volume_array: np.ndarray = None
+        self.turnover_array: np.ndarray = None
+        self.open_interest_array: np.ndarray = None
+        self.update_arrays()
+
+        # 指标缓存: 同一个bar内重复计算同一指标直接返回(数组结果只读), 新bar到达时清空
+        self.cache: Dict[Tuple, Union[float, np.ndarray]] = {} # {(指标名, 参数, array): 结果}
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
     
     def update_bar(self, bar: BarData) -> None:
         """
@@ -154,41 +363,71 @@ class ArrayManager:
         # 优先级: not > and > or
         if not self.inited and self.count >= self.size: # 已经装满(size)
             self.inited = True
-        # 将最新bar更新到array中
-        # 左移一位
-        self.open_array[:-1] = self.open_array[1:]
-        self.high_array[:-1] = self.high_array[1:]
-        self.low_array[:-1] = self.low_array[1:]
-        self.close_array[:-1] = self.close_array[1:]
-        self.volume_array[:-1] = self.volume_array[1:]
-        self.turnover_array[:-1] = self.turnover_array[1:]
-        self.open_interest_array[:-1] = self.open_interest_array[1:]
-        # 最后一位放入最新bar
-        self.open_array[-1] = bar.open_price
-        self.high_array[-1] = bar.high_price
-        self.low_array[-1] = bar.low_price
-        self.close_array[-1] = bar.close_price
-        self.volume_array[-1] = bar.volume
-        self.turnover_array[-1] = bar.turnover
-        self.open_interest_array[-1] = bar.open_interest
+        # 最新bar写入当前位置及其镜像位置, O(1)
+        values: tuple = (bar.open_price, bar.high_price, bar.low_price, bar.close_price, bar.volume, bar.turnover, bar.open_interest)
+        self.buffer[:, self.index] = values
+        self.buffer[:, self.index + self.size] = values
+        self.index = (self.index + 1) % self.size
+        self.update_arrays()
+        self.cache.clear()
+
+    def update_arrays(self) -> None:
+        '''
+        各序列指向最近size个bar的视图(由旧到新)
+        '''
+        (
+            self.open_array,
+            self.high_array,
+            self.low_array,
+            self.close_array,
+            self.volume_array,
+            self.turnover_array,
+            self.open_interest_array
+        ) = self.buffer[:, self.index: self.index + self.size]
     
+    def set_cache(self, key: Tuple, result: np.ndarray, array: bool) -> Union[float, np.ndarray]:
+        '''
+        缓存未命中: 保存新计算的指标结果
+        返回的数组只读, 避免调用方原地修改后影响之后的缓存命中
+        '''
+        self.cache_misses += 1
+        if array:
+            result.setflags(write=False)
+        else:
+            result = result[-1]
+        self.cache[key] = result
+        return result
+
+    def get_cache_statistics(self) -> Dict[str, float]:
+        '''
+        指标缓存命中次数、未命中次数和命中率
+        '''
+        total: int = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "hit_rate": self.cache_hits / total if total else 0
+        }
+
     def sma(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
         """
         Simple moving average.
         """
-        result: np.ndarray = talib.SMA(self.close, n)
-        if array:
-            return result
-        return result[-1]
+        key: Tuple = ("sma", n, array)
+        if key in self.cache:
+            self.cache_hits += 1
+            return self.cache[key]
+        return self.set_cache(key, talib.SMA(self.close, n), array)
 
     def ema(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
         """
         Exponential moving average.
         """
-        result: np.ndarray = talib.EMA(self.close, n)
-        if array:
-            return result
-        return result[-1]
+        key: Tuple = ("ema", n, array)
+        if key in self.cache:
+            self.cache_hits += 1
+            return self.cache[key]
+        return self.set_cache(key, talib.EMA(self.close, n), array)
     
     @property
     def open(self) -> np.ndarray:
@@ -241,3 +480,50 @@ class ArrayManager:
 
 
 
+class TickBuffer:
+    '''
+    定长环形缓冲区: 保存单个合约最近size个tick
+    预先分配存储空间, 写入O(1), 内存占用与回测长度无关
+    '''
+    def __init__(self, size: int = 10) -> None:
+        """Constructor"""
+        self.size: int = size
+        self.count: int = 0                         # 累计写入的tick数
+        self._buffer: List[TickData] = [None] * size
+        self._index: int = 0                        # 下一个写入位置
+
+    def update_tick(self, tick: TickData) -> None:
+        '''
+        写入最新tick, 覆盖最旧的tick
+        '''
+        self._buffer[self._index] = tick
+        self._index = (self._index + 1) % self.size
+        self.count += 1
+
+    @property
+    def latest(self) -> Optional[TickData]:
+        '''
+        最新tick
+        '''
+        if not self.count:
+            return None
+        return self._buffer[self._index - 1]
+
+    def get(self, n: int) -> Optional[TickData]:
+        '''
+        往前第n个tick, n=0为最新tick
+        '''
+        if n < 0 or n >= len(self):
+            return None
+        return self._buffer[(self._index - 1 - n) % self.size]
+
+    def to_list(self) -> List[TickData]:
+        '''
+        按时间顺序(由旧到新)返回缓冲区中的tick
+        '''
+        if self.count < self.size:
+            return self._buffer[:self.count]
+        return self._buffer[self._index:] + self._buffer[:self._index]
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
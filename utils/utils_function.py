@@ -4,6 +4,7 @@
 
 
 from decimal import Decimal
+from datetime import datetime, date, timedelta
 
 def round_to(value: float, target: float) -> float:
     '''
@@ -20,3 +21,15 @@ def round_to(value: float, target: float) -> float:
 
 
         
+
+
+def get_trading_day(dt: datetime) -> date:
+    '''
+    返回时间戳所属交易日: 夜盘(18点以后及凌晨)归属下一个工作日
+    '''
+    d: date = dt.date()
+    if dt.hour >= 18:
+        d += timedelta(days=1)
+    while d.weekday() >= 5: # 周五夜盘 -> 下周一
+        d += timedelta(days=1)
+    return d